@@ -0,0 +1,119 @@
+"""
+agendador.py - Agendamento adaptativo das consultas de cada canal
+Mantém uma fila de prioridade (heap) com o próximo instante de consulta
+de cada canal, baseado no scheduledStartTime dos eventos conhecidos.
+"""
+
+import heapq
+import itertools
+import threading
+
+
+class AgendadorCanais:
+    """
+    Fila de prioridade com o próximo instante de consulta de cada canal.
+
+    - Canais ao vivo ou com evento a menos de `intervalo_busca` segundos
+      ficam na faixa rápida (consulta a cada `intervalo_rapido`).
+    - Canais com evento agendado distante voltam à faixa rápida
+      `intervalo_busca` segundos antes do horário agendado.
+    - Canais ociosos recuam exponencialmente de `intervalo_base`
+      até `intervalo_maximo`.
+    """
+
+    def __init__(self, intervalo_rapido, intervalo_base, intervalo_maximo, intervalo_busca):
+        self.intervalo_rapido = intervalo_rapido
+        self.intervalo_base = intervalo_base
+        self.intervalo_maximo = max(intervalo_maximo, intervalo_base)
+        self.intervalo_busca = intervalo_busca
+
+        self._heap = []  # [(instante, seq, canal)]
+        self._agendados = {}  # canal -> (instante, seq)
+        self._nivel_backoff = {}  # canal -> expoente atual do recuo
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def agendar(self, canal, instante):
+        """Define o próximo instante de consulta do canal (substitui o anterior)"""
+        with self._lock:
+            seq = next(self._seq)
+            self._agendados[canal] = (instante, seq)
+            heapq.heappush(self._heap, (instante, seq, canal))
+
+    def remover(self, canal):
+        """Remove o canal do agendamento"""
+        with self._lock:
+            self._agendados.pop(canal, None)
+            self._nivel_backoff.pop(canal, None)
+
+    def vencidos(self, agora):
+        """Retira da fila e retorna os canais cuja consulta venceu até `agora`"""
+        canais = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= agora:
+                instante, seq, canal = heapq.heappop(self._heap)
+                # Entradas substituídas por um agendamento posterior são descartadas
+                if self._agendados.get(canal) != (instante, seq):
+                    continue
+                del self._agendados[canal]
+                canais.append(canal)
+        return canais
+
+    def proximo_instante(self):
+        """Retorna o instante da próxima consulta agendada (ou None)"""
+        with self._lock:
+            while self._heap:
+                instante, seq, canal = self._heap[0]
+                if self._agendados.get(canal) == (instante, seq):
+                    return instante
+                heapq.heappop(self._heap)
+        return None
+
+    def instante_de(self, canal):
+        """Retorna o instante agendado para o canal (ou None)"""
+        with self._lock:
+            agendado = self._agendados.get(canal)
+        return agendado[0] if agendado else None
+
+    def reagendar(self, canal, eventos, agora, fator=1.0):
+        """
+        Calcula e agenda a próxima consulta do canal a partir dos eventos (Evento) conhecidos.
+        `fator` (>= 1) estica o intervalo calculado quando a quota está apertada.
+        Retorna o intervalo (segundos) até a próxima consulta.
+        """
+        proximo_inicio = None
+        ao_vivo = False
+
+        for evento in eventos:
+            if evento.actual_end:
+                continue
+            if evento.actual_start:
+                ao_vivo = True
+                break
+            sched = evento.agendado
+            if sched is None:
+                continue
+            if sched <= agora:
+                ao_vivo = True
+                break
+            if proximo_inicio is None or sched < proximo_inicio:
+                proximo_inicio = sched
+
+        with self._lock:
+            if ao_vivo or (proximo_inicio is not None and proximo_inicio - agora <= self.intervalo_busca):
+                # Faixa rápida: ao vivo ou evento iminente
+                self._nivel_backoff[canal] = 0
+                intervalo = self.intervalo_rapido
+            else:
+                # Ocioso (ou evento distante): recuo exponencial
+                nivel = self._nivel_backoff.get(canal, 0)
+                intervalo = min(self.intervalo_base * (2 ** nivel), self.intervalo_maximo)
+                if intervalo < self.intervalo_maximo:
+                    self._nivel_backoff[canal] = nivel + 1
+                if proximo_inicio is not None:
+                    # Entrar na faixa rápida a tempo do evento agendado
+                    intervalo = min(intervalo, proximo_inicio - self.intervalo_busca - agora)
+
+        intervalo = max(intervalo, self.intervalo_rapido) * fator
+        self.agendar(canal, agora + intervalo)
+        return intervalo
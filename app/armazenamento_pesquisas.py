@@ -0,0 +1,301 @@
+"""
+armazenamento_pesquisas.py - Histórico de pesquisas em banco SQLite indexado
+Substitui os arquivos pesquisa_api/<canal>/<dd-mm-YYYY_HH-MM-SS>.json por
+tabelas indexadas por canal, vídeo e instante da pesquisa.
+
+Uso como script (importação única das pastas antigas):
+    python armazenamento_pesquisas.py --importar [pasta] [banco]
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+
+
+CAMINHO_PADRAO = os.path.join("pesquisa_api", "pesquisas.db")
+
+CAMPOS_EVENTO = ("videoId", "title", "url", "actualStartTime", "scheduledStartTime", "actualEndTime")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    canal TEXT NOT NULL,
+    obtido_em REAL NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_canal_obtido ON snapshots(canal, obtido_em DESC);
+
+CREATE TABLE IF NOT EXISTS eventos (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id) ON DELETE CASCADE,
+    posicao INTEGER NOT NULL,
+    video_id TEXT NOT NULL,
+    title TEXT,
+    url TEXT,
+    actual_start TEXT,
+    scheduled_start TEXT,
+    actual_end TEXT,
+    PRIMARY KEY (snapshot_id, posicao)
+);
+CREATE INDEX IF NOT EXISTS idx_eventos_video ON eventos(video_id);
+
+CREATE TABLE IF NOT EXISTS meta (
+    chave TEXT PRIMARY KEY,
+    valor TEXT
+);
+"""
+
+_padrao = None
+_lock_padrao = threading.Lock()
+
+
+def hash_eventos(eventos):
+    """Retorna hash do conteúdo da pesquisa (independente da ordem das chaves)"""
+    conteudo = json.dumps(eventos, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(conteudo.encode("utf-8")).hexdigest()
+
+
+class ArmazenamentoPesquisas:
+    """
+    Banco SQLite com o histórico de pesquisas de todos os canais.
+    Escritas são acumuladas e gravadas em uma única transação por `descarregar()`.
+    """
+
+    def __init__(self, caminho=CAMINHO_PADRAO, max_por_canal=5, max_pendentes=200):
+        """
+        Abre (ou cria) o banco.
+
+        Args:
+            caminho: Caminho do arquivo SQLite (":memory:" para banco em memória)
+            max_por_canal: Pesquisas mantidas por canal na poda (None = sem limite)
+            max_pendentes: Escritas acumuladas que disparam descarga automática
+        """
+        if caminho != ":memory:":
+            os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        self.caminho = caminho
+        self.max_por_canal = max_por_canal
+        self.max_pendentes = max_pendentes
+
+        self._lock = threading.Lock()
+        self._pendentes = []  # [(canal, eventos, obtido_em, hash)]
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        if caminho != ":memory:":
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(ESQUEMA)
+        self._conn.commit()
+
+    @classmethod
+    def padrao(cls):
+        """Retorna a instância compartilhada do banco no caminho padrão"""
+        global _padrao
+        with _lock_padrao:
+            if _padrao is None:
+                _padrao = cls()
+            return _padrao
+
+    def ultima_pesquisa(self, canal):
+        """Retorna os eventos da pesquisa mais recente do canal (ou lista vazia)"""
+        with self._lock:
+            # Escritas ainda não descarregadas têm prioridade
+            for chave, eventos, _obtido_em, _hash in reversed(self._pendentes):
+                if chave == canal:
+                    return [dict(ev) for ev in eventos]
+
+            linha = self._conn.execute(
+                "SELECT id FROM snapshots WHERE canal = ? ORDER BY obtido_em DESC LIMIT 1",
+                (canal,),
+            ).fetchone()
+            if not linha:
+                return []
+            linhas = self._conn.execute(
+                "SELECT video_id, title, url, actual_start, scheduled_start, actual_end "
+                "FROM eventos WHERE snapshot_id = ? ORDER BY posicao",
+                (linha[0],),
+            ).fetchall()
+        return [dict(zip(CAMPOS_EVENTO, valores)) for valores in linhas]
+
+    def ultimo_hash(self, canal):
+        """Retorna o hash da pesquisa mais recente do canal (ou None)"""
+        with self._lock:
+            for chave, _eventos, _obtido_em, hash_ in reversed(self._pendentes):
+                if chave == canal:
+                    return hash_
+            linha = self._conn.execute(
+                "SELECT hash FROM snapshots WHERE canal = ? ORDER BY obtido_em DESC LIMIT 1",
+                (canal,),
+            ).fetchone()
+        return linha[0] if linha else None
+
+    def salvar(self, canal, eventos, obtido_em=None, hash_=None):
+        """
+        Agenda a gravação de uma pesquisa do canal.
+        A escrita efetiva acontece no próximo `descarregar()`.
+        """
+        eventos = [dict(ev) for ev in eventos]
+        item = (canal, eventos, obtido_em or time.time(), hash_ or hash_eventos(eventos))
+        with self._lock:
+            self._pendentes.append(item)
+            cheio = len(self._pendentes) >= self.max_pendentes
+        if cheio:
+            self.descarregar()
+
+    def descarregar(self):
+        """
+        Grava todas as pesquisas pendentes em uma única transação e poda o histórico.
+        Retorna a quantidade de pesquisas gravadas.
+        """
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, []
+            if not pendentes:
+                return 0
+            try:
+                with self._conn:
+                    self._inserir(pendentes)
+                    if self.max_por_canal:
+                        self._podar(self.max_por_canal)
+            except Exception:
+                # Devolver à fila para a próxima tentativa
+                self._pendentes = pendentes + self._pendentes
+                raise
+        return len(pendentes)
+
+    def _inserir(self, itens):
+        """Insere snapshots e eventos (chamado dentro de uma transação)"""
+        for canal, eventos, obtido_em, hash_ in itens:
+            cursor = self._conn.execute(
+                "INSERT INTO snapshots (canal, obtido_em, hash) VALUES (?, ?, ?)",
+                (canal, obtido_em, hash_),
+            )
+            snapshot_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO eventos (snapshot_id, posicao, video_id, title, url, "
+                "actual_start, scheduled_start, actual_end) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (snapshot_id, posicao, *(ev.get(campo) for campo in CAMPOS_EVENTO))
+                    for posicao, ev in enumerate(eventos)
+                    if ev.get("videoId")
+                ],
+            )
+
+    def _podar(self, max_por_canal):
+        """Mantém apenas as `max_por_canal` pesquisas mais recentes de cada canal"""
+        return self._conn.execute(
+            """
+            DELETE FROM snapshots WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (
+                        PARTITION BY canal ORDER BY obtido_em DESC
+                    ) AS posicao
+                    FROM snapshots
+                ) WHERE posicao > ?
+            )
+            """,
+            (max_por_canal,),
+        ).rowcount
+
+    def podar(self, max_por_canal=None, idade_maxima=None):
+        """
+        Remove pesquisas antigas.
+
+        Args:
+            max_por_canal: Quantidade de pesquisas mantidas por canal
+            idade_maxima: Remove pesquisas mais antigas que isso (segundos)
+
+        Returns:
+            Quantidade de pesquisas removidas
+        """
+        removidas = 0
+        with self._lock, self._conn:
+            if max_por_canal:
+                removidas += self._podar(max_por_canal)
+            if idade_maxima:
+                removidas += self._conn.execute(
+                    "DELETE FROM snapshots WHERE obtido_em < ?",
+                    (time.time() - idade_maxima,),
+                ).rowcount
+        return removidas
+
+    def possui_pesquisa_desde(self, instante):
+        """Indica se alguma pesquisa foi gravada a partir de `instante` (epoch)"""
+        with self._lock:
+            if any(obtido_em >= instante for _c, _e, obtido_em, _h in self._pendentes):
+                return True
+            linha = self._conn.execute(
+                "SELECT 1 FROM snapshots WHERE obtido_em >= ? LIMIT 1", (instante,)
+            ).fetchone()
+        return linha is not None
+
+    def importar_pastas(self, pasta="pesquisa_api", forcar=False):
+        """
+        Importa (uma única vez) os arquivos JSON do formato antigo
+        pesquisa_api/<canal>/<dd-mm-YYYY_HH-MM-SS>.json.
+
+        Returns:
+            Quantidade de arquivos importados
+        """
+        with self._lock:
+            ja_importado = self._conn.execute(
+                "SELECT valor FROM meta WHERE chave = 'importacao_pastas'"
+            ).fetchone()
+        if ja_importado and not forcar:
+            return 0
+        if not os.path.isdir(pasta):
+            return 0
+
+        itens = []
+        for canal in sorted(os.listdir(pasta)):
+            pasta_canal = os.path.join(pasta, canal)
+            if not os.path.isdir(pasta_canal):
+                continue
+            for nome in os.listdir(pasta_canal):
+                if not nome.endswith(".json"):
+                    continue
+                arquivo = os.path.join(pasta_canal, nome)
+                try:
+                    obtido_em = datetime.strptime(nome[:-5], "%d-%m-%Y_%H-%M-%S").timestamp()
+                except ValueError:
+                    obtido_em = os.path.getmtime(arquivo)
+                try:
+                    with open(arquivo, "r", encoding="utf-8") as f:
+                        eventos = json.load(f)
+                except Exception as e:
+                    print(f"[WARN] Não foi possível importar {arquivo}: {e}")
+                    continue
+                itens.append((canal, eventos, obtido_em, hash_eventos(eventos)))
+
+        with self._lock, self._conn:
+            # Não duplicar pesquisas já importadas anteriormente
+            existentes = set(self._conn.execute("SELECT canal, obtido_em FROM snapshots").fetchall())
+            itens = [item for item in itens if (item[0], item[2]) not in existentes]
+            self._inserir(itens)
+            if self.max_por_canal:
+                self._podar(self.max_por_canal)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (chave, valor) VALUES ('importacao_pastas', ?)",
+                (datetime.now().isoformat(),),
+            )
+        return len(itens)
+
+    def fechar(self):
+        """Descarrega escritas pendentes e fecha o banco"""
+        self.descarregar()
+        with self._lock:
+            self._conn.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "--importar":
+        pasta = sys.argv[2] if len(sys.argv) > 2 else "pesquisa_api"
+        banco = sys.argv[3] if len(sys.argv) > 3 else CAMINHO_PADRAO
+        armazenamento = ArmazenamentoPesquisas(banco)
+        total = armazenamento.importar_pastas(pasta, forcar=True)
+        armazenamento.fechar()
+        print(f"[INFO] {total} pesquisa(s) importada(s) de {pasta} para {banco}")
+    else:
+        print(__doc__)
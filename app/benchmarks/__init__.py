@@ -0,0 +1,4 @@
+"""
+benchmarks - Medições de desempenho do monitor (executar a partir de app/)
+Ex.: python -m benchmarks.bench_selecao
+"""
@@ -0,0 +1,376 @@
+"""
+api_falsa.py - Servidor local que imita a YouTube Data API v3 (search e videos)
+e o feed Atom de uploads dos canais
+
+Cada channelId recebe uma população sintética e determinística de eventos
+(ao vivo, agendados para breve, agendados distantes e encerrados) e de
+uploads comuns (só aparecem no feed, sem liveStreamingDetails). Latência,
+taxa de erro e quota diária por chave (403 quotaExceeded ao esgotar) são
+configuráveis, assim como chaves recusadas (400 API_KEY_INVALID);
+/_estatisticas informa requisições e unidades de quota consumidas
+(search.list = 100, videos.list = 1, feed = 0).
+
+Endpoints:
+    GET /youtube/v3/search?channelId=...&eventType=live|upcoming
+    GET /youtube/v3/videos?id=a,b,c      (ETag + If-None-Match -> 304)
+    GET /feeds/videos.xml?channel_id=... (404 com --sem-feed)
+    GET /_estatisticas[?zerar=1]
+
+Uso (a partir de app/):
+    python -m benchmarks.api_falsa [--porta 8085] [--latencia 50] [--jitter 20] [--taxa-erro 0.01] [--eventos 4] [--uploads 6] [--quota 10000] [--sem-feed] [--chave-invalida CHAVE]
+"""
+
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from datetime import datetime as dt, timezone
+from xml.sax.saxutils import escape
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+# Custo de quota de cada endpoint
+CUSTO_QUOTA = {"search": 100, "videos": 1, "feed": 0}
+
+
+def _iso(epoch):
+    return dt.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class PopulacaoSintetica:
+    """
+    Eventos sintéticos por canal, gerados sob demanda a partir do channelId
+    (a mesma semente gera sempre os mesmos eventos).
+    """
+
+    def __init__(self, eventos_por_canal=4, semente=42, uploads_por_canal=6):
+        self.eventos_por_canal = eventos_por_canal
+        self.uploads_por_canal = uploads_por_canal
+        self.semente = semente
+        self.inicio = time.time()
+        self._canais = {}  # channel_id -> [evento]
+        self._uploads = {}  # channel_id -> [upload comum]
+        self._videos = {}  # video_id -> evento ou upload (detalhes None)
+        self._lock = threading.Lock()
+
+    def eventos(self, channel_id):
+        """Retorna os eventos do canal: {videoId, title, estado, detalhes}"""
+        with self._lock:
+            self._popular(channel_id)
+            return self._canais[channel_id]
+
+    def feed(self, channel_id):
+        """Vídeos do feed de uploads: uploads comuns e eventos, intercalados"""
+        with self._lock:
+            self._popular(channel_id)
+            eventos, uploads = self._canais[channel_id], self._uploads[channel_id]
+        intercalados = []
+        for i in range(max(len(eventos), len(uploads))):
+            intercalados.extend(lista[i] for lista in (uploads, eventos) if i < len(lista))
+        return intercalados[:15]  # o feed real lista os 15 vídeos mais recentes
+
+    def adicionar_live(self, channel_id, titulo="Nova live"):
+        """Acrescenta ao canal uma live iniciada agora (simula um canal entrando ao vivo); retorna o videoId"""
+        with self._lock:
+            self._popular(channel_id)
+            eventos = self._canais[channel_id]
+            video_id = hashlib.md5(f"{channel_id}:{len(eventos)}:nova".encode()).hexdigest()[:11]
+            agora = _iso(time.time())
+            ev = {"videoId": video_id, "title": titulo, "estado": "live",
+                  "detalhes": {"actualStartTime": agora, "scheduledStartTime": agora}}
+            eventos.insert(0, ev)
+            self._videos[video_id] = ev
+            return video_id
+
+    def _popular(self, channel_id):
+        """Gera eventos e uploads do canal na primeira consulta (chamado com o lock)"""
+        if channel_id in self._canais:
+            return
+        self._canais[channel_id] = self._gerar(channel_id)
+        self._uploads[channel_id] = [
+            {"videoId": hashlib.md5(f"{channel_id}:upload:{i}".encode()).hexdigest()[:11],
+             "title": f"Upload {i} de {channel_id}", "estado": "none", "detalhes": None}
+            for i in range(self.uploads_por_canal)
+        ]
+        for ev in self._canais[channel_id] + self._uploads[channel_id]:
+            self._videos[ev["videoId"]] = ev
+
+    def video(self, video_id):
+        with self._lock:
+            return self._videos.get(video_id)
+
+    def _gerar(self, channel_id):
+        rnd = random.Random(f"{self.semente}:{channel_id}")
+        agora = self.inicio
+        eventos = []
+        for i in range(self.eventos_por_canal):
+            video_id = hashlib.md5(f"{channel_id}:{i}".encode()).hexdigest()[:11]
+            sorteio = rnd.random()
+            if sorteio < 0.2:
+                estado = "live"
+                detalhes = {"actualStartTime": _iso(agora - rnd.randint(60, 7200)),
+                            "scheduledStartTime": _iso(agora - rnd.randint(60, 7200))}
+            elif sorteio < 0.5:
+                estado = "upcoming"
+                detalhes = {"scheduledStartTime": _iso(agora + rnd.randint(60, 6 * 3600))}
+            elif sorteio < 0.8:
+                estado = "upcoming"
+                detalhes = {"scheduledStartTime": _iso(agora + rnd.randint(6 * 3600, 7 * 86400))}
+            else:
+                estado = "completed"
+                inicio = agora - rnd.randint(7200, 86400)
+                detalhes = {"actualStartTime": _iso(inicio),
+                            "scheduledStartTime": _iso(inicio),
+                            "actualEndTime": _iso(inicio + 3600)}
+            eventos.append({"videoId": video_id, "title": f"Evento {i} de {channel_id}",
+                            "estado": estado, "detalhes": detalhes})
+        return eventos
+
+
+class EstatisticasApi:
+    """Contadores de requisições, respostas e quota (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.quota_por_chave = {}  # não é zerada entre ciclos: simula a quota do dia de cada chave
+        self.zerar()
+
+    def zerar(self):
+        with self._lock:
+            self.requisicoes = {"search": 0, "videos": 0, "feed": 0}
+            self.quota = 0
+            self.nao_modificados = 0
+            self.erros = 0
+
+    def registrar(self, endpoint, status, limite_quota=None, chave=None):
+        """Conta a requisição; retorna False se a quota `limite_quota` da chave já estava esgotada"""
+        with self._lock:
+            if limite_quota is not None and self.quota_por_chave.get(chave, 0) >= limite_quota:
+                self.erros += 1
+                return False
+            self.requisicoes[endpoint] += 1
+            self.quota += CUSTO_QUOTA[endpoint]
+            self.quota_por_chave[chave] = self.quota_por_chave.get(chave, 0) + CUSTO_QUOTA[endpoint]
+            if status == 304:
+                self.nao_modificados += 1
+            elif status >= 400:
+                self.erros += 1
+            return True
+
+    def como_dict(self):
+        with self._lock:
+            return {
+                "requisicoes": sum(self.requisicoes.values()),
+                "por_endpoint": dict(self.requisicoes),
+                "quota": self.quota,
+                "nao_modificados": self.nao_modificados,
+                "erros": self.erros,
+                "quota_por_chave": dict(self.quota_por_chave),
+            }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, como a API real
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, status, corpo=None, headers=None, tipo="application/json; charset=UTF-8"):
+        if isinstance(corpo, bytes):
+            dados = corpo
+        else:
+            dados = json.dumps(corpo).encode("utf-8") if corpo is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(dados)))
+        for nome, valor in (headers or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        if dados:
+            self.wfile.write(dados)
+
+    def do_GET(self):
+        api = self.server.api
+        url = urlsplit(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if url.path == "/_estatisticas":
+            estatisticas = api.estatisticas.como_dict()
+            if params.get("zerar"):
+                api.estatisticas.zerar()
+            return self._responder(200, estatisticas)
+
+        if url.path == "/feeds/videos.xml":
+            api.aguardar_latencia()
+            if not api.feed_disponivel:
+                api.estatisticas.registrar("feed", 404)
+                return self._responder(404, b"Not Found", tipo="text/plain")
+            api.estatisticas.registrar("feed", 200)
+            return self._responder(200, api.feed(params.get("channel_id", "")),
+                                   tipo="application/atom+xml; charset=UTF-8")
+
+        if url.path == "/youtube/v3/search":
+            endpoint = "search"
+        elif url.path == "/youtube/v3/videos":
+            endpoint = "videos"
+        else:
+            return self._responder(404, {"error": {"code": 404, "message": "Not Found"}})
+
+        api.aguardar_latencia()
+        chave = params.get("key")
+        if chave in api.chaves_invalidas:
+            api.estatisticas.registrar(endpoint, 400, chave=chave)
+            return self._responder(400, {"error": {"code": 400, "message": "API key not valid.", "errors": [
+                {"domain": "global", "reason": "badRequest"}], "status": "INVALID_ARGUMENT",
+                "details": [{"@type": "type.googleapis.com/google.rpc.ErrorInfo", "reason": "API_KEY_INVALID"}]}})
+        if api.sortear_erro():
+            api.estatisticas.registrar(endpoint, 500, chave=chave)
+            return self._responder(500, {"error": {"code": 500, "message": "Backend Error"}})
+
+        if endpoint == "search":
+            status, corpo, headers = 200, api.search(params), None
+        else:
+            status, corpo, headers = api.videos(params, self.headers.get("If-None-Match"))
+        if not api.estatisticas.registrar(endpoint, status, api.quota_diaria, chave):
+            return self._responder(403, {"error": {"code": 403, "message": "quota exceeded", "errors": [
+                {"domain": "youtube.quota", "reason": "quotaExceeded"}]}})
+        self._responder(status, corpo, headers)
+
+
+class ApiFalsa:
+    """API falsa em uma thread; use iniciar()/parar() ou como context manager"""
+
+    def __init__(self, porta=0, latencia=0.05, jitter=0.0, taxa_erro=0.0, eventos_por_canal=4, semente=42,
+                 quota_diaria=None, uploads_por_canal=6, feed_disponivel=True, chaves_invalidas=()):
+        """
+        Args:
+            porta: Porta local (0 = escolher uma livre)
+            latencia: Latência base (s) de cada resposta
+            jitter: Variação aleatória (s) somada à latência
+            taxa_erro: Fração (0-1) das requisições que retornam HTTP 500
+            eventos_por_canal: Eventos sintéticos de cada canal
+            quota_diaria: Unidades aceitas de cada chave antes de responder 403 quotaExceeded (None = sem limite)
+            uploads_por_canal: Uploads comuns (sem transmissão) de cada canal no feed
+            feed_disponivel: False faz o feed responder 404 (testa a volta ao search.list)
+            chaves_invalidas: Chaves recusadas com 400 API_KEY_INVALID (testa o pool de chaves)
+        """
+        self.latencia = latencia
+        self.quota_diaria = quota_diaria
+        self.jitter = jitter
+        self.taxa_erro = taxa_erro
+        self.feed_disponivel = feed_disponivel
+        self.chaves_invalidas = set(chaves_invalidas)
+        self.populacao = PopulacaoSintetica(eventos_por_canal, semente, uploads_por_canal)
+        self.estatisticas = EstatisticasApi()
+        self._rnd = random.Random(semente)
+        self._lock_rnd = threading.Lock()
+
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", porta), _Handler)
+        self.servidor.daemon_threads = True
+        self.servidor.api = self
+        self.porta = self.servidor.server_address[1]
+        self._thread = None
+
+    def aguardar_latencia(self):
+        with self._lock_rnd:
+            atraso = self.latencia + (self._rnd.random() * self.jitter if self.jitter else 0)
+        if atraso > 0:
+            time.sleep(atraso)
+
+    def sortear_erro(self):
+        if not self.taxa_erro:
+            return False
+        with self._lock_rnd:
+            return self._rnd.random() < self.taxa_erro
+
+    def search(self, params):
+        """search.list: eventos do canal no eventType pedido (máx. maxResults)"""
+        tipo = params.get("eventType")
+        limite = int(params.get("maxResults", 5))
+        itens = [
+            {"kind": "youtube#searchResult",
+             "id": {"kind": "youtube#video", "videoId": ev["videoId"]},
+             "snippet": {"channelId": params.get("channelId"), "title": ev["title"],
+                         "liveBroadcastContent": ev["estado"]}}
+            for ev in self.populacao.eventos(params.get("channelId", ""))
+            if ev["estado"] == tipo
+        ][:limite]
+        return {"kind": "youtube#searchListResponse", "items": itens,
+                "pageInfo": {"totalResults": len(itens), "resultsPerPage": limite}}
+
+    def videos(self, params, if_none_match=None):
+        """videos.list: liveStreamingDetails dos IDs pedidos; 304 se o ETag não mudou"""
+        itens = []
+        for vid in params.get("id", "").split(","):
+            ev = self.populacao.video(vid)
+            if ev:
+                item = {"kind": "youtube#video", "id": vid}
+                if ev["detalhes"]:
+                    item["liveStreamingDetails"] = ev["detalhes"]
+                itens.append(item)
+        etag = '"' + hashlib.md5(json.dumps(itens, sort_keys=True).encode()).hexdigest() + '"'
+        if if_none_match == etag:
+            return 304, None, {"ETag": etag}
+        return 200, {"kind": "youtube#videoListResponse", "etag": etag, "items": itens}, {"ETag": etag}
+
+    def feed(self, channel_id):
+        """Feed Atom de uploads do canal, no formato de youtube.com/feeds/videos.xml"""
+        entradas = "".join(
+            f"<entry><id>yt:video:{v['videoId']}</id><yt:videoId>{v['videoId']}</yt:videoId>"
+            f"<yt:channelId>{escape(channel_id)}</yt:channelId><title>{escape(v['title'])}</title>"
+            f"<link rel=\"alternate\" href=\"https://www.youtube.com/watch?v={v['videoId']}\"/>"
+            f"<published>{_iso(self.populacao.inicio)}</published></entry>"
+            for v in self.populacao.feed(channel_id)
+        )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" xmlns="http://www.w3.org/2005/Atom">'
+            f"<yt:channelId>{escape(channel_id)}</yt:channelId><title>{escape(channel_id)}</title>"
+            f"{entradas}</feed>"
+        ).encode("utf-8")
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self.servidor.serve_forever, daemon=True, name="api-falsa")
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.parar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--porta", type=int, default=8085)
+    parser.add_argument("--latencia", type=float, default=50, help="latência base (ms)")
+    parser.add_argument("--jitter", type=float, default=0, help="variação aleatória (ms)")
+    parser.add_argument("--taxa-erro", type=float, default=0.0, help="fração de respostas HTTP 500")
+    parser.add_argument("--eventos", type=int, default=4, help="eventos sintéticos por canal")
+    parser.add_argument("--quota", type=int, default=None, help="quota diária (unidades) antes do 403")
+    parser.add_argument("--uploads", type=int, default=6, help="uploads comuns por canal no feed")
+    parser.add_argument("--sem-feed", action="store_true", help="feed de uploads responde 404")
+    parser.add_argument("--chave-invalida", action="append", default=[], help="chave recusada (pode repetir)")
+    args = parser.parse_args()
+
+    api = ApiFalsa(args.porta, args.latencia / 1000, args.jitter / 1000, args.taxa_erro, args.eventos,
+                   quota_diaria=args.quota, uploads_por_canal=args.uploads, feed_disponivel=not args.sem_feed,
+                   chaves_invalidas=args.chave_invalida)
+    print(f"API falsa em http://127.0.0.1:{api.porta}/youtube/v3/ (Ctrl+C para sair)")
+    try:
+        api.servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
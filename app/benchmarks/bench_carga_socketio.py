@@ -0,0 +1,186 @@
+"""
+bench_carga_socketio.py - Memória por conexão e latência de fan-out do Socket.IO
+
+Para cada async_mode e quantidade de clientes, inicia benchmarks.servidor_carga
+em um subprocesso, conecta N clientes WebSocket (protocolo Engine.IO v4, todos
+atendidos por uma única thread com selectors) e mede:
+    - memória residente do servidor por conexão
+    - latência entre o emit do servidor e o recebimento em cada cliente (p50/p95/máx)
+
+Uso (a partir de app/, requer websocket-client e, para eventlet, o pacote eventlet):
+    python -m benchmarks.bench_carga_socketio [--modos threading,eventlet] [--clientes 1000,5000] [--rodadas 5]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import selectors
+import subprocess
+
+import websocket
+
+from benchmarks.medicoes import porta_livre, percentil, http_json
+
+
+def aumentar_limite_arquivos(necessario):
+    """Eleva o limite de descritores abertos (soft) até o hard, se preciso"""
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < necessario:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (min(necessario, hard), hard))
+    except Exception:
+        pass
+
+
+def iniciar_servidor(modo, porta, pasta):
+    """Inicia benchmarks.servidor_carga com o async_mode informado"""
+    caminho_config = os.path.join(pasta, f"config_{modo}.yaml")
+    with open(caminho_config, "w", encoding="utf-8") as f:
+        f.write(f'async_mode: "{modo}"\ncanais: []\n')
+    env = dict(os.environ, MONITOR_CONFIG=caminho_config,
+               PYTHONPATH=os.getcwd() + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.servidor_carga", str(porta)],
+        cwd=pasta, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            http_json(f"http://127.0.0.1:{porta}/bench/rss", timeout=1)
+            return processo
+        except Exception:
+            time.sleep(0.1)
+    processo.kill()
+    raise RuntimeError(f"Servidor ({modo}) não respondeu na porta {porta}")
+
+
+class Clientes:
+    """N conexões Engine.IO/Socket.IO atendidas por um único loop com selectors"""
+
+    def __init__(self, porta):
+        self.url = f"ws://127.0.0.1:{porta}/socket.io/?EIO=4&transport=websocket"
+        self.seletor = selectors.DefaultSelector()
+        self.conexoes = []
+        self.recebidos = {}  # t do envio -> [instantes de recebimento]
+
+    def conectar(self, quantidade):
+        for _ in range(quantidade):
+            ws = websocket.create_connection(self.url, timeout=30)
+            ws.recv()          # 0{...} handshake Engine.IO
+            ws.send("40")      # conectar ao namespace "/"
+            self.conexoes.append(ws)
+            self.seletor.register(ws.sock, selectors.EVENT_READ, ws)
+        # Aguardar a confirmação "40{...}" de todos
+        pendentes = set(self.conexoes)
+        limite = time.time() + 60
+        while pendentes and time.time() < limite:
+            for chave, _ in self.seletor.select(timeout=1):
+                ws = chave.data
+                mensagem = self._ler(ws)
+                if mensagem and mensagem.startswith("40"):
+                    pendentes.discard(ws)
+        return len(self.conexoes) - len(pendentes)
+
+    def _ler(self, ws):
+        try:
+            mensagem = ws.recv()
+        except Exception:
+            return None
+        if mensagem == "2":
+            ws.send("3")  # pong
+            return None
+        if mensagem.startswith('42["bench"'):
+            agora = time.time()
+            dados = json.loads(mensagem[2:])[1]
+            self.recebidos.setdefault(dados["t"], []).append(agora)
+        return mensagem
+
+    def aguardar(self, enviado_em, timeout=60):
+        """Processa mensagens até todos receberem o broadcast `enviado_em`"""
+        limite = time.time() + timeout
+        while len(self.recebidos.get(enviado_em, [])) < len(self.conexoes) and time.time() < limite:
+            for chave, _ in self.seletor.select(timeout=0.5):
+                self._ler(chave.data)
+        return [r - enviado_em for r in self.recebidos.get(enviado_em, [])]
+
+    def fechar(self):
+        for ws in self.conexoes:
+            try:
+                self.seletor.unregister(ws.sock)
+                ws.close()
+            except Exception:
+                pass
+        self.conexoes = []
+
+
+def medir(modo, qtd_clientes, rodadas, pasta):
+    porta = porta_livre()
+    servidor = iniciar_servidor(modo, porta, pasta)
+    clientes = Clientes(porta)
+    try:
+        rss_inicial = http_json(f"http://127.0.0.1:{porta}/bench/rss")["rss"]
+        inicio = time.time()
+        conectados = clientes.conectar(qtd_clientes)
+        tempo_conexao = time.time() - inicio
+        time.sleep(1)
+        rss_final = http_json(f"http://127.0.0.1:{porta}/bench/rss")["rss"]
+
+        latencias = []
+        duracoes_emit = []
+        for _ in range(rodadas):
+            resposta = http_json(f"http://127.0.0.1:{porta}/bench/broadcast")
+            duracoes_emit.append(resposta["duracao_emit"])
+            latencias.append(clientes.aguardar(resposta["t"]))
+            time.sleep(0.2)
+
+        todas = [x for rodada in latencias for x in rodada]
+        completas = [max(rodada) for rodada in latencias if rodada]
+        return {
+            "modo": modo,
+            "clientes": conectados,
+            "conexao_s": tempo_conexao,
+            "kb_por_conexao": (rss_final - rss_inicial) / max(conectados, 1) / 1024,
+            "rss_mb": rss_final / 1024 / 1024,
+            "emit_ms": 1000 * sum(duracoes_emit) / len(duracoes_emit),
+            "p50_ms": 1000 * percentil(todas, 50),
+            "p95_ms": 1000 * percentil(todas, 95),
+            "fanout_ms": 1000 * (sum(completas) / len(completas)) if completas else float("nan"),
+            "entregues": sum(len(r) for r in latencias),
+            "esperados": conectados * rodadas,
+        }
+    finally:
+        clientes.fechar()
+        servidor.kill()
+        servidor.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modos", default="threading,eventlet")
+    parser.add_argument("--clientes", default="1000,5000")
+    parser.add_argument("--rodadas", type=int, default=5)
+    args = parser.parse_args()
+
+    quantidades = [int(q) for q in args.clientes.split(",")]
+    aumentar_limite_arquivos(2 * max(quantidades) + 256)
+
+    print(f"{'modo':<10} {'clientes':>8} {'conexão(s)':>10} {'KB/conn':>8} {'RSS(MB)':>8} "
+          f"{'emit(ms)':>9} {'p50(ms)':>8} {'p95(ms)':>8} {'fan-out(ms)':>11} {'entregues':>12}")
+    with tempfile.TemporaryDirectory() as pasta:
+        for modo in args.modos.split(","):
+            for qtd in quantidades:
+                try:
+                    r = medir(modo, qtd, args.rodadas, pasta)
+                except Exception as e:
+                    print(f"{modo:<10} {qtd:>8} erro: {e}")
+                    continue
+                print(f"{r['modo']:<10} {r['clientes']:>8} {r['conexao_s']:>10.1f} {r['kb_por_conexao']:>8.1f} "
+                      f"{r['rss_mb']:>8.1f} {r['emit_ms']:>9.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+                      f"{r['fanout_ms']:>11.1f} {r['entregues']:>5}/{r['esperados']:<6}")
+
+
+if __name__ == "__main__":
+    main()
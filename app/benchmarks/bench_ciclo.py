@@ -0,0 +1,141 @@
+"""
+bench_ciclo.py - Desempenho de run_cycle contra a API falsa (benchmarks.api_falsa)
+
+Para cada quantidade de canais, executa o YouTubeWebManager em um subprocesso
+(config.yaml gerado, via MONITOR_CONFIG) apontado para a API falsa local e
+força todos os canais a vencer a cada ciclo. O primeiro ciclo é "frio"
+(search.list para todos os canais); os seguintes só atualizam status
+(videos.list em lotes, cache e ETags). Para cada ciclo informa:
+    - tempo de parede
+    - requisições à API e unidades de quota
+    - respostas 304 e erros
+    - memória residente do processo
+
+Uso (a partir de app/):
+    python -m benchmarks.bench_ciclo [--canais 10,100,1000] [--ciclos 3] [--pausa 0] [--latencia 50] [--taxa-erro 0.0] [--descoberta feed|search]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+from benchmarks.api_falsa import ApiFalsa
+from benchmarks.medicoes import memoria_residente, http_json
+
+
+def escrever_config(pasta, qtd_canais, porta_api, workers, descoberta="feed"):
+    """Gera o config.yaml do subprocesso com `qtd_canais` canais sintéticos"""
+    linhas = [
+        'youtube_api_key: "chave-falsa"',
+        'youtube_api_host: "127.0.0.1"',
+        f"youtube_api_porta: {porta_api}",
+        "youtube_api_https: false",
+        'feed_host: "127.0.0.1"',
+        f"feed_porta: {porta_api}",
+        "feed_https: false",
+        f"descoberta: {descoberta}",
+        f"workers_polling: {workers}",
+        "timeout_canal: 600",
+        "log_cores: false",
+        f'banco_pesquisas: "{os.path.join(pasta, "pesquisas.db")}"',
+        "canais:",
+    ]
+    for i in range(qtd_canais):
+        linhas.append(f'  - nome: "Canal {i}"')
+        linhas.append(f'    channel_id: "UCbench{i:017d}"')
+    caminho = os.path.join(pasta, "config.yaml")
+    with open(caminho, "w", encoding="utf-8") as f:
+        f.write("\n".join(linhas) + "\n")
+    return caminho
+
+
+def executar_filho(porta_api, ciclos, pausa, saida):
+    """Executado no subprocesso: roda os ciclos e grava as medições em `saida`"""
+    from log_config import setup_logger
+    from youtube_web_manager import YouTubeWebManager
+
+    setup_logger()  # avisos vão para logs/main.log da pasta temporária
+
+    url_estatisticas = f"http://127.0.0.1:{porta_api}/_estatisticas"
+    rss_base = memoria_residente()
+    manager = YouTubeWebManager()
+    resultados = []
+    try:
+        for i in range(ciclos):
+            if i and pausa:
+                time.sleep(pausa)
+            for canal in manager.canais:
+                manager.agendador.agendar(canal, 0)
+            http_json(url_estatisticas + "?zerar=1")
+            inicio = time.perf_counter()
+            manager.run_cycle()
+            duracao = time.perf_counter() - inicio
+            estatisticas = http_json(url_estatisticas)
+            estatisticas.update(duracao=duracao, rss=memoria_residente())
+            resultados.append(estatisticas)
+    finally:
+        manager.encerrar()
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump({"rss_base": rss_base, "ciclos": resultados}, f)
+
+
+def medir(qtd_canais, ciclos, pausa, api, workers, descoberta):
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho_config = escrever_config(pasta, qtd_canais, api.porta, workers, descoberta)
+        saida = os.path.join(pasta, "resultado.json")
+        app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, MONITOR_CONFIG=caminho_config,
+                   PYTHONPATH=app_dir + os.pathsep + os.environ.get("PYTHONPATH", ""))
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_ciclo", "--filho", saida,
+             "--porta-api", str(api.porta), "--ciclos", str(ciclos), "--pausa", str(pausa)],
+            cwd=pasta, env=env, stdout=subprocess.DEVNULL, check=True,
+        )
+        with open(saida, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--canais", default="10,100,1000")
+    parser.add_argument("--ciclos", type=int, default=3)
+    parser.add_argument("--pausa", type=float, default=0, help="segundos entre ciclos (deixa o cache expirar)")
+    parser.add_argument("--latencia", type=float, default=50, help="latência da API falsa (ms)")
+    parser.add_argument("--jitter", type=float, default=20, help="variação da latência (ms)")
+    parser.add_argument("--taxa-erro", type=float, default=0.0)
+    parser.add_argument("--eventos", type=int, default=4, help="eventos sintéticos por canal")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--descoberta", choices=("feed", "search"), default="feed",
+                        help="origem dos eventos novos (feed de uploads ou search.list)")
+    parser.add_argument("--filho", help=argparse.SUPPRESS)
+    parser.add_argument("--porta-api", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        return executar_filho(args.porta_api, args.ciclos, args.pausa, args.filho)
+
+    print(f"API falsa: latência {args.latencia:.0f}±{args.jitter:.0f} ms, erro {args.taxa_erro:.1%}, "
+          f"{args.eventos} eventos/canal, {args.workers} workers, descoberta por {args.descoberta}")
+    print(f"{'canais':>7} {'ciclo':>6} {'tempo(s)':>9} {'requisições':>12} {'quota':>7} "
+          f"{'304':>5} {'erros':>6} {'RSS(MB)':>8} {'ΔRSS(MB)':>9}")
+    with ApiFalsa(latencia=args.latencia / 1000, jitter=args.jitter / 1000,
+                  taxa_erro=args.taxa_erro, eventos_por_canal=args.eventos) as api:
+        for qtd in [int(q) for q in args.canais.split(",")]:
+            try:
+                resultado = medir(qtd, args.ciclos, args.pausa, api, args.workers, args.descoberta)
+            except Exception as e:
+                print(f"{qtd:>7} erro: {e}")
+                continue
+            for i, c in enumerate(resultado["ciclos"], 1):
+                tipo = "frio" if i == 1 else str(i)
+                print(f"{qtd:>7} {tipo:>6} {c['duracao']:>9.2f} {c['requisicoes']:>12} {c['quota']:>7} "
+                      f"{c['nao_modificados']:>5} {c['erros']:>6} {c['rss'] / 2**20:>8.1f} "
+                      f"{(c['rss'] - resultado['rss_base']) / 2**20:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
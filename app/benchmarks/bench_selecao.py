@@ -0,0 +1,139 @@
+"""
+bench_selecao.py - Custo da filtragem + seleção de stream por ciclo
+
+Compara a seleção antiga (dicts com dt.fromisoformat a cada ciclo) com a
+seleção sobre Eventos pré-processados (epochs calculados na entrada).
+
+Uso (a partir de app/):
+    python -m benchmarks.bench_selecao [canais] [eventos_por_canal] [repeticoes]
+"""
+
+import sys
+import time
+import random
+from datetime import datetime as dt, timezone, timedelta
+
+from eventos import Evento, selecionar
+
+
+def selecionar_dicts(eventos, agora):
+    """Seleção no formato antigo: dicts + parse ISO a cada chamada"""
+    eventos_filtrados = []
+    for evento in eventos:
+        if evento.get("actualEndTime"):
+            continue
+        sched = evento.get("scheduledStartTime")
+        if sched:
+            try:
+                sched_dt = dt.fromisoformat(sched.replace("Z", "+00:00"))
+                if sched_dt.date() < agora.date():
+                    continue
+            except Exception:
+                pass
+        eventos_filtrados.append(evento)
+
+    melhor_evento = None
+    menor_delta = None
+    for evento in eventos_filtrados:
+        is_live = False
+        if evento.get("actualStartTime") and not evento.get("actualEndTime"):
+            is_live = True
+            try:
+                inicio = dt.fromisoformat(evento["actualStartTime"].replace("Z", "+00:00"))
+            except Exception:
+                inicio = agora
+        elif evento.get("scheduledStartTime") and not evento.get("actualEndTime"):
+            try:
+                sched_dt = dt.fromisoformat(evento["scheduledStartTime"].replace("Z", "+00:00"))
+                if sched_dt <= agora:
+                    is_live = True
+                    inicio = sched_dt
+            except Exception:
+                pass
+        if is_live:
+            delta = abs((agora - inicio).total_seconds())
+            if menor_delta is None or delta < menor_delta:
+                melhor_evento = evento
+                menor_delta = delta
+
+    if not melhor_evento:
+        menor_delta = None
+        for evento in eventos_filtrados:
+            sched = evento.get("scheduledStartTime")
+            if sched:
+                try:
+                    inicio = dt.fromisoformat(sched.replace("Z", "+00:00"))
+                    if inicio > agora:
+                        delta = (inicio - agora).total_seconds()
+                        if menor_delta is None or delta < menor_delta:
+                            melhor_evento = evento
+                            menor_delta = delta
+                except Exception:
+                    continue
+    return melhor_evento
+
+
+def gerar_eventos(qtd_canais, qtd_eventos, agora, semente=42):
+    """Gera eventos sintéticos (ao vivo, agendados, encerrados) por canal"""
+    rnd = random.Random(semente)
+    iso = lambda d: d.strftime("%Y-%m-%dT%H:%M:%SZ")
+    canais = []
+    for c in range(qtd_canais):
+        eventos = []
+        for e in range(qtd_eventos):
+            tipo = rnd.random()
+            desloc = timedelta(minutes=rnd.randint(-600, 6000))
+            eventos.append({
+                "videoId": f"v{c}_{e}",
+                "title": f"Evento {e}",
+                "url": f"https://www.youtube.com/watch?v=v{c}_{e}",
+                "actualStartTime": iso(agora - abs(desloc)) if tipo < 0.1 else None,
+                "scheduledStartTime": iso(agora + desloc),
+                "actualEndTime": iso(agora) if tipo > 0.9 else None,
+            })
+        canais.append(eventos)
+    return canais
+
+
+def medir(funcao, repeticoes):
+    """Retorna o menor tempo (s) entre as repetições"""
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        duracao = time.perf_counter() - inicio
+        melhor = duracao if melhor is None else min(melhor, duracao)
+    return melhor
+
+
+def main():
+    qtd_canais = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    qtd_eventos = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    repeticoes = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    agora_dt = dt.now(timezone.utc)
+    agora = agora_dt.timestamp()
+    canais_dicts = gerar_eventos(qtd_canais, qtd_eventos, agora_dt)
+
+    inicio = time.perf_counter()
+    canais_eventos = [[Evento.de_dict(ev) for ev in eventos] for eventos in canais_dicts]
+    ingestao = time.perf_counter() - inicio
+
+    # Conferir que as duas seleções concordam
+    for dicts, eventos in zip(canais_dicts, canais_eventos):
+        antigo = selecionar_dicts(dicts, agora_dt)
+        novo = selecionar(eventos, agora)
+        assert (antigo and antigo["videoId"]) == (novo and novo.video_id), (antigo, novo)
+
+    t_antigo = medir(lambda: [selecionar_dicts(evs, agora_dt) for evs in canais_dicts], repeticoes)
+    t_novo = medir(lambda: [selecionar(evs, agora) for evs in canais_eventos], repeticoes)
+
+    print(f"{qtd_canais} canais x {qtd_eventos} eventos ({qtd_canais * qtd_eventos} eventos)")
+    print(f"  ingestão (parse único):      {ingestao * 1000:9.1f} ms")
+    print(f"  seleção antiga (dicts/ISO):  {t_antigo * 1000:9.1f} ms por ciclo")
+    print(f"  seleção nova (Evento/epoch): {t_novo * 1000:9.1f} ms por ciclo")
+    print(f"  ganho por ciclo:             {t_antigo / t_novo:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
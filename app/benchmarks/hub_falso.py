@@ -0,0 +1,172 @@
+"""
+hub_falso.py - Hub WebSub (PubSubHubbub) local para testar o callback /websub
+
+Aceita pedidos de assinatura (POST form-urlencoded), confirma cada um com a
+verificação de intenção (GET no callback com hub.challenge) e publica
+notificações Atom assinadas com X-Hub-Signature, como o hub do YouTube.
+
+Uso (a partir de app/):
+    python -m benchmarks.hub_falso [--porta 8086]
+    curl "http://127.0.0.1:8086/_publicar?channel_id=UC...&video_id=abc&titulo=Live"
+
+Com a API falsa (benchmarks.api_falsa) servindo feed e videos.list, use no config.yaml:
+    websub:
+      callback: "http://127.0.0.1:5000/websub"
+      hub: "http://127.0.0.1:8086/subscribe"
+      segredo: "teste"
+"""
+
+import hmac
+import time
+import random
+import string
+import hashlib
+import argparse
+import threading
+import urllib.request
+from datetime import datetime as dt, timezone
+from xml.sax.saxutils import escape
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, urlencode
+
+from websub import channel_do_topico, TOPICO_CANAL
+
+
+def atom_notificacao(channel_id, video_id, titulo):
+    """Corpo Atom de uma notificação do hub do YouTube para um vídeo"""
+    agora = dt.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S+00:00")
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" xmlns="http://www.w3.org/2005/Atom">'
+        f'<link rel="hub" href="https://pubsubhubbub.appspot.com"/>'
+        f"<link rel=\"self\" href=\"{escape(TOPICO_CANAL.format(channel_id=channel_id))}\"/>"
+        f"<title>YouTube video feed</title><updated>{agora}</updated>"
+        f"<entry><id>yt:video:{escape(video_id)}</id><yt:videoId>{escape(video_id)}</yt:videoId>"
+        f"<yt:channelId>{escape(channel_id)}</yt:channelId><title>{escape(titulo)}</title>"
+        f"<published>{agora}</published><updated>{agora}</updated></entry>"
+        "</feed>"
+    ).encode("utf-8")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, status, texto=""):
+        dados = texto.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; charset=UTF-8")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_POST(self):
+        if urlsplit(self.path).path != "/subscribe":
+            return self._responder(404, "Not Found")
+        tamanho = int(self.headers.get("Content-Length", 0))
+        form = {k: v[0] for k, v in parse_qs(self.rfile.read(tamanho).decode("utf-8")).items()}
+        if not form.get("hub.callback") or not channel_do_topico(form.get("hub.topic", "")):
+            return self._responder(400, "hub.callback e hub.topic obrigatórios")
+        self._responder(202, "Accepted")
+        # Verificação assíncrona, como o hub real
+        threading.Thread(target=self.server.hub.verificar, args=(form,), daemon=True).start()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == "/_publicar":
+            entregues = self.server.hub.publicar(params.get("channel_id", ""), params.get("video_id", ""),
+                                                 params.get("titulo", "Nova live"))
+            return self._responder(200, f"{entregues} entrega(s)\n")
+        self._responder(404, "Not Found")
+
+
+class HubFalso:
+    """Hub em uma thread; use iniciar()/parar() ou como context manager"""
+
+    def __init__(self, porta=0, atraso_verificacao=0.05):
+        self.atraso_verificacao = atraso_verificacao
+        self.assinaturas = {}  # (callback, channel_id) -> {segredo, expira_em}
+        self.verificacoes = []  # [(modo, channel_id, confirmada)]
+        self._lock = threading.Lock()
+
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", porta), _Handler)
+        self.servidor.daemon_threads = True
+        self.servidor.hub = self
+        self.porta = self.servidor.server_address[1]
+        self.url = f"http://127.0.0.1:{self.porta}/subscribe"
+
+    def verificar(self, form):
+        """Verificação de intenção: GET no callback, que deve ecoar o desafio"""
+        time.sleep(self.atraso_verificacao)
+        modo = form.get("hub.mode")
+        channel_id = channel_do_topico(form["hub.topic"])
+        lease = int(form.get("hub.lease_seconds") or 432000)
+        desafio = "".join(random.choices(string.ascii_letters, k=16))
+        consulta = urlencode({"hub.mode": modo, "hub.topic": form["hub.topic"],
+                              "hub.challenge": desafio, "hub.lease_seconds": lease})
+        try:
+            with urllib.request.urlopen(f"{form['hub.callback']}?{consulta}", timeout=5) as r:
+                confirmada = 200 <= r.status < 300 and r.read().decode("utf-8") == desafio
+        except Exception:
+            confirmada = False
+        with self._lock:
+            self.verificacoes.append((modo, channel_id, confirmada))
+            chave = (form["hub.callback"], channel_id)
+            if confirmada and modo == "subscribe":
+                self.assinaturas[chave] = {"segredo": form.get("hub.secret"), "expira_em": time.time() + lease}
+            elif confirmada and modo == "unsubscribe":
+                self.assinaturas.pop(chave, None)
+
+    def publicar(self, channel_id, video_id, titulo="Nova live"):
+        """Entrega a notificação do vídeo a todos os assinantes do canal; retorna quantas entregas tiveram 2xx"""
+        corpo = atom_notificacao(channel_id, video_id, titulo)
+        with self._lock:
+            destinos = [(callback, dados["segredo"]) for (callback, canal), dados in self.assinaturas.items()
+                        if canal == channel_id and dados["expira_em"] > time.time()]
+        entregues = 0
+        for callback, segredo in destinos:
+            headers = {"Content-Type": "application/atom+xml"}
+            if segredo:
+                headers["X-Hub-Signature"] = "sha1=" + hmac.new(segredo.encode("utf-8"), corpo, hashlib.sha1).hexdigest()
+            try:
+                with urllib.request.urlopen(urllib.request.Request(callback, corpo, headers), timeout=5) as r:
+                    entregues += 200 <= r.status < 300
+            except Exception:
+                pass
+        return entregues
+
+    def iniciar(self):
+        threading.Thread(target=self.servidor.serve_forever, daemon=True, name="hub-falso").start()
+        return self
+
+    def parar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.parar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--porta", type=int, default=8086)
+    args = parser.parse_args()
+
+    hub = HubFalso(args.porta)
+    print(f"Hub falso em {hub.url} (Ctrl+C para sair)")
+    try:
+        hub.servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        hub.servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
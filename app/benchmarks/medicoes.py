@@ -0,0 +1,41 @@
+"""
+medicoes.py - Funções auxiliares compartilhadas pelos benchmarks
+"""
+
+import json
+import socket
+import urllib.request
+
+
+def memoria_residente():
+    """Retorna a memória residente (RSS) do processo em bytes"""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for linha in f:
+                if linha.startswith("VmRSS:"):
+                    return int(linha.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def porta_livre():
+    """Retorna uma porta TCP livre em 127.0.0.1"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentil(valores, p):
+    """Percentil `p` (0-100) por vizinho mais próximo; NaN se vazio"""
+    if not valores:
+        return float("nan")
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))]
+
+
+def http_json(url, timeout=30):
+    """GET simples que retorna o corpo JSON decodificado"""
+    with urllib.request.urlopen(url, timeout=timeout) as res:
+        return json.loads(res.read().decode("utf-8"))
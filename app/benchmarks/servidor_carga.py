@@ -0,0 +1,54 @@
+"""
+servidor_carga.py - server_web sem polling, com rotas auxiliares para o benchmark de carga
+
+Usa o async_mode do config.yaml indicado em MONITOR_CONFIG. Rotas extras:
+    GET /bench/rss        -> memória residente do processo (bytes)
+    GET /bench/broadcast  -> emite 'bench' para todos os clientes com o horário do envio
+
+Uso (normalmente iniciado por benchmarks.bench_carga_socketio):
+    MONITOR_CONFIG=... python -m benchmarks.servidor_carga <porta>
+"""
+
+import sys
+
+import server_web
+from server_web import app, socketio, connected_clients, config
+from flask import jsonify
+from benchmarks.medicoes import memoria_residente
+
+
+# Payload equivalente a um streams_patch com vários canais alterados
+PAYLOAD = {
+    f"UC{i:022d}": {
+        "channel_id": f"UC{i:022d}",
+        "nome": f"Canal {i}",
+        "selected_stream": {
+            "videoId": f"video{i:06d}",
+            "title": f"Transmissão ao vivo {i}",
+            "url": f"https://www.youtube.com/watch?v=video{i:06d}",
+            "actualStartTime": "2025-12-12T15:00:00Z",
+            "scheduledStartTime": "2025-12-12T15:00:00Z",
+            "actualEndTime": None,
+        },
+    }
+    for i in range(config.get("bench_canais", 30))
+}
+
+
+@app.route('/bench/rss')
+def bench_rss():
+    return jsonify({'rss': memoria_residente(), 'clientes': len(connected_clients)})
+
+
+@app.route('/bench/broadcast')
+def bench_broadcast():
+    import time
+    enviado_em = time.time()
+    socketio.emit('bench', {'t': enviado_em, 'changed': PAYLOAD}, namespace='/')
+    return jsonify({'t': enviado_em, 'duracao_emit': time.time() - enviado_em})
+
+
+if __name__ == '__main__':
+    porta = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    server_web.log_terminal(f"Servidor de carga em 127.0.0.1:{porta} (async_mode={server_web.ASYNC_MODE})", cor='cyan')
+    server_web.run_server(host='127.0.0.1', port=porta)
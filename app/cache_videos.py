@@ -0,0 +1,128 @@
+"""
+cache_videos.py - Cache LRU com TTL dos detalhes de vídeos (videos.list)
+O TTL depende do estado do vídeo: encerrados ficam em cache para sempre,
+ao vivo por pouco tempo e agendados distantes por mais tempo. Também guarda
+o ETag de cada lote para requisições condicionais (If-None-Match).
+"""
+
+import threading
+from collections import OrderedDict
+
+from eventos import para_epoch
+
+
+class CacheDetalhesVideos:
+    """
+    Cache {video_id: liveStreamingDetails} com TTL por estado e limite de tamanho (LRU).
+    """
+
+    def __init__(self, max_itens=5000, ttl_ao_vivo=60, ttl_agendado=15,
+                 ttl_agendado_distante=1800, limite_distante=6 * 3600, max_lotes=500):
+        """
+        Args:
+            max_itens: Quantidade máxima de vídeos em cache
+            ttl_ao_vivo: TTL (s) de vídeos ao vivo
+            ttl_agendado: TTL (s) de vídeos agendados para breve
+            ttl_agendado_distante: TTL (s) de vídeos agendados para depois de `limite_distante`
+            limite_distante: A partir de quantos segundos um agendamento é "distante"
+            max_lotes: Quantidade máxima de ETags de lotes guardados
+        """
+        self.max_itens = max_itens
+        self.ttl_ao_vivo = ttl_ao_vivo
+        self.ttl_agendado = ttl_agendado
+        self.ttl_agendado_distante = ttl_agendado_distante
+        self.limite_distante = limite_distante
+        self.max_lotes = max_lotes
+
+        self._itens = OrderedDict()  # video_id -> (detalhes, expira_em)
+        self._lotes = OrderedDict()  # tuple(ids) -> (etag, {video_id: detalhes})
+        self._lock = threading.Lock()
+
+        self.acertos = 0
+        self.faltas = 0
+        self.nao_modificados = 0
+
+    def _ttl(self, detalhes, agora):
+        """Retorna o TTL (s) conforme o estado do vídeo"""
+        if detalhes.get("actualEndTime") or not detalhes:
+            # Encerrado, ou upload comum (sem liveStreamingDetails): não muda mais
+            return float("inf")
+        if detalhes.get("actualStartTime"):
+            return self.ttl_ao_vivo
+        sched = para_epoch(detalhes.get("scheduledStartTime"))
+        if sched is not None and sched - agora <= self.limite_distante:
+            return self.ttl_agendado
+        return self.ttl_agendado_distante
+
+    def obter(self, video_ids, agora):
+        """
+        Separa os vídeos em cache (ainda válidos) dos que precisam ser consultados.
+
+        Returns:
+            Tupla ({video_id: detalhes} em cache, [video_ids faltantes])
+        """
+        encontrados = {}
+        faltantes = []
+        with self._lock:
+            for vid in video_ids:
+                item = self._itens.get(vid)
+                if item and item[1] > agora:
+                    self._itens.move_to_end(vid)
+                    encontrados[vid] = item[0]
+                else:
+                    faltantes.append(vid)
+            self.acertos += len(encontrados)
+            self.faltas += len(faltantes)
+        return encontrados, faltantes
+
+    def guardar(self, detalhes, agora):
+        """Guarda detalhes {video_id: liveStreamingDetails} com o TTL do estado de cada vídeo"""
+        with self._lock:
+            for vid, det in detalhes.items():
+                self._itens[vid] = (det, agora + self._ttl(det, agora))
+                self._itens.move_to_end(vid)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def invalidar(self, video_ids):
+        """Descarta os vídeos do cache (ex.: notificação de mudança recebida)"""
+        with self._lock:
+            for vid in video_ids:
+                self._itens.pop(vid, None)
+
+    def etag_lote(self, video_ids):
+        """Retorna o ETag da última resposta para exatamente esse lote (ou None)"""
+        with self._lock:
+            lote = self._lotes.get(tuple(sorted(video_ids)))
+        return lote[0] if lote else None
+
+    def guardar_lote(self, video_ids, etag, detalhes):
+        """Guarda o ETag e a resposta de um lote para requisições condicionais"""
+        if not etag:
+            return
+        chave = tuple(sorted(video_ids))
+        with self._lock:
+            self._lotes[chave] = (etag, dict(detalhes))
+            self._lotes.move_to_end(chave)
+            while len(self._lotes) > self.max_lotes:
+                self._lotes.popitem(last=False)
+
+    def resposta_lote(self, video_ids):
+        """Retorna a resposta guardada do lote após um 304 Not Modified"""
+        with self._lock:
+            self.nao_modificados += 1
+            lote = self._lotes.get(tuple(sorted(video_ids)))
+        return dict(lote[1]) if lote else {}
+
+    def estatisticas(self):
+        """Retorna contadores de acerto/falta do cache"""
+        with self._lock:
+            total = self.acertos + self.faltas
+            return {
+                "itens": len(self._itens),
+                "acertos": self.acertos,
+                "faltas": self.faltas,
+                "taxa_acerto": round(self.acertos / total, 3) if total else 0.0,
+                "nao_modificados": self.nao_modificados,
+                "lotes_com_etag": len(self._lotes),
+            }
@@ -6,64 +6,89 @@ Se você quiser, pode renomear seu canal_obs.py para canal_web.py
 ou simplesmente importar CanalOBS como está (ambas funcionam).
 """
 
-import json
-import os
-from datetime import datetime
+import threading
+from armazenamento_pesquisas import ArmazenamentoPesquisas, hash_eventos
+from eventos import Evento
 
 
 class CanalWeb:
     """
     Representa um canal YouTube a ser monitorado.
     Armazena informações do canal e cache de pesquisas.
+    
+    Os eventos atuais ficam em memória (carregados do banco uma única vez);
+    o banco só é escrito quando o conteúdo da pesquisa muda.
     """
     
-    def __init__(self, channel_id, nome):
+    def __init__(self, channel_id, nome, armazenamento=None, descoberta="feed"):
         """
         Inicializa o canal.
         
         Args:
             channel_id: ID do canal YouTube (ou None para canais especiais)
             nome: Nome exibição do canal
+            armazenamento: ArmazenamentoPesquisas compartilhado (padrão: pesquisa_api/pesquisas.db)
+            descoberta: Origem dos eventos novos: "feed" (feed de uploads, sem quota) ou "search"
         """
         self.channel_id = channel_id
         self.nome = nome
         self.browser_source_name = nome  # Mantém compatibilidade com código antigo
         self.proxima_stream_url = None
         self.selected_stream = None
+        self.ultima_pesquisa = 0  # time.time() da última pesquisa na API
+        self.ultima_atualizacao = 0  # time.time() da última atualização bem-sucedida
+        self.ativo = True  # False depois de retirado do config.yaml (recarga a quente)
+        self.descoberta = descoberta
+        
+        # Histórico de pesquisas (chave = pasta do formato antigo)
+        self.chave_pesquisa = channel_id or nome
+        self.armazenamento = armazenamento or ArmazenamentoPesquisas.padrao()
         
-        # Criar pasta de cache se não existir
-        self.pasta_pesquisa = f"pesquisa_api/{channel_id}" if channel_id else f"pesquisa_api/{nome}"
-        os.makedirs(self.pasta_pesquisa, exist_ok=True)
+        # Cache em memória da pesquisa atual
+        self._lock_eventos = threading.Lock()
+        self._eventos = [
+            Evento.de_dict(ev) for ev in self.armazenamento.ultima_pesquisa(self.chave_pesquisa)
+        ]
+        self._hash_salvo = self.armazenamento.ultimo_hash(self.chave_pesquisa)
     
     def carregar_ultima_pesquisa(self):
         """
-        Carrega o arquivo de pesquisa mais recente do canal.
-        Retorna lista de eventos ou lista vazia se não houver.
+        Retorna a pesquisa atual do canal a partir do cache em memória.
+        Retorna lista de Eventos (cópias) ou lista vazia se não houver.
         """
-        try:
-            arquivos = sorted([f for f in os.listdir(self.pasta_pesquisa) if f.endswith('.json')])
-            if not arquivos:
-                return []
-            
-            arquivo_mais_recente = os.path.join(self.pasta_pesquisa, arquivos[-1])
-            with open(arquivo_mais_recente, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception:
-            return []
+        with self._lock_eventos:
+            return [ev.copia() for ev in self._eventos]
+    
+    def adicionar_candidatos(self, eventos):
+        """
+        Acrescenta à pesquisa em memória eventos ainda desconhecidos (sem
+        gravar); a próxima atualização de status confirma os horários.
+        Retorna quantos eventos foram acrescentados.
+        """
+        with self._lock_eventos:
+            conhecidos = {ev.video_id for ev in self._eventos}
+            novos = [ev.copia() for ev in eventos if ev.video_id not in conhecidos]
+            self._eventos.extend(novos)
+        return len(novos)
     
     def salvar_pesquisa(self, eventos):
         """
-        Salva pesquisa de eventos em arquivo JSON timestamped.
+        Atualiza a pesquisa em memória e, se o conteúdo mudou,
+        agenda a gravação no histórico (gravado em lote pelo gerenciador).
         
         Args:
-            eventos: Lista de eventos (dicts)
+            eventos: Lista de Eventos
         """
+        dicts = [ev.para_dict() for ev in eventos]
+        hash_atual = hash_eventos(dicts)
+        with self._lock_eventos:
+            self._eventos = [ev.copia() for ev in eventos]
+            if hash_atual == self._hash_salvo:
+                return
+            self._hash_salvo = hash_atual
+        
         try:
-            timestamp = datetime.now().strftime("%d-%m-%Y_%H-%M-%S")
-            arquivo = os.path.join(self.pasta_pesquisa, f"{timestamp}.json")
-            
-            with open(arquivo, 'w', encoding='utf-8') as f:
-                json.dump(eventos, f, indent=2, ensure_ascii=False)
+            self.armazenamento.salvar(self.chave_pesquisa, dicts, hash_=hash_atual)
         except Exception as e:
             print(f"[Erro] Não foi possível salvar pesquisa: {e}")
     
@@ -0,0 +1,295 @@
+"""
+chaves_api.py - Pool de chaves da YouTube Data API
+Cada chave tem a sua quota diária (um GovernadorQuota por chave). A cada
+requisição, uma chave disponível é escolhida pela estratégia configurada:
+    - menos_usada: a chave com a menor fração do orçamento já gasta
+    - ponderada: round-robin ponderado pelo `peso` de cada chave
+Chaves que respondem com erro de quota, limite de taxa ou chave inválida
+são retiradas do pool até a renovação (meia-noite do Pacífico) ou até o
+fim do recuo. O pool expõe a mesma interface agregada do GovernadorQuota
+(consumido, projecao, fator_intervalo, bloqueado_ate...), somando as chaves.
+"""
+
+import os
+import time
+import hashlib
+import threading
+
+from quota import GovernadorQuota, QuotaExcedida, CUSTO_QUOTA, MOTIVOS_CHAVE_INVALIDA
+from log_config import log_terminal
+
+ESTRATEGIAS = ("menos_usada", "ponderada")
+
+
+def _resumo(valor):
+    """Identificador curto e estável de uma chave (sem expô-la)"""
+    return hashlib.sha256(valor.encode("utf-8")).hexdigest()[:8]
+
+
+def ler_chaves(cfg):
+    """
+    Normaliza `youtube_api_keys` (e a antiga `youtube_api_key`) do config.yaml.
+    Cada item pode ser a chave (texto) ou um dict {chave, nome, peso, quota_diaria}.
+
+    Returns:
+        Lista de dicts {chave, nome, peso, quota_diaria}, sem chaves repetidas
+    """
+    itens = list(cfg.get("youtube_api_keys") or [])
+    if cfg.get("youtube_api_key"):
+        itens.insert(0, cfg["youtube_api_key"])
+
+    chaves = {}
+    for item in itens:
+        if isinstance(item, str):
+            item = {"chave": item}
+        valor = item.get("chave")
+        if not valor or valor in chaves:
+            continue
+        chaves[valor] = {
+            "chave": valor,
+            # Rótulo em logs, /health e /metrics: a chave em si nunca é exibida
+            "nome": item.get("nome") or f"chave-{_resumo(valor)}",
+            "peso": max(1, int(item.get("peso", 1))),
+            "quota_diaria": item.get("quota_diaria"),
+        }
+    return list(chaves.values())
+
+
+class ChaveApi:
+    """Uma chave do pool com o seu livro-caixa de quota"""
+
+    def __init__(self, valor, nome, peso, governador):
+        self.valor = valor
+        self.nome = nome
+        self.peso = peso
+        self.governador = governador
+        self.peso_atual = 0  # estado do round-robin ponderado
+        self.reservado = 0   # unidades de requisições em andamento com a chave
+
+    def uso(self, agora=None):
+        """Fração do orçamento do dia já gasta (incluindo as requisições em andamento)"""
+        return (self.governador.consumido(agora) + self.reservado) / max(self.governador.orcamento_diario, 1)
+
+
+class PoolChavesApi:
+    """
+    Distribui as requisições entre as chaves de API disponíveis.
+
+    Uso (por requisição):
+        chave = pool.escolher("videos")     # QuotaExcedida se nenhuma estiver disponível
+        ... requisição com chave.valor ...
+        pool.registrar(chave, "videos")     # resposta recebida
+        pool.ejetar(chave, "videos", motivo)  # ou: erro de quota ou de chave
+        pool.liberar(chave, "videos")       # ou: requisição sem resposta
+    """
+
+    def __init__(self, chaves, estrategia="menos_usada", orcamento_diario=10000, reserva=0.05,
+                 fator_maximo=20, caminho=None):
+        """
+        Args:
+            chaves: Lista de ler_chaves()
+            estrategia: "menos_usada" ou "ponderada"
+            orcamento_diario: Quota diária das chaves sem `quota_diaria` própria
+            reserva: Fração do orçamento de cada chave mantida livre
+            fator_maximo: Maior multiplicador aplicado aos intervalos
+            caminho: Arquivo JSON do consumo; com várias chaves, um arquivo por
+                chave (sufixo com um resumo da chave)
+        """
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._chaves = []
+        self.configurar(chaves, estrategia, orcamento_diario, reserva, fator_maximo)
+
+    def configurar(self, chaves, estrategia="menos_usada", orcamento_diario=10000, reserva=0.05,
+                   fator_maximo=20):
+        """
+        Reconcilia o pool com uma nova lista de chaves (config recarregado):
+        chaves mantidas preservam o consumo e o bloqueio.
+        """
+        if estrategia not in ESTRATEGIAS:
+            log_terminal(f"[chaves_api] Estratégia '{estrategia}' desconhecida, usando menos_usada",
+                         level='warning', cor='yellow')
+            estrategia = "menos_usada"
+        self.estrategia = estrategia
+        self.fator_maximo = fator_maximo
+
+        with self._lock:
+            atuais = {chave.valor: chave for chave in self._chaves}
+        novas = []
+        for item in chaves:
+            chave = atuais.get(item["chave"])
+            if chave is None:
+                chave = ChaveApi(item["chave"], item["nome"], item["peso"], GovernadorQuota(
+                    caminho=self._caminho_chave(item["chave"], len(chaves))))
+            chave.nome, chave.peso = item["nome"], item["peso"]
+            chave.governador.orcamento_diario = item["quota_diaria"] or orcamento_diario
+            chave.governador.reserva = reserva
+            chave.governador.fator_maximo = fator_maximo
+            novas.append(chave)
+        with self._lock:
+            self._chaves = novas
+
+    def _caminho_chave(self, valor, total):
+        """Arquivo de quota da chave (com uma só chave, mantém o arquivo original)"""
+        if not self.caminho or total == 1:
+            return self.caminho
+        raiz, extensao = os.path.splitext(self.caminho)
+        return f"{raiz}.{_resumo(valor)}{extensao}"
+
+    @property
+    def chaves(self):
+        with self._lock:
+            return list(self._chaves)
+
+    # --- Escolha e ejeção ---------------------------------------------------
+
+    def escolher(self, endpoint, agora=None):
+        """
+        Retorna a chave para a próxima requisição ao endpoint e reserva o
+        custo dela até `registrar`, `ejetar` ou `liberar`.
+        Levanta QuotaExcedida se todas estiverem fora do pool.
+        """
+        agora = time.time() if agora is None else agora
+        with self._lock:
+            disponiveis = [c for c in self._chaves if not c.governador.bloqueado_ate(agora)]
+            if disponiveis:
+                if self.estrategia == "ponderada":
+                    # Round-robin ponderado suave: distribui sem rajadas na mesma chave
+                    total = sum(c.peso for c in disponiveis)
+                    for chave in disponiveis:
+                        chave.peso_atual += chave.peso
+                    escolhida = max(disponiveis, key=lambda c: c.peso_atual)
+                    escolhida.peso_atual -= total
+                else:
+                    # A reserva faz os workers simultâneos se espalharem pelas chaves
+                    escolhida = min(disponiveis, key=lambda c: c.uso(agora))
+                escolhida.reservado += CUSTO_QUOTA.get(endpoint, 1)
+                return escolhida
+        self.verificar(agora)
+        # Pool vazio (nenhuma chave configurada): tenta de novo no próximo minuto
+        raise QuotaExcedida("sem_chaves", agora + 60)
+
+    def liberar(self, chave, endpoint):
+        """Desfaz a reserva de uma requisição que não chegou a ser contada"""
+        with self._lock:
+            chave.reservado = max(chave.reservado - CUSTO_QUOTA.get(endpoint, 1), 0)
+
+    def registrar(self, chave, endpoint, agora=None):
+        """Registra uma requisição respondida com a chave"""
+        self.liberar(chave, endpoint)
+        chave.governador.registrar(endpoint, agora)
+
+    def ejetar(self, chave, endpoint, motivo, agora=None):
+        """
+        Retira a chave do pool após um erro de quota, limite de taxa ou chave
+        inválida (a requisição recusada não conta no consumo). Retorna o
+        instante em que ela volta.
+        """
+        self.liberar(chave, endpoint)
+        ja_fora = chave.governador.bloqueado_ate(agora)
+        liberado_em = chave.governador.registrar_erro(motivo, agora)
+        if not ja_fora:  # requisições simultâneas com a mesma chave avisam uma vez só
+            nivel, cor = ('error', 'red') if motivo in MOTIVOS_CHAVE_INVALIDA else ('warning', 'yellow')
+            log_terminal(f"[chaves_api] {chave.nome} retirada do pool ({motivo}) até "
+                         f"{time.strftime('%d/%m %H:%M:%S', time.localtime(liberado_em))}", level=nivel, cor=cor)
+        return liberado_em
+
+    # --- Interface agregada (a mesma do GovernadorQuota) --------------------
+
+    def consumido(self, agora=None):
+        """Unidades gastas no dia, somando as chaves"""
+        return sum(c.governador.consumido(agora) for c in self.chaves)
+
+    def bloqueado_ate(self, agora=None):
+        """Instante em que a primeira chave volta ao pool se todas estiverem fora, ou 0"""
+        bloqueios = [c.governador.bloqueado_ate(agora) for c in self.chaves]
+        if not bloqueios or not all(bloqueios):
+            return 0
+        return min(bloqueios)
+
+    def verificar(self, agora=None):
+        """Levanta QuotaExcedida se nenhuma chave estiver disponível agora"""
+        bloqueado = self.bloqueado_ate(agora)
+        if bloqueado:
+            raise QuotaExcedida(self._motivo_bloqueio(agora), bloqueado)
+
+    def _motivo_bloqueio(self, agora):
+        """Motivo da chave que volta primeiro (quota antes de chave inválida, no empate)"""
+        primeira = min(self.chaves, key=lambda c: (c.governador.bloqueado_ate(agora),
+                                                   c.governador.motivo_bloqueio() in MOTIVOS_CHAVE_INVALIDA))
+        return primeira.governador.motivo_bloqueio() or "orcamento_diario"
+
+    def projecao(self, agora=None):
+        """Consumo projetado até a renovação, somando as chaves"""
+        return sum(c.governador.projecao(agora) for c in self.chaves)
+
+    def fator_intervalo(self, agora=None):
+        """
+        Multiplicador dos intervalos para que a taxa recente de todas as chaves
+        caiba no orçamento restante das chaves ainda utilizáveis.
+        """
+        agora = time.time() if agora is None else agora
+        chaves = self.chaves
+        taxa = sum(c.governador.taxa_recente(agora) for c in chaves)
+        if taxa <= 0:
+            return 1.0
+        # Chaves fora do pool por erro não contam no orçamento restante
+        disponivel = sum(max(c.governador.disponivel(agora), 0) for c in chaves
+                         if not c.governador.bloqueado_ate(agora))
+        if disponivel <= 0:
+            return float(self.fator_maximo)
+        taxa_permitida = disponivel / (GovernadorQuota.proxima_renovacao(agora) - agora)
+        return min(max(taxa / taxa_permitida, 1.0), float(self.fator_maximo))
+
+    def estatisticas(self, agora=None):
+        """Estado agregado e por chave (para /health); as chaves aparecem só pelo nome"""
+        agora = time.time() if agora is None else agora
+        por_chave = []
+        por_endpoint = {}
+        dia = None
+        for chave in self.chaves:
+            dados = chave.governador.estatisticas(agora)
+            dia = dados["dia"]
+            for endpoint, unidades in dados["por_endpoint"].items():
+                por_endpoint[endpoint] = por_endpoint.get(endpoint, 0) + unidades
+            por_chave.append({
+                "nome": chave.nome,
+                "peso": chave.peso,
+                "orcamento_diario": dados["orcamento_diario"],
+                "consumido": dados["consumido"],
+                "bloqueado_ate": dados["bloqueado_ate"],
+                "motivo_bloqueio": dados["motivo_bloqueio"],
+            })
+        bloqueado = self.bloqueado_ate(agora)
+        return {
+            "dia": dia,
+            "orcamento_diario": sum(c["orcamento_diario"] for c in por_chave),
+            "consumido": sum(c["consumido"] for c in por_chave),
+            "por_endpoint": por_endpoint,
+            "projecao": round(self.projecao(agora)),
+            "fator_intervalo": round(self.fator_intervalo(agora), 2),
+            "bloqueado_ate": bloqueado or None,
+            "motivo_bloqueio": self._motivo_bloqueio(agora) if bloqueado else None,
+            "estrategia": self.estrategia,
+            "chaves": por_chave,
+        }
+
+    def salvar(self):
+        """Grava o consumo do dia de cada chave"""
+        for chave in self.chaves:
+            chave.governador.salvar()
+
+
+def criar_pool_chaves(cfg):
+    """Cria o PoolChavesApi a partir do config.yaml"""
+    chaves = ler_chaves(cfg)
+    if not chaves:
+        log_terminal("[chaves_api] Nenhuma chave em youtube_api_keys/youtube_api_key", level='warning', cor='yellow')
+    return PoolChavesApi(
+        chaves,
+        estrategia=cfg.get("estrategia_chaves", "menos_usada"),
+        orcamento_diario=cfg.get("quota_diaria", 10000),
+        reserva=cfg.get("quota_reserva", 0.05),
+        fator_maximo=cfg.get("quota_fator_maximo", 20),
+        caminho=cfg.get("arquivo_quota", "pesquisa_api/quota.json"),
+    )
@@ -1,4 +1,34 @@
+import os
 import yaml
 
-with open("config.yaml", "r", encoding="utf-8") as f:
-    config = yaml.safe_load(f)
\ No newline at end of file
+# Caminho do config.yaml (pode ser trocado pela variável de ambiente MONITOR_CONFIG)
+CONFIG_PATH = os.environ.get("MONITOR_CONFIG", "config.yaml")
+
+with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+    config = yaml.safe_load(f)
+
+
+def mtime_config():
+    """Retorna o instante da última modificação do config.yaml (ou None)"""
+    try:
+        return os.path.getmtime(CONFIG_PATH)
+    except OSError:
+        return None
+
+
+def recarregar_config():
+    """
+    Relê o config.yaml e atualiza `config` no lugar, para que todos os
+    módulos que fizeram `from config_loader import config` vejam os novos valores.
+    Grava as chaves novas antes de remover as que saíram do arquivo, assim
+    nenhuma thread lê um config vazio durante a troca.
+    Levanta exceção (e mantém a configuração atual) se o arquivo for inválido.
+    """
+    with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+        novo = yaml.safe_load(f)
+    if not isinstance(novo, dict) or not isinstance(novo.get("canais"), list):
+        raise ValueError("config.yaml inválido: esperado um mapeamento com a lista 'canais'")
+    config.update(novo)
+    for chave in [c for c in config if c not in novo]:
+        config.pop(chave, None)
+    return config
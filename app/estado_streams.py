@@ -0,0 +1,216 @@
+"""
+estado_streams.py - Estado versionado das streams para envio incremental
+Cada mudança em get_streams_data() gera uma nova versão e um patch
+(added / changed / removed) por canal; clientes atrasados fazem resync.
+O estado também é gravado em disco (snapshot) para um reinício "quente".
+"""
+
+import os
+import gzip
+import json
+import time
+import hashlib
+import threading
+from collections import deque
+
+
+class EstadoVersionado:
+    """
+    Mantém o estado atual das streams com versão monotônica
+    e um histórico limitado de patches para clientes atrasados.
+    """
+
+    def __init__(self, max_historico=50):
+        """
+        Args:
+            max_historico: Quantidade de patches mantidos para recuperação
+        """
+        self.versao = 0
+        self._streams = {}
+        self._versao_canal = {}  # channel_id -> versão da última mudança do canal
+        self._historico = deque(maxlen=max_historico)
+        self._lock = threading.Lock()
+        self._mudou = threading.Condition(self._lock)
+        self._representacao = None  # (versao, corpo, corpo_gzip, etag), calculada sob demanda
+
+    def atualizar(self, streams_data):
+        """
+        Compara o novo estado com o atual e registra as diferenças.
+
+        Args:
+            streams_data: Dict {channel_id: dados do canal} (formato de get_streams_data)
+
+        Returns:
+            Patch {version, base, added, changed, removed, prev} ou None se nada mudou;
+            prev = {channel_id: versão da mudança anterior do canal (0 se nunca existiu)}
+        """
+        with self._lock:
+            return self._registrar(streams_data)
+
+    def atualizar_canais(self, parcial):
+        """
+        Atualiza apenas os canais informados, mantendo os demais como estão
+        (resultados de canal a canal vindos da fila de envio).
+
+        Args:
+            parcial: Dict {channel_id: dados do canal, ou None para remover}
+
+        Returns:
+            Patch (como em atualizar) ou None se nada mudou
+        """
+        with self._lock:
+            streams_data = dict(self._streams)
+            for k, v in parcial.items():
+                if v is None:
+                    streams_data.pop(k, None)
+                else:
+                    streams_data[k] = v
+            return self._registrar(streams_data)
+
+    def _registrar(self, streams_data):
+        """Registra a nova versão e o patch em relação ao estado atual (com _lock)"""
+        added = {k: v for k, v in streams_data.items() if k not in self._streams}
+        changed = {
+            k: v for k, v in streams_data.items()
+            if k in self._streams and self._streams[k] != v
+        }
+        removed = [k for k in self._streams if k not in streams_data]
+
+        if not (added or changed or removed):
+            return None
+
+        patch = {
+            "version": self.versao + 1,
+            "base": self.versao,
+            "added": added,
+            "changed": changed,
+            "removed": removed,
+            "prev": {k: self._versao_canal.get(k, 0) for k in [*added, *changed, *removed]},
+        }
+        self.versao += 1
+        for k in patch["prev"]:
+            self._versao_canal[k] = self.versao
+        self._streams = dict(streams_data)
+        self._historico.append(patch)
+        self._mudou.notify_all()
+        return patch
+
+    def snapshot(self, com_versoes=False):
+        """
+        Retorna o estado completo: {version, streams}. Com `com_versoes`,
+        inclui channel_versions (versão da última mudança de cada canal),
+        para que outra instância restaure o estado sem perder as versões
+        usadas no `prev` dos 'channel_update'.
+        """
+        with self._lock:
+            snapshot = {"version": self.versao, "streams": dict(self._streams)}
+            if com_versoes:
+                snapshot["channel_versions"] = dict(self._versao_canal)
+            return snapshot
+
+    def snapshot_filtrado(self, canais):
+        """
+        Estado apenas dos canais informados (clientes com assinatura):
+        {version, streams, channel_versions}; channel_versions inclui os
+        canais assinados que não existem (versão da remoção, ou 0).
+        """
+        with self._lock:
+            return {
+                "version": self.versao,
+                "streams": {k: self._streams[k] for k in canais if k in self._streams},
+                "channel_versions": {k: self._versao_canal.get(k, 0) for k in canais},
+            }
+
+    def carregar(self, snapshot):
+        """
+        Substitui o estado por um snapshot {version, streams, channel_versions}
+        publicado por outra instância. Retorna True se a versão avançou.
+        Sem channel_versions (snapshots antigos), todos os canais ficam com a
+        versão do snapshot.
+        """
+        with self._lock:
+            if not snapshot or snapshot.get("version", 0) <= self.versao:
+                return False
+            self.versao = snapshot["version"]
+            self._streams = dict(snapshot.get("streams", {}))
+            versoes = snapshot.get("channel_versions")
+            if isinstance(versoes, dict):
+                self._versao_canal = dict(versoes)
+            else:
+                self._versao_canal = {k: self.versao for k in self._streams}
+            # Patches locais não se aplicam mais: clientes atrasados recebem o snapshot
+            self._historico.clear()
+            self._mudou.notify_all()
+            return True
+
+    def aguardar_mudanca(self, versao, timeout):
+        """
+        Bloqueia até a versão ser diferente de `versao` ou o timeout expirar.
+        Retorna a versão atual.
+        """
+        with self._mudou:
+            self._mudou.wait_for(lambda: self.versao != versao, timeout)
+            return self.versao
+
+    def representacao(self):
+        """
+        Retorna (versao, corpo_json, corpo_gzip, etag) do estado atual.
+        Calculada uma única vez por versão e reaproveitada por todas as requisições.
+        """
+        with self._lock:
+            if self._representacao and self._representacao[0] == self.versao:
+                return self._representacao
+            versao, streams = self.versao, dict(self._streams)
+        corpo = json.dumps({"version": versao, "streams": streams},
+                           ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        etag = f'"{versao}-{hashlib.sha1(corpo).hexdigest()[:16]}"'
+        representacao = (versao, corpo, gzip.compress(corpo, compresslevel=6, mtime=0), etag)
+        with self._lock:
+            if self.versao == versao:
+                self._representacao = representacao
+        return representacao
+
+    def patches_desde(self, versao):
+        """
+        Retorna os patches posteriores a `versao`, em ordem.
+        Retorna None se o histórico não cobre mais essa versão (cliente deve
+        receber o snapshot completo).
+        """
+        with self._lock:
+            if versao == self.versao:
+                return []
+            if versao > self.versao or not self._historico or self._historico[0]["base"] > versao:
+                return None
+            return [p for p in self._historico if p["base"] >= versao]
+
+
+def salvar_snapshot(caminho, snapshot, canais=None):
+    """
+    Grava o snapshot {version, streams[, channel_versions]} (e metadados de
+    agendamento dos canais, se informados) em JSON compacto, com escrita atômica.
+    """
+    dados = {
+        "version": snapshot["version"],
+        "streams": snapshot["streams"],
+        "canais": canais or {},
+        "salvo_em": time.time(),
+    }
+    if "channel_versions" in snapshot:
+        dados["channel_versions"] = snapshot["channel_versions"]
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(temporario, caminho)
+
+
+def ler_snapshot(caminho):
+    """Lê o snapshot gravado por salvar_snapshot (ou None se ausente/inválido)"""
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            dados = json.load(f)
+    except Exception:
+        return None
+    if not isinstance(dados, dict) or not isinstance(dados.get("streams"), dict):
+        return None
+    return dados
@@ -0,0 +1,145 @@
+"""
+eventos.py - Registro compacto de eventos (lives) e seleção de stream
+Os horários ISO da API são convertidos em epoch uma única vez, na entrada;
+filtragem e seleção trabalham só com números.
+"""
+
+from datetime import datetime as dt
+
+
+def para_epoch(iso):
+    """Converte data ISO 8601 da API YouTube em epoch (segundos) ou None"""
+    if not iso:
+        return None
+    try:
+        return dt.fromisoformat(iso.replace("Z", "+00:00")).timestamp()
+    except Exception:
+        return None
+
+
+class Evento:
+    """
+    Evento (live ao vivo ou agendada) de um canal.
+    Guarda os horários em epoch (`inicio`, `agendado`, `fim`) e as strings
+    originais para reenviar ao frontend.
+    """
+
+    __slots__ = (
+        "video_id", "title", "url",
+        "inicio", "agendado", "fim",
+        "actual_start", "scheduled_start", "actual_end",
+    )
+
+    def __init__(self, video_id, title=None, url=None,
+                 actual_start=None, scheduled_start=None, actual_end=None):
+        self.video_id = video_id
+        self.title = title
+        self.url = url
+        self.definir_horarios(actual_start, scheduled_start, actual_end)
+
+    def definir_horarios(self, actual_start, scheduled_start, actual_end):
+        """Atualiza os horários (strings ISO) e os converte para epoch"""
+        self.actual_start = actual_start
+        self.scheduled_start = scheduled_start
+        self.actual_end = actual_end
+        self.inicio = para_epoch(actual_start)
+        self.agendado = para_epoch(scheduled_start)
+        self.fim = para_epoch(actual_end)
+
+    def atualizar(self, live_details):
+        """Atualiza horários a partir de liveStreamingDetails (videos.list)"""
+        self.definir_horarios(
+            live_details.get("actualStartTime"),
+            live_details.get("scheduledStartTime"),
+            live_details.get("actualEndTime"),
+        )
+
+    @classmethod
+    def de_dict(cls, evento):
+        """Cria um Evento a partir do dict usado na API/histórico"""
+        return cls(
+            evento.get("videoId"),
+            evento.get("title"),
+            evento.get("url"),
+            evento.get("actualStartTime"),
+            evento.get("scheduledStartTime"),
+            evento.get("actualEndTime"),
+        )
+
+    def para_dict(self):
+        """Retorna o dict enviado ao frontend e gravado no histórico"""
+        return {
+            "videoId": self.video_id,
+            "title": self.title,
+            "url": self.url,
+            "actualStartTime": self.actual_start,
+            "scheduledStartTime": self.scheduled_start,
+            "actualEndTime": self.actual_end,
+        }
+
+    def copia(self):
+        """Retorna uma cópia independente do evento"""
+        novo = Evento.__new__(Evento)
+        for campo in Evento.__slots__:
+            setattr(novo, campo, getattr(self, campo))
+        return novo
+
+    def __repr__(self):
+        return f"Evento({self.video_id}, {self.title!r})"
+
+
+def _inicio_do_dia_utc(agora):
+    """Epoch da meia-noite UTC do dia de `agora`"""
+    return agora - (agora % 86400)
+
+
+def filtrar_validos(eventos, agora):
+    """
+    Filtra eventos que não estão encerrados e não foram agendados
+    para antes de hoje (UTC).
+    """
+    inicio_dia = _inicio_do_dia_utc(agora)
+    return [
+        ev for ev in eventos
+        if not ev.actual_end and (ev.agendado is None or ev.agendado >= inicio_dia)
+    ]
+
+
+def selecionar(eventos, agora):
+    """
+    Seleciona a melhor stream em uma única passada, priorizando:
+    1. Lives ao vivo (iniciadas ou com horário agendado já passado), a mais recente
+    2. Agendadas mais próximas
+
+    Returns:
+        Evento escolhido ou None
+    """
+    inicio_dia = _inicio_do_dia_utc(agora)
+    melhor_ao_vivo = None
+    menor_delta_ao_vivo = None
+    melhor_agendado = None
+    menor_agendado = None
+
+    for ev in eventos:
+        if ev.actual_end:
+            continue
+        agendado = ev.agendado
+        if agendado is not None and agendado < inicio_dia:
+            continue
+
+        if ev.actual_start:
+            # Horário de início inválido conta como "agora"
+            delta = abs(agora - ev.inicio) if ev.inicio is not None else 0.0
+        elif agendado is not None and agendado <= agora:
+            delta = agora - agendado
+        else:
+            if agendado is not None and (menor_agendado is None or agendado < menor_agendado):
+                melhor_agendado = ev
+                menor_agendado = agendado
+            continue
+
+        if menor_delta_ao_vivo is None or delta < menor_delta_ao_vivo:
+            melhor_ao_vivo = ev
+            menor_delta_ao_vivo = delta
+
+    return melhor_ao_vivo or melhor_agendado
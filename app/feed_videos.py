@@ -0,0 +1,55 @@
+"""
+feed_videos.py - Leitura do feed Atom público de uploads de um canal
+(https://www.youtube.com/feeds/videos.xml?channel_id=...), que não consome
+quota da API. O XML é lido de forma incremental (iterparse): cada <entry>
+é descartada assim que seus campos são extraídos.
+"""
+
+import xml.etree.ElementTree as ET
+
+NS_ATOM = "{http://www.w3.org/2005/Atom}"
+NS_YT = "{http://www.youtube.com/xml/schemas/2015}"
+
+TAG_ENTRADA = NS_ATOM + "entry"
+TAG_TITULO = NS_ATOM + "title"
+TAG_PUBLICADO = NS_ATOM + "published"
+TAG_VIDEO_ID = NS_YT + "videoId"
+TAG_CHANNEL_ID = NS_YT + "channelId"
+
+# Caminho do feed no host www.youtube.com
+CAMINHO_FEED = "/feeds/videos.xml?channel_id={channel_id}"
+
+
+def ler_feed(fluxo, max_entradas=None):
+    """
+    Extrai os vídeos de um feed Atom do YouTube.
+
+    Args:
+        fluxo: Arquivo (ou objeto com read()) com o XML
+        max_entradas: Para de ler após esse número de vídeos (None = todos)
+
+    Returns:
+        Lista de dicts {videoId, channelId, title, published}, na ordem do
+        feed, sem IDs repetidos
+
+    Raises:
+        xml.etree.ElementTree.ParseError: XML inválido
+    """
+    videos = []
+    vistos = set()
+    for _evento, elem in ET.iterparse(fluxo, events=("end",)):
+        if elem.tag != TAG_ENTRADA:
+            continue
+        video_id = elem.findtext(TAG_VIDEO_ID)
+        if video_id and video_id not in vistos:
+            vistos.add(video_id)
+            videos.append({
+                "videoId": video_id,
+                "channelId": elem.findtext(TAG_CHANNEL_ID),
+                "title": elem.findtext(TAG_TITULO),
+                "published": elem.findtext(TAG_PUBLICADO),
+            })
+        elem.clear()
+        if max_entradas and len(videos) >= max_entradas:
+            break
+    return videos
@@ -0,0 +1,52 @@
+"""
+filas.py - Fila limitada que descarta os itens mais antigos
+Liga os estágios do pipeline (consulta/seleção → envio) sem que um
+estágio lento bloqueie o anterior: o produtor nunca espera; se o
+consumidor atrasar, os itens mais antigos são descartados e contados em
+`descartados`, para que o consumidor perceba a perda e releia o estado
+completo.
+"""
+
+import threading
+from collections import deque
+
+
+class FilaDescartaAntigos:
+    """Fila thread-safe com no máximo `max_itens`; `colocar` nunca bloqueia"""
+
+    def __init__(self, max_itens=8):
+        self.max_itens = max(1, int(max_itens))
+        self._itens = deque()
+        self._cond = threading.Condition()
+        self.descartados = 0
+        self.colocados = 0
+
+    def colocar(self, item):
+        """Enfileira o item; com a fila cheia, descarta o mais antigo. Retorna True se descartou."""
+        with self._cond:
+            descartou = len(self._itens) >= self.max_itens
+            if descartou:
+                self._itens.popleft()
+                self.descartados += 1
+            self._itens.append(item)
+            self.colocados += 1
+            self._cond.notify()
+            return descartou
+
+    def retirar(self, timeout=None):
+        """Retira o item mais antigo, esperando até `timeout` segundos; None se vazia"""
+        with self._cond:
+            if not self._itens and not self._cond.wait_for(lambda: self._itens, timeout):
+                return None
+            return self._itens.popleft()
+
+    def drenar(self):
+        """Retira todos os itens pendentes (sem esperar)"""
+        with self._cond:
+            itens = list(self._itens)
+            self._itens.clear()
+            return itens
+
+    def __len__(self):
+        with self._cond:
+            return len(self._itens)
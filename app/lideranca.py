@@ -0,0 +1,346 @@
+"""
+lideranca.py - Eleição de líder entre várias instâncias do servidor
+Apenas a instância que detém o arrendamento (lease) consulta a API do
+YouTube; as demais servem o último estado publicado pelo líder e assumem
+se o arrendamento expirar. Mensagens recebidas por um seguidor e que só o
+líder processa (notificações e verificações WebSub) são encaminhadas ao
+líder por caixas nomeadas no mesmo backend.
+
+Backends:
+- redis: arrendamento com SET NX PX em um Redis compartilhado (vários hosts)
+- arquivo: arrendamento em arquivo com flock (várias instâncias na mesma máquina;
+  flock em volumes de rede como NFS não é confiável)
+- memoria: arrendamento no próprio processo (desenvolvimento/testes)
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def identificador_instancia():
+    """Retorna um identificador único desta instância (host:pid:aleatório)"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class ArrendamentoMemoria:
+    """Arrendamento e estado compartilhado dentro do mesmo processo"""
+
+    def __init__(self, duracao=60):
+        self.duracao = duracao
+        self._dono = None
+        self._expira_em = 0
+        self._estado = None
+        self._caixas = {}
+        self._lock = threading.Lock()
+
+    def adquirir(self, dono):
+        """Adquire ou renova o arrendamento. Retorna True se `dono` é o líder."""
+        agora = time.time()
+        with self._lock:
+            if self._dono in (None, dono) or self._expira_em <= agora:
+                self._dono = dono
+                self._expira_em = agora + self.duracao
+                return True
+            return False
+
+    def liberar(self, dono):
+        """Libera o arrendamento se `dono` for o líder atual"""
+        with self._lock:
+            if self._dono == dono:
+                self._dono = None
+                self._expira_em = 0
+
+    def publicar_estado(self, estado):
+        """Publica o estado ({version, streams}) para as demais instâncias"""
+        with self._lock:
+            self._estado = estado
+
+    def ler_estado(self):
+        """Retorna o último estado publicado pelo líder (ou None)"""
+        with self._lock:
+            return self._estado
+
+    def encaminhar(self, caixa, itens):
+        """Guarda itens na caixa `caixa` para o líder processar"""
+        with self._lock:
+            self._caixas.setdefault(caixa, []).extend(itens)
+
+    def retirar(self, caixa):
+        """Retira os itens encaminhados à caixa (lista vazia se nenhum)"""
+        with self._lock:
+            return self._caixas.pop(caixa, [])
+
+
+class ArrendamentoArquivo:
+    """
+    Arrendamento em arquivo: `<caminho>` guarda {dono, expira_em},
+    `<caminho>.estado.json` o último estado publicado pelo líder e
+    `<caminho>.<caixa>.jsonl` os itens encaminhados ao líder em cada caixa.
+    """
+
+    def __init__(self, caminho="lideranca.lock", duracao=60):
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        self.caminho = caminho
+        self.caminho_estado = caminho + ".estado.json"
+        self.duracao = duracao
+        self._mtime_estado = None
+        self._estado = None
+
+    @contextmanager
+    def _trava(self):
+        """Trava exclusiva entre processos durante a leitura/escrita do arrendamento"""
+        with open(self.caminho + ".trava", "a+") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _ler(self):
+        try:
+            with open(self.caminho, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _gravar_atomico(self, caminho, dados):
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(dados, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temporario, caminho)
+
+    def adquirir(self, dono):
+        """Adquire ou renova o arrendamento. Retorna True se `dono` é o líder."""
+        with self._trava():
+            atual = self._ler()
+            agora = time.time()
+            if atual.get("dono") in (None, dono) or atual.get("expira_em", 0) <= agora:
+                self._gravar_atomico(self.caminho, {"dono": dono, "expira_em": agora + self.duracao})
+                return True
+            return False
+
+    def liberar(self, dono):
+        """Libera o arrendamento se `dono` for o líder atual"""
+        with self._trava():
+            if self._ler().get("dono") == dono:
+                self._gravar_atomico(self.caminho, {"dono": None, "expira_em": 0})
+
+    def publicar_estado(self, estado):
+        """Publica o estado ({version, streams}) para as demais instâncias"""
+        self._gravar_atomico(self.caminho_estado, estado)
+
+    def ler_estado(self):
+        """Retorna o último estado publicado pelo líder (relido só se o arquivo mudou)"""
+        try:
+            mtime = os.path.getmtime(self.caminho_estado)
+        except OSError:
+            return None
+        if mtime != self._mtime_estado:
+            try:
+                with open(self.caminho_estado, "r", encoding="utf-8") as f:
+                    self._estado = json.load(f)
+                self._mtime_estado = mtime
+            except Exception:
+                pass
+        return self._estado
+
+    def encaminhar(self, caixa, itens):
+        """Guarda itens na caixa `caixa` para o líder processar"""
+        with self._trava():
+            with open(f"{self.caminho}.{caixa}.jsonl", "a", encoding="utf-8") as f:
+                f.write(json.dumps(itens, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def retirar(self, caixa):
+        """Retira os itens encaminhados à caixa (lista vazia se nenhum)"""
+        caminho = f"{self.caminho}.{caixa}.jsonl"
+        if not os.path.exists(caminho):
+            return []
+        with self._trava():
+            try:
+                with open(caminho, "r", encoding="utf-8") as f:
+                    linhas = f.readlines()
+                os.remove(caminho)
+            except OSError:
+                return []
+        itens = []
+        for linha in linhas:
+            try:
+                itens.extend(json.loads(linha))
+            except ValueError:
+                pass  # linha incompleta (seguidor interrompido durante a escrita)
+        return itens
+
+
+class ArrendamentoRedis:
+    """
+    Arrendamento em Redis (requer `pip install redis`): `<prefixo>:dono`
+    guarda o líder com expiração (SET NX PX, renovada só pelo próprio dono),
+    `<prefixo>:estado` o último estado publicado e `<prefixo>:<caixa>` a
+    lista de itens encaminhados ao líder em cada caixa.
+    """
+
+    # Renova (ou libera) só se a chave ainda pertence a `dono`, de forma atômica
+    _RENOVAR = """
+        if redis.call('GET', KEYS[1]) == ARGV[1] then
+            return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+        end
+        return 0
+    """
+    _LIBERAR = """
+        if redis.call('GET', KEYS[1]) == ARGV[1] then
+            return redis.call('DEL', KEYS[1])
+        end
+        return 0
+    """
+
+    def __init__(self, url="redis://localhost:6379/0", prefixo="monitor:lideranca", duracao=60):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("backend de liderança \"redis\" requer `pip install redis`") from e
+        self.cliente = redis.Redis.from_url(url, socket_timeout=max(1, duracao / 6))
+        self.chave_dono = f"{prefixo}:dono"
+        self.chave_estado = f"{prefixo}:estado"
+        self.prefixo = prefixo
+        self.duracao = duracao
+        self._renovar = self.cliente.register_script(self._RENOVAR)
+        self._liberar = self.cliente.register_script(self._LIBERAR)
+        self._bruto_estado = None
+        self._estado = None
+
+    def adquirir(self, dono):
+        """Adquire ou renova o arrendamento. Retorna True se `dono` é o líder."""
+        validade = int(self.duracao * 1000)
+        if self.cliente.set(self.chave_dono, dono, nx=True, px=validade):
+            return True
+        return bool(self._renovar(keys=[self.chave_dono], args=[dono, validade]))
+
+    def liberar(self, dono):
+        """Libera o arrendamento se `dono` for o líder atual"""
+        self._liberar(keys=[self.chave_dono], args=[dono])
+
+    def publicar_estado(self, estado):
+        """Publica o estado ({version, streams}) para as demais instâncias"""
+        self.cliente.set(self.chave_estado, json.dumps(estado, ensure_ascii=False, separators=(",", ":")))
+
+    def ler_estado(self):
+        """Retorna o último estado publicado pelo líder (reinterpretado só se mudou)"""
+        bruto = self.cliente.get(self.chave_estado)
+        if bruto is None:
+            return None
+        if bruto != self._bruto_estado:
+            try:
+                self._estado = json.loads(bruto)
+                self._bruto_estado = bruto
+            except ValueError:
+                pass
+        return self._estado
+
+    def encaminhar(self, caixa, itens):
+        """Guarda itens na caixa `caixa` para o líder processar"""
+        self.cliente.rpush(f"{self.prefixo}:{caixa}", json.dumps(itens, ensure_ascii=False, separators=(",", ":")))
+
+    def retirar(self, caixa):
+        """Retira os itens encaminhados à caixa (lista vazia se nenhum)"""
+        chave = f"{self.prefixo}:{caixa}"
+        with self.cliente.pipeline() as pipe:  # MULTI/EXEC: nada chega entre a leitura e a remoção
+            pipe.lrange(chave, 0, -1)
+            pipe.delete(chave)
+            blocos, _ = pipe.execute()
+        itens = []
+        for bloco in blocos:
+            try:
+                itens.extend(json.loads(bloco))
+            except ValueError:
+                pass
+        return itens
+
+
+class Lideranca:
+    """
+    Mantém o arrendamento desta instância em uma thread de renovação
+    (a cada 1/3 da duração) e informa se ela é o líder.
+    """
+
+    def __init__(self, arrendamento, dono=None):
+        self.arrendamento = arrendamento
+        self.dono = dono or identificador_instancia()
+        self._lider = threading.Event()
+        self._parar = threading.Event()
+        self._thread = None
+
+    def e_lider(self):
+        """Indica se esta instância detém o arrendamento"""
+        return self._lider.is_set()
+
+    def tentar(self):
+        """Tenta adquirir/renovar o arrendamento agora. Retorna True se é o líder."""
+        try:
+            lider = self.arrendamento.adquirir(self.dono)
+        except Exception:
+            lider = False
+        if lider:
+            self._lider.set()
+        else:
+            self._lider.clear()
+        return lider
+
+    def iniciar(self):
+        """Inicia a thread de renovação do arrendamento"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self.tentar()
+        self._thread = threading.Thread(target=self._renovar, daemon=True, name="lideranca")
+        self._thread.start()
+
+    def _renovar(self):
+        while not self._parar.wait(self.arrendamento.duracao / 3):
+            self.tentar()
+
+    def parar(self):
+        """Para a renovação e libera o arrendamento"""
+        self._parar.set()
+        if self.e_lider():
+            self.arrendamento.liberar(self.dono)
+        self._lider.clear()
+
+
+def criar_lideranca(cfg):
+    """
+    Cria a Lideranca a partir da seção `lideranca` do config.yaml.
+    Retorna None se a seção não existir (instância única, sempre líder).
+    """
+    if not cfg:
+        return None
+    duracao = cfg.get("duracao", 60)
+    backend = cfg.get("backend", "arquivo")
+    if backend == "memoria":
+        arrendamento = ArrendamentoMemoria(duracao)
+    elif backend == "arquivo":
+        arrendamento = ArrendamentoArquivo(cfg.get("caminho", "lideranca.lock"), duracao)
+    elif backend == "redis":
+        arrendamento = ArrendamentoRedis(cfg.get("url", "redis://localhost:6379/0"),
+                                         cfg.get("prefixo", "monitor:lideranca"), duracao)
+    else:
+        raise ValueError(f"Backend de liderança desconhecido: {backend}")
+    return Lideranca(arrendamento)
@@ -1,129 +1,171 @@
+import os
+import sys
+import queue
+import atexit
 import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from colorama import Fore, Style
-import datetime
 from config_loader import config
 
-intervalo_apagar_log = config.get("intervalo_apagar_log", 3600)
-qtd_linhas_log = config.get("qtd_linhas_log", 1000)
+# Rotação por tamanho: ao passar de log_max_bytes o arquivo vira .1, .2, ...
+log_max_bytes = config.get("log_max_bytes", 1_000_000)
+log_backups = config.get("log_backups", 3)
+# Cores no terminal (desligar reduz o custo de formatação sob carga)
+log_cores = config.get("log_cores", True)
+
+cor_map = {
+    'green': Fore.LIGHTGREEN_EX,
+    'red': Fore.LIGHTRED_EX,
+    'magenta': Fore.LIGHTMAGENTA_EX,
+    'yellow': Fore.LIGHTYELLOW_EX,
+    'black': Fore.LIGHTBLACK_EX,
+    'cyan': Fore.LIGHTCYAN_EX,
+    'white': Fore.LIGHTWHITE_EX,
+}
+
+niveis = {'info': logging.INFO, 'warning': logging.WARNING, 'error': logging.ERROR}
+
+# Logger do terminal e logger de conexões OBS (separados do logger raiz)
+terminal_logger = logging.getLogger('terminal')
+connection_logger = logging.getLogger('obs_connections')
+
+# Fila única: quem registra só enfileira; a escrita em terminal/arquivos
+# acontece na thread do QueueListener
+_fila_logs = queue.Queue(-1)
+_listener = None
+_handlers = {}
+_lock = threading.Lock()
+
+
+class FormatterTerminal(logging.Formatter):
+    """Formata '[HH:MM:SS] mensagem', com a cor indicada em record.cor (se ativas)"""
+
+    def __init__(self, cores=True):
+        super().__init__(datefmt='%H:%M:%S')
+        self.cores = cores
+
+    def format(self, record):
+        texto = f"[{self.formatTime(record, self.datefmt)}] {record.getMessage()}"
+        if self.cores:
+            return f"{cor_map.get(getattr(record, 'cor', None), '')}{texto}{Style.RESET_ALL}"
+        return texto
+
+
+class FormatterArquivo(logging.Formatter):
+    """Formato dos arquivos de log; registros com linha_em_branco viram uma linha vazia"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s [%(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+
+    def format(self, record):
+        if getattr(record, 'linha_em_branco', False):
+            return ""
+        return super().format(record)
+
+
+def _handler_arquivo(nome):
+    os.makedirs('logs', exist_ok=True)
+    handler = RotatingFileHandler(os.path.join('logs', nome), maxBytes=log_max_bytes,
+                                  backupCount=log_backups, encoding='utf-8', delay=True)
+    handler.setFormatter(FormatterArquivo())
+    return handler
+
+
+def _iniciar_listener():
+    """
+    Cria (uma única vez) os handlers de destino e a thread do QueueListener.
+    Os registros são roteados pelo nome do logger de origem.
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+        terminal = logging.StreamHandler(sys.stdout)
+        terminal.setFormatter(FormatterTerminal(log_cores))
+        terminal.addFilter(lambda r: r.name == 'terminal')
+
+        conexoes = _handler_arquivo("connection.log")
+        conexoes.addFilter(lambda r: r.name == 'obs_connections')
+
+        principal = _handler_arquivo("main.log")
+        principal.addFilter(lambda r: r.name not in ('terminal', 'obs_connections'))
+
+        _handlers.update(terminal=terminal, conexoes=conexoes, principal=principal)
+        _listener = QueueListener(_fila_logs, terminal, conexoes, principal, respect_handler_level=True)
+        _listener.start()
+        atexit.register(parar_logs)
+
+        for logger in (terminal_logger, connection_logger):
+            logger.setLevel(logging.INFO)
+            logger.handlers = [QueueHandler(_fila_logs)]
+            logger.propagate = False
+
+
+def parar_logs():
+    """Esvazia a fila e encerra a thread de escrita (chamado automaticamente na saída)"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def definir_cores(ativas):
+    """Liga/desliga as cores do terminal em tempo de execução"""
+    global log_cores
+    log_cores = bool(ativas)
+    if 'terminal' in _handlers:
+        _handlers['terminal'].formatter.cores = log_cores
 
-# Logger de conexões OBS (separado)
-connection_logger = None
 
 def setup_connection_logger():
     """
     Configura o logger de conexões OBS, salvando em logs/connection.log separadamente.
     """
-    global connection_logger
-    import os
-    os.makedirs('logs', exist_ok=True)
-    log_path = os.path.join('logs', "connection.log")
-    formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    handler = logging.FileHandler(log_path, encoding='utf-8')
-    handler.setFormatter(formatter)
-    connection_logger = logging.getLogger('obs_connections')
-    connection_logger.setLevel(logging.INFO)
-    if connection_logger.hasHandlers():
-        connection_logger.handlers.clear()
-    connection_logger.addHandler(handler)
-    connection_logger.propagate = False  # Não propagar para o logger raiz
+    _iniciar_listener()
     return connection_logger
 
+
 def log_connection_terminal(msg, level='info', cor=None):
     """
     Exibe mensagem de conexão colorida no terminal e registra em logs/connection.log.
     """
-    global connection_logger
-    if connection_logger is None:
-        setup_connection_logger()
-    
-    hora_str = datetime.datetime.now().strftime("%H:%M:%S")
-    cor_map = {
-        'green': Fore.LIGHTGREEN_EX,
-        'red': Fore.LIGHTRED_EX,
-        'magenta': Fore.LIGHTMAGENTA_EX,
-        'yellow': Fore.LIGHTYELLOW_EX,
-        'black': Fore.LIGHTBLACK_EX,
-        'cyan': Fore.LIGHTCYAN_EX,
-        'white': Fore.LIGHTWHITE_EX,
-    }
-    cor_prefix = cor_map.get(cor, '')
-    print(f"{cor_prefix}[{hora_str}] {msg}" + Style.RESET_ALL)
-    
-    if level == 'info':
-        connection_logger.info(msg)
-    elif level == 'warning':
-        connection_logger.warning(msg)
-    elif level == 'error':
-        connection_logger.error(msg)
-    else:
-        connection_logger.info(msg)
-
-def setup_logger(): 
+    _iniciar_listener()
+    nivel = niveis.get(level, logging.INFO)
+    terminal_logger.log(nivel, msg, extra={'cor': cor})
+    connection_logger.log(nivel, msg)
+
+
+def setup_logger():
     """
-    Configura o logger principal do sistema, salvando logs em um único arquivo.
-    A cada 1 hora, mantém apenas as últimas 1000 linhas do arquivo de log.
+    Configura o logger principal do sistema (logs/main.log).
+    O logger raiz apenas enfileira; a escrita e a rotação por tamanho
+    (log_max_bytes x log_backups) ficam na thread do QueueListener.
     """
-    import os
-    import threading
-    os.makedirs('logs', exist_ok=True)
-    log_path = os.path.join('logs', "main.log")
-    formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-    handler = logging.FileHandler(log_path, encoding='utf-8')
-    handler.setFormatter(formatter)
+    _iniciar_listener()
     logger = logging.getLogger()
     logger.setLevel(logging.INFO)
     if logger.hasHandlers():
         logger.handlers.clear()
-    logger.addHandler(handler)
-
-    def trim_log_file():
-        while True:
-            try:
-                with open(log_path, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                if len(lines) > qtd_linhas_log:
-                    with open(log_path, 'w', encoding='utf-8') as f:
-                        f.writelines(lines[-qtd_linhas_log:])
-            except Exception:
-                pass
-            # Espera 1 hora
-            threading.Event().wait(intervalo_apagar_log)
-
-    t = threading.Thread(target=trim_log_file, daemon=True)
-    t.start()
+    logger.addHandler(QueueHandler(_fila_logs))
     return logger
 
+
 def log_blank_line(logger):
     """
     Adiciona uma linha em branco ao arquivo de log principal.
     """
-    if logger.handlers:
-        logger.handlers[0].stream.write("\n");
-        logger.handlers[0].flush()
+    logger.info("", extra={'linha_em_branco': True})
+
 
 def log_terminal(msg, level='info', cor=None, log=True):
     """
     Exibe mensagem colorida no terminal e registra no log, se desejado.
+    Não bloqueia: a mensagem é apenas enfileirada.
     """
-    hora_str = datetime.datetime.now().strftime("%H:%M:%S")
-    cor_map = {
-        'green': Fore.LIGHTGREEN_EX,
-        'red': Fore.LIGHTRED_EX,
-        'magenta': Fore.LIGHTMAGENTA_EX,
-        'yellow': Fore.LIGHTYELLOW_EX,
-        'black': Fore.LIGHTBLACK_EX,
-        'cyan': Fore.LIGHTCYAN_EX,
-        'white': Fore.LIGHTWHITE_EX,
-    }
-    cor_prefix = cor_map.get(cor, '')
-    print(f"{cor_prefix}[{hora_str}] {msg}" + Style.RESET_ALL)
+    _iniciar_listener()
+    nivel = niveis.get(level, logging.INFO)
+    terminal_logger.log(nivel, msg, extra={'cor': cor})
     if log:
-        logger = logging.getLogger()
-        if level == 'info':
-            logger.info(msg)
-        elif level == 'warning':
-            logger.warning(msg)
-        elif level == 'error':
-            logger.error(msg)
-        else:
-            logger.info(msg)
+        logging.getLogger().log(nivel, msg)
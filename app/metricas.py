@@ -0,0 +1,205 @@
+"""
+metricas.py - Métricas no formato de exposição de texto do Prometheus
+Contadores, medidores e histogramas com rótulos, thread-safe, sem
+dependências externas. O servidor expõe `registro.exportar()` em /metrics.
+"""
+
+import math
+import threading
+
+from quota import CUSTO_QUOTA
+
+# Buckets padrão (segundos) para latências de requisições
+BUCKETS_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Buckets (segundos) para durações longas, como o ciclo completo
+BUCKETS_CICLO = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatar_rotulos(nomes, valores, extra=None):
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _formatar_valor(valor):
+    if valor == math.inf:
+        return "+Inf"
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._valores = {}  # tupla de rótulos -> valor (ou estado do histograma)
+        self._lock = threading.Lock()
+
+    def _chave(self, rotulos):
+        return tuple(str(rotulos.get(n, "")) for n in self.rotulos)
+
+    def _amostras(self):
+        """Retorna [(sufixo, tupla_rotulos, rotulo_extra, valor)]"""
+        with self._lock:
+            return [("", chave, None, valor) for chave, valor in self._valores.items()]
+
+    def exportar(self):
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+        for sufixo, chave, extra, valor in self._amostras():
+            linhas.append(f"{self.nome}{sufixo}{_formatar_rotulos(self.rotulos, chave, extra)} {_formatar_valor(valor)}")
+        return linhas
+
+
+class Contador(_Metrica):
+    """Contador monotônico (sufixo _total por convenção)"""
+    tipo = "counter"
+
+    def incrementar(self, valor=1, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+
+class Medidor(_Metrica):
+    """
+    Valor instantâneo. Com `funcao`, o valor é calculado na exportação:
+    a função retorna um número ou um dict {tupla_de_rotulos: valor}.
+    """
+    tipo = "gauge"
+
+    def __init__(self, nome, ajuda, rotulos=(), funcao=None):
+        super().__init__(nome, ajuda, rotulos)
+        self.funcao = funcao
+
+    def definir(self, valor, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._valores[chave] = valor
+
+    def _amostras(self):
+        if self.funcao is None:
+            return super()._amostras()
+        try:
+            valores = self.funcao()
+        except Exception:
+            return []
+        if not isinstance(valores, dict):
+            valores = {(): valores}
+        return [("", tuple(str(r) for r in chave), None, valor) for chave, valor in valores.items()]
+
+
+class Histograma(_Metrica):
+    """Histograma cumulativo (_bucket, _sum, _count) com buckets fixos"""
+    tipo = "histogram"
+
+    def __init__(self, nome, ajuda, rotulos=(), buckets=BUCKETS_PADRAO):
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observar(self, valor, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            estado = self._valores.get(chave)
+            if estado is None:
+                estado = self._valores[chave] = [[0] * len(self.buckets), 0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    estado[0][i] += 1
+                    break
+            estado[1] += valor
+            estado[2] += 1
+
+    def _amostras(self):
+        amostras = []
+        with self._lock:
+            for chave, (contagens, soma, total) in self._valores.items():
+                acumulado = 0
+                for limite, contagem in zip(self.buckets, contagens):
+                    acumulado += contagem
+                    amostras.append(("_bucket", chave, f'le="{_formatar_valor(limite)}"', acumulado))
+                amostras.append(("_sum", chave, None, soma))
+                amostras.append(("_count", chave, None, total))
+        return amostras
+
+
+class RegistroMetricas:
+    """Conjunto de métricas exportadas juntas"""
+
+    def __init__(self):
+        self._metricas = {}
+        self._lock = threading.Lock()
+
+    def _registrar(self, metrica):
+        with self._lock:
+            return self._metricas.setdefault(metrica.nome, metrica)
+
+    def contador(self, nome, ajuda, rotulos=()):
+        return self._registrar(Contador(nome, ajuda, rotulos))
+
+    def medidor(self, nome, ajuda, rotulos=(), funcao=None):
+        return self._registrar(Medidor(nome, ajuda, rotulos, funcao))
+
+    def histograma(self, nome, ajuda, rotulos=(), buckets=BUCKETS_PADRAO):
+        return self._registrar(Histograma(nome, ajuda, rotulos, buckets))
+
+    def exportar(self):
+        """Retorna todas as métricas no formato de texto do Prometheus (0.0.4)"""
+        with self._lock:
+            metricas = list(self._metricas.values())
+        linhas = []
+        for metrica in metricas:
+            linhas.extend(metrica.exportar())
+        return "\n".join(linhas) + "\n"
+
+
+registro = RegistroMetricas()
+
+# Métricas do polling (YouTubeWebManager)
+duracao_ciclo = registro.histograma(
+    "monitor_ciclo_duracao_segundos", "Duração de run_cycle", buckets=BUCKETS_CICLO)
+duracao_consulta_canal = registro.histograma(
+    "monitor_canal_consulta_segundos", "Duração da descoberta de eventos de um canal (feed ou search)",
+    ("canal", "nome"), buckets=BUCKETS_CICLO)
+duracao_api = registro.histograma(
+    "monitor_api_requisicao_segundos", "Latência das requisições à YouTube Data API", ("endpoint",))
+respostas_api = registro.contador(
+    "monitor_api_respostas_total", "Respostas da YouTube Data API por status", ("endpoint", "status"))
+quota_api = registro.contador(
+    "monitor_api_quota_unidades_total", "Unidades de quota estimadas consumidas", ("endpoint",))
+
+# Notificações push do hub WebSub
+notificacoes_websub = registro.contador(
+    "monitor_websub_notificacoes_total", "Notificações WebSub recebidas por resultado", ("resultado",))
+
+# Métricas do servidor (Socket.IO)
+duracao_emit = registro.histograma(
+    "monitor_socketio_emit_segundos", "Duração do socketio.emit (fan-out) por evento", ("evento",))
+
+
+def endpoint_api(caminho):
+    """Extrai o endpoint (search, videos, ...) de um caminho /youtube/v3/<endpoint>?..."""
+    return caminho.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
+
+
+def registrar_requisicao_api(caminho, status, duracao):
+    """Registra latência e status de uma requisição à API"""
+    endpoint = endpoint_api(caminho)
+    duracao_api.observar(duracao, endpoint=endpoint)
+    respostas_api.incrementar(endpoint=endpoint, status=status)
+
+
+def registrar_quota_api(endpoint):
+    """
+    Soma a quota de uma requisição contada pelo governador de quota; recusas
+    por quota, limite de taxa ou chave inválida não entram no consumo
+    """
+    quota_api.incrementar(CUSTO_QUOTA.get(endpoint, 1), endpoint=endpoint)
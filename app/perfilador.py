@@ -0,0 +1,309 @@
+"""
+perfilador.py - Captura de perfis do ciclo de polling sob demanda
+Cada ciclo (run_cycle e os envios feitos enquanto ele roda) tem o tempo dividido por fase
+(carregar, pesquisa, videos, selecao, salvar, emit), exportado em /metrics.
+Sob demanda (próximos N ciclos) ou automaticamente para ciclos acima de um
+limiar, o ciclo é perfilado e gravado em um anel de arquivos no disco:
+    - cprofile: cProfile na thread do ciclo e nos workers (arquivo .pstats);
+      a partir do Python 3.12 só um cProfile pode estar ativo no processo,
+      então os workers são amostrados (arquivo .collapsed ao lado)
+    - amostragem: pilhas das threads do ciclo amostradas periodicamente
+      (formato "collapsed", para flamegraph.pl / speedscope)
+"""
+
+import os
+import sys
+import json
+import time
+import cProfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime as dt
+
+import metricas
+from log_config import log_terminal
+
+MODOS = ("cprofile", "amostragem")
+
+# Até o 3.11, cada thread pode ter o seu cProfile ativo; a partir do 3.12 o
+# cProfile usa sys.monitoring e um segundo enable() levanta ValueError
+PERFIL_POR_THREAD = sys.version_info < (3, 12)
+FASES = ("carregar", "pesquisa", "videos", "selecao", "salvar", "emit")
+
+duracao_fase = metricas.registro.histograma(
+    "monitor_ciclo_fase_segundos", "Tempo de cada fase do ciclo, somado entre as threads",
+    ("fase",), buckets=metricas.BUCKETS_CICLO)
+
+
+def _ativar(perfil):
+    """Liga o cProfile; False se outro perfilador já estiver ativo (3.12+)"""
+    try:
+        perfil.enable()
+        return True
+    except ValueError:
+        return False
+
+
+class _Amostrador(threading.Thread):
+    """Amostra as pilhas da thread do ciclo e dos workers de polling"""
+
+    def __init__(self, thread_ciclo, intervalo):
+        """
+        Args:
+            thread_ciclo: ident da thread do ciclo (None = só os workers)
+            intervalo: Intervalo (s) entre amostras
+        """
+        super().__init__(daemon=True, name="perfilador")
+        self.thread_ciclo = thread_ciclo
+        self.intervalo = intervalo
+        self.pilhas = Counter()
+        self.amostras = 0
+        self._parar = threading.Event()
+
+    def _threads_alvo(self):
+        return {
+            t.ident: t.name for t in threading.enumerate()
+            if t.ident == self.thread_ciclo or t.name.startswith("polling")
+        }
+
+    def run(self):
+        while not self._parar.wait(self.intervalo):
+            alvos = self._threads_alvo()
+            for ident, frame in sys._current_frames().items():
+                if ident not in alvos:
+                    continue
+                pilha = []
+                while frame is not None:
+                    codigo = frame.f_code
+                    pilha.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})")
+                    frame = frame.f_back
+                pilha.append(alvos[ident].split("_")[0])  # agrupa os workers "polling_0", "polling_1"...
+                self.pilhas[";".join(reversed(pilha))] += 1
+            self.amostras += 1
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+
+
+class PerfiladorCiclos:
+    """
+    Tempo por fase de cada ciclo e captura de perfis.
+
+    Uso (thread do ciclo):
+        with perfil_ciclos.ciclo():
+            ...
+            with perfil_ciclos.fase("videos"):
+                ...
+    Tarefas enviadas aos workers devem passar por `envolver()` para
+    entrarem no perfil cProfile.
+    """
+
+    def __init__(self, pasta="logs/perfis", max_perfis=20, limiar=0, intervalo_amostragem=0.005):
+        """
+        Args:
+            pasta: Pasta do anel de perfis gravados
+            max_perfis: Perfis mantidos na pasta (os mais antigos são apagados)
+            limiar: Ciclos mais longos que isso (s) são perfilados por amostragem (0 = desligado)
+            intervalo_amostragem: Intervalo (s) entre amostras de pilha
+        """
+        self.pasta = pasta
+        self.max_perfis = max_perfis
+        self.limiar = limiar
+        self.intervalo_amostragem = intervalo_amostragem
+
+        self._lock = threading.Lock()
+        self._armados = 0
+        self._modo_armado = "cprofile"
+        self._fases = None          # {fase: segundos} do ciclo em andamento
+        self._perfis_threads = None  # {ident: cProfile.Profile} durante uma captura cProfile
+        self._sequencia = 0
+
+    def configurar(self, cfg):
+        """Aplica as opções perfil_* do config.yaml"""
+        self.pasta = cfg.get("perfil_pasta", "logs/perfis")
+        self.max_perfis = max(1, int(cfg.get("perfil_max", 20)))
+        self.limiar = cfg.get("perfil_limiar_ciclo", 0) or 0
+        self.intervalo_amostragem = cfg.get("perfil_intervalo_amostragem", 0.005)
+
+    def armar(self, ciclos=1, modo="cprofile"):
+        """Perfila os próximos `ciclos` ciclos no modo indicado; retorna quantos estão armados"""
+        if modo not in MODOS:
+            raise ValueError(f"modo deve ser um de {', '.join(MODOS)}")
+        with self._lock:
+            self._armados = max(0, int(ciclos))
+            self._modo_armado = modo
+            return self._armados
+
+    def armados(self):
+        with self._lock:
+            return self._armados, self._modo_armado
+
+    # --- Ciclo e fases ------------------------------------------------------
+
+    @contextmanager
+    def ciclo(self):
+        """Delimita um ciclo: mede as fases e, se for o caso, captura o perfil"""
+        with self._lock:
+            if self._armados:
+                self._armados -= 1
+                modo, motivo = self._modo_armado, "solicitado"
+            elif self.limiar:
+                modo, motivo = "amostragem", "lento"
+            else:
+                modo, motivo = None, None
+            self._fases = dict.fromkeys(FASES, 0.0)
+
+        amostrador = None
+        perfil_ciclo = None
+        if modo == "cprofile":
+            with self._lock:
+                self._perfis_threads = {}
+            perfil_ciclo = self._perfil_da_thread()
+            if not _ativar(perfil_ciclo):
+                # Outro perfilador já ativo no processo: recorre à amostragem
+                log_terminal("[perfilador] cProfile indisponível (outro perfilador ativo), "
+                             "usando amostragem", level='warning', cor='yellow')
+                with self._lock:
+                    self._perfis_threads = None
+                perfil_ciclo, modo = None, "amostragem"
+            elif not PERFIL_POR_THREAD:
+                amostrador = _Amostrador(None, self.intervalo_amostragem)
+                amostrador.start()
+        if modo == "amostragem":
+            amostrador = _Amostrador(threading.get_ident(), self.intervalo_amostragem)
+            amostrador.start()
+
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracao = time.perf_counter() - inicio
+            perfis = None
+            if amostrador:
+                amostrador.parar()
+            if perfil_ciclo:
+                perfil_ciclo.disable()
+                with self._lock:
+                    perfis, self._perfis_threads = self._perfis_threads, None
+            with self._lock:
+                fases, self._fases = self._fases, None
+
+            for nome, segundos in fases.items():
+                if segundos:
+                    duracao_fase.observar(segundos, fase=nome)
+            if motivo == "solicitado" or (motivo == "lento" and duracao >= self.limiar):
+                try:
+                    self._gravar(modo, motivo, duracao, fases, perfis, amostrador)
+                except Exception as e:
+                    log_terminal(f"[perfilador] Erro ao gravar perfil: {e}", level='error', cor='red')
+
+    @contextmanager
+    def fase(self, nome):
+        """Soma o tempo do bloco à fase `nome` do ciclo em andamento (se houver)"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            decorrido = time.perf_counter() - inicio
+            with self._lock:
+                if self._fases is not None:
+                    self._fases[nome] = self._fases.get(nome, 0.0) + decorrido
+
+    def envolver(self, funcao):
+        """Retorna `funcao` envolvida para entrar no perfil cProfile quando executada em um worker"""
+        def tarefa(*args, **kwargs):
+            # No 3.12+ o cProfile do ciclo é o único permitido: os workers são amostrados
+            if self._perfis_threads is None or not PERFIL_POR_THREAD:
+                return funcao(*args, **kwargs)
+            perfil = self._perfil_da_thread()
+            if not _ativar(perfil):
+                return funcao(*args, **kwargs)
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                perfil.disable()
+        return tarefa
+
+    def _perfil_da_thread(self):
+        with self._lock:
+            perfis = self._perfis_threads if self._perfis_threads is not None else {}
+            return perfis.setdefault(threading.get_ident(), cProfile.Profile())
+
+    # --- Anel de perfis no disco --------------------------------------------
+
+    def _gravar(self, modo, motivo, duracao, fases, perfis, amostrador):
+        os.makedirs(self.pasta, exist_ok=True)
+        with self._lock:
+            self._sequencia += 1
+            nome = f"ciclo-{dt.now().strftime('%Y%m%d-%H%M%S')}-{self._sequencia:04d}"
+
+        if modo == "cprofile":
+            import pstats
+            perfis = list((perfis or {}).values())
+            estatisticas = pstats.Stats(perfis[0])
+            for perfil in perfis[1:]:
+                estatisticas.add(perfil)
+            arquivo = f"{nome}.pstats"
+            estatisticas.dump_stats(os.path.join(self.pasta, arquivo))
+            # 3.12+: pilhas amostradas dos workers, ao lado do .pstats do ciclo
+            arquivo_amostras = f"{nome}.workers.collapsed" if amostrador else None
+        else:
+            arquivo = f"{nome}.collapsed"
+            arquivo_amostras = None
+        if amostrador:
+            with open(os.path.join(self.pasta, arquivo_amostras or arquivo), "w", encoding="utf-8") as f:
+                for pilha, contagem in amostrador.pilhas.most_common():
+                    f.write(f"{pilha} {contagem}\n")
+
+        meta = {
+            "nome": nome,
+            "arquivo": arquivo,
+            "arquivo_amostras": arquivo_amostras,
+            "modo": modo,
+            "motivo": motivo,
+            "inicio": time.time() - duracao,
+            "duracao": round(duracao, 4),
+            "fases": {k: round(v, 4) for k, v in fases.items()},
+            "amostras": amostrador.amostras if amostrador else None,
+        }
+        with open(os.path.join(self.pasta, f"{nome}.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+        log_terminal(f"[perfilador] Ciclo de {duracao:.2f}s perfilado ({modo}, {motivo}): {arquivo}", cor='cyan')
+        self._podar()
+
+    def _podar(self):
+        """Mantém apenas os `max_perfis` perfis mais recentes"""
+        for meta in self.listar()[self.max_perfis:]:
+            for arquivo in (f"{meta['nome']}.json", meta.get("arquivo"), meta.get("arquivo_amostras")):
+                try:
+                    os.remove(os.path.join(self.pasta, arquivo))
+                except (OSError, TypeError):
+                    pass
+
+    def listar(self):
+        """Metadados dos perfis gravados, do mais recente para o mais antigo"""
+        try:
+            nomes = sorted((n for n in os.listdir(self.pasta) if n.endswith(".json")), reverse=True)
+        except OSError:
+            return []
+        perfis = []
+        for nome in nomes:
+            try:
+                with open(os.path.join(self.pasta, nome), "r", encoding="utf-8") as f:
+                    perfis.append(json.load(f))
+            except Exception:
+                continue
+        return perfis
+
+    def caminho(self, arquivo):
+        """Caminho de um arquivo de perfil listado (None se não existir)"""
+        for meta in self.listar():
+            if arquivo in (meta.get("arquivo"), meta.get("arquivo_amostras"), f"{meta['nome']}.json"):
+                return os.path.abspath(os.path.join(self.pasta, arquivo))
+        return None
+
+
+perfil_ciclos = PerfiladorCiclos()
@@ -0,0 +1,142 @@
+"""
+pool_conexoes.py - Pool de conexões HTTP(S) keep-alive thread-safe
+Reaproveita conexões persistentes com a API do YouTube em vez de abrir
+um novo handshake TCP/TLS a cada requisição.
+"""
+
+import time
+import threading
+import http.client as client
+
+
+# Erros que indicam que uma conexão reaproveitada foi fechada pelo servidor
+ERROS_CONEXAO_VELHA = (
+    client.RemoteDisconnected,
+    client.CannotSendRequest,
+    client.BadStatusLine,
+    ConnectionResetError,
+    ConnectionAbortedError,
+    BrokenPipeError,
+)
+
+
+class PoolConexoesHTTPS:
+    """
+    Mantém até `max_conexoes` conexões abertas com um host.
+    Conexões ociosas são reutilizadas (LIFO) e descartadas após `max_ocioso` segundos.
+    """
+
+    def __init__(self, host, max_conexoes=10, timeout=10, max_ocioso=60, https=True, port=None):
+        """
+        Inicializa o pool.
+
+        Args:
+            host: Host de destino (ex.: www.googleapis.com)
+            max_conexoes: Limite de sockets abertos ao mesmo tempo
+            timeout: Timeout de cada conexão em segundos
+            max_ocioso: Tempo máximo (s) que uma conexão ociosa é mantida
+            https: Usa HTTPS (True) ou HTTP simples (False)
+            port: Porta de destino (padrão do protocolo se None)
+        """
+        self.host = host
+        self.port = port
+        self.https = https
+        self.timeout = timeout
+        self.max_ocioso = max_ocioso
+        self.max_conexoes = max(1, int(max_conexoes))
+
+        self._ociosas = []  # [(conexao, instante_devolucao)]
+        self._lock = threading.Lock()
+        self._vagas = threading.BoundedSemaphore(self.max_conexoes)
+
+        self.conexoes_novas = 0
+        self.conexoes_reutilizadas = 0
+        self.reconexoes = 0
+        self.requisicoes = 0
+
+    def _nova_conexao(self):
+        """Cria uma nova conexão com o host"""
+        classe = client.HTTPSConnection if self.https else client.HTTPConnection
+        with self._lock:
+            self.conexoes_novas += 1
+        return classe(self.host, self.port, timeout=self.timeout)
+
+    def _obter_conexao(self):
+        """Retorna (conexao, reutilizada). Deve ser chamado com uma vaga reservada."""
+        agora = time.monotonic()
+        with self._lock:
+            while self._ociosas:
+                conn, devolvida_em = self._ociosas.pop()
+                if agora - devolvida_em <= self.max_ocioso:
+                    self.conexoes_reutilizadas += 1
+                    return conn, True
+                conn.close()
+        return self._nova_conexao(), False
+
+    def _devolver_conexao(self, conn):
+        """Devolve a conexão ao pool para reutilização"""
+        with self._lock:
+            self._ociosas.append((conn, time.monotonic()))
+
+    def requisitar(self, metodo, caminho, headers=None, corpo=None):
+        """
+        Executa uma requisição reaproveitando uma conexão do pool.
+        Se a conexão reaproveitada estiver fechada, reconecta uma única vez.
+        `corpo` (bytes) é enviado em requisições como POST.
+
+        Returns:
+            Tupla (status, headers, corpo_em_bytes); headers não diferencia maiúsculas
+        """
+        self._vagas.acquire()
+        try:
+            conn, reutilizada = self._obter_conexao()
+            while True:
+                try:
+                    conn.request(metodo, caminho, body=corpo, headers=headers or {})
+                    res = conn.getresponse()
+                    resposta = res.read()
+                except ERROS_CONEXAO_VELHA:
+                    conn.close()
+                    if not reutilizada:
+                        raise
+                    # Conexão velha: tentar novamente com uma conexão nova
+                    with self._lock:
+                        self.reconexoes += 1
+                    conn, reutilizada = self._nova_conexao(), False
+                    continue
+                except Exception:
+                    conn.close()
+                    raise
+                break
+
+            with self._lock:
+                self.requisicoes += 1
+
+            if res.will_close:
+                conn.close()
+            else:
+                self._devolver_conexao(conn)
+
+            return res.status, res.headers, resposta
+        finally:
+            self._vagas.release()
+
+    def estatisticas(self):
+        """Retorna contadores de uso do pool"""
+        with self._lock:
+            return {
+                "host": self.host,
+                "requisicoes": self.requisicoes,
+                "conexoes_novas": self.conexoes_novas,
+                "conexoes_reutilizadas": self.conexoes_reutilizadas,
+                "reconexoes": self.reconexoes,
+                "conexoes_ociosas": len(self._ociosas),
+                "max_conexoes": self.max_conexoes,
+            }
+
+    def fechar(self):
+        """Fecha todas as conexões ociosas"""
+        with self._lock:
+            ociosas, self._ociosas = self._ociosas, []
+        for conn, _ in ociosas:
+            conn.close()
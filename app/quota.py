@@ -0,0 +1,286 @@
+"""
+quota.py - Controle da quota diária da YouTube Data API
+Registra as unidades gastas por endpoint, projeta o consumo até o fim do
+dia (a quota zera à meia-noite do horário do Pacífico) e calcula um fator
+para esticar os intervalos de consulta e fechar o dia dentro do orçamento.
+Após erros de quota, bloqueia as consultas até a próxima janela.
+Com várias chaves de API, cada chave tem o seu governador (ver chaves_api.py).
+"""
+
+import os
+import json
+import time
+import threading
+from collections import deque
+from datetime import datetime as dt, timedelta, timezone
+
+try:
+    from zoneinfo import ZoneInfo
+    FUSO_QUOTA = ZoneInfo("America/Los_Angeles")
+except Exception:  # Python sem tzdata (ex.: Windows)
+    FUSO_QUOTA = timezone(timedelta(hours=-8))
+
+# Custo em unidades de cada endpoint (https://developers.google.com/youtube/v3/determine_quota_cost)
+CUSTO_QUOTA = {"search": 100, "videos": 1}
+
+# Motivos (error.errors[].reason) que indicam quota esgotada ou limite de taxa
+MOTIVOS_QUOTA_DIARIA = ("quotaExceeded", "dailyLimitExceeded")
+MOTIVOS_LIMITE_TAXA = ("rateLimitExceeded", "userRateLimitExceeded")
+# Motivos que indicam chave inválida, expirada ou sem a API habilitada
+MOTIVOS_CHAVE_INVALIDA = ("keyInvalid", "keyExpired", "API_KEY_INVALID", "API_KEY_EXPIRED",
+                          "accessNotConfigured", "SERVICE_DISABLED")
+
+
+class QuotaExcedida(Exception):
+    """A API recusou a requisição por quota; consultas bloqueadas até `liberado_em`"""
+
+    def __init__(self, motivo, liberado_em):
+        super().__init__(f"Quota da API excedida ({motivo}), consultas suspensas até "
+                         f"{dt.fromtimestamp(liberado_em).strftime('%d/%m %H:%M:%S')}")
+        self.motivo = motivo
+        self.liberado_em = liberado_em
+
+
+def motivo_erro(corpo):
+    """
+    Extrai error.errors[0].reason do corpo JSON de uma resposta de erro (ou None).
+    Para erros genéricos (badRequest), usa o motivo de error.details
+    (ex.: API_KEY_INVALID).
+    """
+    try:
+        erro = json.loads(corpo.decode("utf-8"))["error"]
+        motivo = (erro.get("errors") or [{}])[0].get("reason")
+        if motivo in (None, "badRequest"):
+            detalhes = [d.get("reason") for d in erro.get("details") or [] if d.get("reason")]
+            motivo = detalhes[0] if detalhes else motivo
+        return motivo or erro.get("status")
+    except Exception:
+        return None
+
+
+class GovernadorQuota:
+    """
+    Livro-caixa da quota diária.
+
+    - `fator_intervalo()` >= 1: quanto os intervalos devem ser esticados para
+      que a taxa de consumo recente caiba no que resta do orçamento do dia.
+    - `bloqueado_ate()`: instante até o qual nenhuma consulta deve ser feita
+      (quota esgotada → próxima meia-noite do Pacífico; limite de taxa →
+      recuo exponencial).
+    """
+
+    def __init__(self, orcamento_diario=10000, reserva=0.05, janela=3600,
+                 fator_maximo=20, caminho=None):
+        """
+        Args:
+            orcamento_diario: Unidades de quota disponíveis por dia
+            reserva: Fração do orçamento mantida livre (margem para uso manual)
+            janela: Segundos considerados na taxa de consumo recente
+            fator_maximo: Maior multiplicador aplicado aos intervalos
+            caminho: Arquivo JSON para manter o consumo do dia entre reinícios (opcional)
+        """
+        self.orcamento_diario = orcamento_diario
+        self.reserva = reserva
+        self.janela = janela
+        self.fator_maximo = fator_maximo
+        self.caminho = caminho
+
+        self._lock = threading.Lock()
+        self._dia = None
+        self._por_endpoint = {}
+        self._recentes = deque()  # [(instante, unidades)]
+        self._bloqueado_ate = 0
+        self._motivo_bloqueio = None
+        self._recuo_taxa = 60
+        self._inicio = time.time()
+        self._carregar()
+
+    # --- Dia de quota -------------------------------------------------------
+
+    @staticmethod
+    def _dia_quota(agora):
+        return dt.fromtimestamp(agora, FUSO_QUOTA).date().isoformat()
+
+    @staticmethod
+    def proxima_renovacao(agora):
+        """Instante (epoch) da próxima meia-noite no horário do Pacífico"""
+        local = dt.fromtimestamp(agora, FUSO_QUOTA)
+        amanha = (local + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        return amanha.timestamp()
+
+    def _virar_dia(self, agora):
+        """Zera o consumo quando a quota é renovada (chamado com o lock)"""
+        dia = self._dia_quota(agora)
+        if dia != self._dia:
+            self._dia = dia
+            self._por_endpoint = {}
+            if self._motivo_bloqueio in MOTIVOS_QUOTA_DIARIA:
+                self._bloqueado_ate = 0
+                self._motivo_bloqueio = None
+
+    # --- Registro -----------------------------------------------------------
+
+    def registrar(self, endpoint, agora=None):
+        """Registra uma requisição ao endpoint (search, videos, ...)"""
+        agora = time.time() if agora is None else agora
+        unidades = CUSTO_QUOTA.get(endpoint, 1)
+        with self._lock:
+            self._virar_dia(agora)
+            self._por_endpoint[endpoint] = self._por_endpoint.get(endpoint, 0) + unidades
+            self._recentes.append((agora, unidades))
+            if self._motivo_bloqueio in MOTIVOS_LIMITE_TAXA:
+                self._recuo_taxa = 60
+
+    def registrar_erro(self, motivo, agora=None):
+        """
+        Registra um erro de quota da API e bloqueia as consultas.
+        Retorna o instante até o qual as consultas ficam suspensas.
+        """
+        agora = time.time() if agora is None else agora
+        with self._lock:
+            self._virar_dia(agora)
+            if motivo in MOTIVOS_LIMITE_TAXA:
+                liberado_em = agora + self._recuo_taxa
+                self._recuo_taxa = min(self._recuo_taxa * 2, 3600)
+            else:
+                liberado_em = self.proxima_renovacao(agora)
+            if liberado_em > self._bloqueado_ate:
+                self._bloqueado_ate = liberado_em
+                self._motivo_bloqueio = motivo
+            return self._bloqueado_ate
+
+    # --- Consultas ----------------------------------------------------------
+
+    def consumido(self, agora=None):
+        """Unidades gastas no dia de quota atual"""
+        agora = time.time() if agora is None else agora
+        with self._lock:
+            self._virar_dia(agora)
+            return sum(self._por_endpoint.values())
+
+    def disponivel(self, agora=None):
+        """Unidades que ainda podem ser gastas no dia (sem a reserva)"""
+        agora = time.time() if agora is None else agora
+        with self._lock:
+            self._virar_dia(agora)
+            return self.orcamento_diario * (1 - self.reserva) - sum(self._por_endpoint.values())
+
+    def taxa_recente(self, agora=None):
+        """Unidades por segundo gastas na janela recente"""
+        agora = time.time() if agora is None else agora
+        with self._lock:
+            return self._taxa_recente(agora)
+
+    def motivo_bloqueio(self):
+        """Motivo do último bloqueio registrado (ou None)"""
+        with self._lock:
+            return self._motivo_bloqueio
+
+    def bloqueado_ate(self, agora=None):
+        """
+        Retorna o instante até o qual não se deve consultar a API, ou 0.
+        O orçamento do dia esgotado (sem a reserva) também bloqueia até a renovação.
+        """
+        agora = time.time() if agora is None else agora
+        with self._lock:
+            self._virar_dia(agora)
+            if self._bloqueado_ate > agora:
+                return self._bloqueado_ate
+            if sum(self._por_endpoint.values()) >= self.orcamento_diario * (1 - self.reserva):
+                return self.proxima_renovacao(agora)
+            return 0
+
+    def _taxa_recente(self, agora):
+        """Unidades por segundo na janela recente (chamado com o lock)"""
+        while self._recentes and self._recentes[0][0] < agora - self.janela:
+            self._recentes.popleft()
+        # Nos primeiros minutos, um piso evita que a rajada inicial (todos os
+        # canais pesquisados de uma vez) pareça a taxa de regime
+        duracao = min(self.janela, max(agora - self._inicio, self.janela / 4))
+        return sum(u for _, u in self._recentes) / duracao
+
+    def projecao(self, agora=None):
+        """Consumo projetado até a renovação mantendo a taxa recente"""
+        agora = time.time() if agora is None else agora
+        with self._lock:
+            self._virar_dia(agora)
+            restante_dia = self.proxima_renovacao(agora) - agora
+            return sum(self._por_endpoint.values()) + self._taxa_recente(agora) * restante_dia
+
+    def fator_intervalo(self, agora=None):
+        """
+        Multiplicador (1 a fator_maximo) dos intervalos de consulta para que a
+        taxa recente, mantida até a renovação, caiba no orçamento restante.
+        """
+        agora = time.time() if agora is None else agora
+        with self._lock:
+            self._virar_dia(agora)
+            restante_dia = self.proxima_renovacao(agora) - agora
+            disponivel = self.orcamento_diario * (1 - self.reserva) - sum(self._por_endpoint.values())
+            taxa = self._taxa_recente(agora)
+            if taxa <= 0:
+                return 1.0
+            if disponivel <= 0:
+                return float(self.fator_maximo)
+            taxa_permitida = disponivel / restante_dia
+            return min(max(taxa / taxa_permitida, 1.0), float(self.fator_maximo))
+
+    def verificar(self, agora=None):
+        """Levanta QuotaExcedida se as consultas estiverem bloqueadas agora"""
+        bloqueado = self.bloqueado_ate(agora)
+        if bloqueado:
+            raise QuotaExcedida(self._motivo_bloqueio or "orcamento_diario", bloqueado)
+
+    def estatisticas(self, agora=None):
+        """Retorna o estado do livro-caixa (para /health e /metrics)"""
+        agora = time.time() if agora is None else agora
+        bloqueado = self.bloqueado_ate(agora)
+        projecao = self.projecao(agora)
+        fator = self.fator_intervalo(agora)
+        with self._lock:
+            return {
+                "dia": self._dia,
+                "orcamento_diario": self.orcamento_diario,
+                "consumido": sum(self._por_endpoint.values()),
+                "por_endpoint": dict(self._por_endpoint),
+                "projecao": round(projecao),
+                "fator_intervalo": round(fator, 2),
+                "bloqueado_ate": bloqueado or None,
+                "motivo_bloqueio": self._motivo_bloqueio if bloqueado else None,
+            }
+
+    # --- Persistência -------------------------------------------------------
+
+    def _carregar(self):
+        """Recupera o consumo do dia gravado por uma execução anterior"""
+        if not self.caminho:
+            return
+        try:
+            with open(self.caminho, "r", encoding="utf-8") as f:
+                dados = json.load(f)
+        except Exception:
+            return
+        agora = time.time()
+        self._virar_dia(agora)
+        if dados.get("dia") == self._dia:
+            self._por_endpoint = dict(dados.get("por_endpoint", {}))
+            if dados.get("bloqueado_ate", 0) > agora:
+                self._bloqueado_ate = dados["bloqueado_ate"]
+                self._motivo_bloqueio = dados.get("motivo_bloqueio")
+
+    def salvar(self):
+        """Grava o consumo do dia (escrita atômica)"""
+        if not self.caminho:
+            return
+        with self._lock:
+            dados = {
+                "dia": self._dia,
+                "por_endpoint": dict(self._por_endpoint),
+                "bloqueado_ate": self._bloqueado_ate,
+                "motivo_bloqueio": self._motivo_bloqueio,
+            }
+        os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+        temporario = f"{self.caminho}.{os.getpid()}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(dados, f)
+        os.replace(temporario, self.caminho)
@@ -3,19 +3,46 @@ server_web.py - Servidor Flask + Socket.IO para monitoramento web de lives YouTu
 Substitui OBS por uma interface HTML com grid responsivo
 """
 
-from flask import Flask, render_template, jsonify, request
-from flask_socketio import SocketIO, emit
+from config_loader import config, recarregar_config, mtime_config
+
+# Modo assíncrono do servidor: "threading" (Werkzeug, uma thread por conexão),
+# "eventlet" ou "gevent" (green threads, para milhares de clientes WebSocket).
+# O monkey patching precisa acontecer antes de qualquer import de socket/threading.
+ASYNC_MODE = config.get("async_mode", "threading")
+if ASYNC_MODE == "eventlet":
+    import eventlet
+    eventlet.monkey_patch()
+elif ASYNC_MODE == "gevent":
+    from gevent import monkey
+    monkey.patch_all()
+
+from flask import Flask, Response, render_template, jsonify, request, send_file
+from flask_socketio import SocketIO, emit, join_room, leave_room
 from datetime import datetime as dt, timezone
+import io
+import math
 import threading
 import time
+import hmac
 import logging
+import xml.etree.ElementTree as ET
 from youtube_web_manager import YouTubeWebManager
-from log_config import log_terminal, setup_logger
+from estado_streams import EstadoVersionado, salvar_snapshot, ler_snapshot
+from lideranca import criar_lideranca
+from websub import criar_websub, channel_do_topico
+from feed_videos import ler_feed
+from filas import FilaDescartaAntigos
+from perfilador import perfil_ciclos, MODOS as MODOS_PERFIL
+from log_config import log_terminal, setup_logger, definir_cores
+import metricas
 
 # Configuração Flask
 app = Flask(__name__, static_folder="static", template_folder="templates")
 app.config['SECRET_KEY'] = 'youtube-monitor-web-secret-2025'
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading', ping_timeout=120, ping_interval=25)
+# Com várias instâncias, a fila de mensagens (ex.: redis://) entrega os emits do líder
+# aos clientes de todas as instâncias
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=ASYNC_MODE, ping_timeout=120, ping_interval=25,
+                    message_queue=config.get("socketio_message_queue"))
 
 # Logging
 
@@ -28,8 +55,70 @@ logger = logging.getLogger(__name__)
 # Estado global
 youtube_manager = None
 connected_clients = set()
+SALA_TODOS = "todos"  # sala dos clientes sem assinatura (recebem streams_patch)
+assinaturas = {}  # sid -> {'canais': [...], 'grupos': [...]} (clientes com assinatura)
+estado = EstadoVersionado()
+lideranca = criar_lideranca(config.get("lideranca"))
+websub = criar_websub(config.get("websub"))
+perfil_ciclos.configurar(config)
 update_thread = None
 stop_update = threading.Event()
+despertar = threading.Event()  # interrompe a espera entre ciclos (ex.: config recarregado)
+recarga_pendente = threading.Event()
+
+# Pipeline consulta/seleção → envio: cada canal selecionado entra na fila
+# como (chave, dados); a thread de envio junta os resultados acumulados,
+# calcula o patch e emite. Se o envio atrasar, os resultados mais antigos
+# são descartados e o próximo envio relê o estado completo do gerenciador.
+fila_envio = FilaDescartaAntigos(config.get("fila_envio_max", 256))
+
+# Reinício "quente": o último estado gravado é carregado antes de aceitar
+# conexões, para que os primeiros clientes recebam dados imediatamente
+ARQUIVO_SNAPSHOT = config.get("arquivo_snapshot", "pesquisa_api/estado.json")
+snapshot_inicial = ler_snapshot(ARQUIVO_SNAPSHOT)
+if snapshot_inicial and estado.carregar(snapshot_inicial):
+    log_terminal(f"Estado anterior carregado ({len(snapshot_inicial['streams'])} canais, "
+                f"versão {estado.versao})", cor='green')
+
+# Métricas calculadas no momento da exportação (/metrics)
+metricas.registro.medidor(
+    "monitor_clientes_conectados", "Clientes WebSocket conectados a esta instância",
+    funcao=lambda: len(connected_clients))
+metricas.registro.medidor(
+    "monitor_lider", "1 se esta instância consulta a API (líder), 0 caso contrário",
+    funcao=lambda: int(lideranca.e_lider() if lideranca else True))
+metricas.registro.medidor(
+    "monitor_canal_idade_atualizacao_segundos", "Segundos desde a última atualização bem-sucedida do canal",
+    ("canal", "nome"), funcao=lambda: youtube_manager.idade_atualizacoes() if youtube_manager else {})
+metricas.registro.medidor(
+    "monitor_quota_consumida_unidades", "Unidades de quota gastas no dia (meia-noite do Pacífico)",
+    funcao=lambda: youtube_manager.chaves_api.consumido() if youtube_manager else 0)
+metricas.registro.medidor(
+    "monitor_quota_projecao_unidades", "Consumo projetado até a renovação da quota",
+    funcao=lambda: youtube_manager.chaves_api.projecao() if youtube_manager else 0)
+metricas.registro.medidor(
+    "monitor_quota_fator_intervalo", "Multiplicador aplicado aos intervalos para caber no orçamento",
+    funcao=lambda: youtube_manager.fator_quota if youtube_manager else 1)
+metricas.registro.medidor(
+    "monitor_quota_bloqueada", "1 se as consultas estão suspensas por quota",
+    funcao=lambda: int(bool(youtube_manager and youtube_manager.chaves_api.bloqueado_ate())))
+metricas.registro.medidor(
+    "monitor_chave_quota_consumida_unidades", "Unidades de quota gastas no dia por chave da API",
+    ("chave",), funcao=lambda: {(c.nome,): c.governador.consumido() for c in youtube_manager.chaves_api.chaves}
+                               if youtube_manager else {})
+metricas.registro.medidor(
+    "monitor_chave_disponivel", "1 se a chave está no pool, 0 se foi retirada (quota ou erro de chave)",
+    ("chave",), funcao=lambda: {(c.nome,): int(not c.governador.bloqueado_ate()) for c in youtube_manager.chaves_api.chaves}
+                               if youtube_manager else {})
+metricas.registro.medidor(
+    "monitor_estado_versao", "Versão atual do estado das streams",
+    funcao=lambda: estado.versao)
+metricas.registro.medidor(
+    "monitor_fila_envio_itens", "Resultados de canais aguardando a thread de envio",
+    funcao=lambda: len(fila_envio))
+metricas.registro.medidor(
+    "monitor_fila_envio_descartados", "Resultados descartados por atraso do envio (fila cheia) desde o início",
+    funcao=lambda: fila_envio.descartados)
 
 # Template HTML - Grid responsivo de lives
 
@@ -37,7 +126,7 @@ stop_update = threading.Event()
 @app.route('/')
 def index():
     """Serve a página HTML principal"""
-    return render_template('index.html')
+    return render_template('index.html', max_players=config.get("max_players", 6))
 
 @app.route('/health')
 def health():
@@ -46,69 +135,588 @@ def health():
         'status': 'healthy',
         'timestamp': dt.now(timezone.utc).isoformat(),
         'connected_clients': len(connected_clients),
-        'manager_running': youtube_manager is not None
+        'manager_running': youtube_manager is not None,
+        'lider': lideranca.e_lider() if lideranca else True,
+        'conexoes_api': youtube_manager.pool_api.estatisticas() if youtube_manager else None,
+        'conexoes_feed': youtube_manager.pool_feed.estatisticas() if youtube_manager else None,
+        'cache_videos': youtube_manager.cache_videos.estatisticas() if youtube_manager else None,
+        'quota': youtube_manager.chaves_api.estatisticas() if youtube_manager else None,
+        'websub': websub.estatisticas() if websub else None,
+        'fila_envio': {'itens': len(fila_envio), 'max': fila_envio.max_itens,
+                       'colocados': fila_envio.colocados, 'descartados': fila_envio.descartados},
     })
 
+@app.route('/metrics')
+def metrics():
+    """Métricas no formato de texto do Prometheus"""
+    return Response(metricas.registro.exportar(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/api/streams')
+def api_streams():
+    """
+    Estado atual das streams ({version, streams}) para clientes sem Socket.IO.
+    - Corpo pré-calculado (e pré-comprimido com gzip) por versão, com ETag forte;
+      If-None-Match com o ETag atual responde 304 sem corpo.
+    - ?since=<versão>: long-poll; se a versão atual for `since`, aguarda uma
+      mudança por até `timeout` segundos (máx. long_poll_max) e responde 304 se nada mudou.
+    """
+    since = request.args.get('since', type=int)
+    if since is not None:
+        sincronizar_com_lider()
+        if since == estado.versao:
+            timeout = request.args.get('timeout', 25, type=float)
+            if not math.isfinite(timeout):  # nan/inf: espera sem fim
+                timeout = 25
+            estado.aguardar_mudanca(since, min(max(timeout, 0), config.get("long_poll_max", 30)))
+    
+    sincronizar_com_lider()
+    versao, corpo, corpo_gzip, etag = estado.representacao()
+    usar_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+    if usar_gzip:
+        etag = etag[:-1] + '-gz"'
+    cabecalhos = {
+        'ETag': etag,
+        'Cache-Control': 'no-cache',
+        'Vary': 'Accept-Encoding',
+        'X-Stream-Version': str(versao),
+    }
+    
+    if etag in request.headers.get('If-None-Match', '') or since == versao:
+        return Response(status=304, headers=cabecalhos)
+    
+    if usar_gzip:
+        cabecalhos['Content-Encoding'] = 'gzip'
+    return Response(corpo_gzip if usar_gzip else corpo, status=200, headers=cabecalhos,
+                    mimetype='application/json')
+
+@app.route('/admin/recarregar-config', methods=['POST'])
+def admin_recarregar_config():
+    """
+    Solicita a releitura do config.yaml (aplicada pela thread de atualização).
+    Exige o cabeçalho X-Admin-Token se `admin_token` estiver configurado;
+    sem token, só aceita requisições locais.
+    """
+    if not admin_autorizado():
+        return jsonify({'erro': 'não autorizado'}), 403
+    solicitar_recarga()
+    return jsonify({'status': 'recarga agendada'}), 202
+
+def admin_autorizado():
+    """
+    X-Admin-Token igual a `admin_token`. Sem token configurado, as rotas
+    /admin ficam desativadas: atrás de um proxy reverso local toda
+    requisição parece vir de 127.0.0.1, então a origem não serve de prova.
+    """
+    token = config.get("admin_token")
+    if not token:
+        return False
+    return hmac.compare_digest(request.headers.get('X-Admin-Token', ''), str(token))
+
+@app.route('/admin/perfil', methods=['POST'])
+def admin_perfil():
+    """
+    Perfila os próximos ciclos: {"ciclos": N, "modo": "cprofile" | "amostragem"}.
+    {"ciclos": 0} desarma uma captura pendente.
+    """
+    if not admin_autorizado():
+        return jsonify({'erro': 'não autorizado'}), 403
+    dados = request.get_json(silent=True) or {}
+    modo = dados.get('modo', 'cprofile')
+    try:
+        ciclos = min(int(dados.get('ciclos', 1)), 50)
+    except (TypeError, ValueError):
+        ciclos = -1
+    if modo not in MODOS_PERFIL or ciclos < 0:
+        return jsonify({'erro': f"esperado ciclos (0-50) e modo em {list(MODOS_PERFIL)}"}), 400
+    perfil_ciclos.armar(ciclos, modo)
+    return jsonify({'ciclos': ciclos, 'modo': modo}), 202
+
+@app.route('/admin/perfis')
+def admin_perfis():
+    """Perfis gravados (mais recentes primeiro), com o tempo por fase de cada ciclo"""
+    if not admin_autorizado():
+        return jsonify({'erro': 'não autorizado'}), 403
+    armados, modo = perfil_ciclos.armados()
+    return jsonify({'armados': armados, 'modo': modo, 'limiar': perfil_ciclos.limiar,
+                    'perfis': perfil_ciclos.listar()})
+
+@app.route('/admin/perfis/<arquivo>')
+def admin_perfil_arquivo(arquivo):
+    """Download de um perfil (.pstats, .collapsed ou .json)"""
+    if not admin_autorizado():
+        return jsonify({'erro': 'não autorizado'}), 403
+    caminho = perfil_ciclos.caminho(arquivo)
+    if caminho is None:
+        return jsonify({'erro': 'perfil não encontrado'}), 404
+    return send_file(caminho, as_attachment=True, download_name=arquivo)
+
+@app.route('/websub', methods=['GET'])
+def websub_verificar():
+    """
+    Verificação de intenção do hub WebSub: ecoa hub.challenge. O GET pode
+    chegar a qualquer instância (ou ao líder depois de um reinício): sem o
+    pedido pendente, vale o config.yaml, e um seguidor encaminha a
+    confirmação ao líder, que mantém as assinaturas.
+    """
+    if not websub:
+        return '', 404
+    desafio = websub.verificar(request.args, canais=canais_configurados())
+    if desafio is None:
+        return '', 404
+    if desafio and youtube_manager is None and lideranca:
+        try:
+            lideranca.arrendamento.encaminhar("verificacoes", [{
+                'channel_id': channel_do_topico(request.args.get('hub.topic', '')),
+                'modo': request.args.get('hub.mode'),
+                'lease': request.args.get('hub.lease_seconds'),
+                'em': time.time(),
+            }])
+        except Exception as e:
+            log_terminal(f"WebSub: falha ao encaminhar verificação ao líder: {e}", level='error', cor='red')
+            return '', 503
+    return Response(desafio, mimetype='text/plain')
+
+def canais_configurados():
+    """channel_ids do config.yaml (para verificar assinaturas sem pedido pendente)"""
+    return {c.get("channel_id") for c in config.get("canais", []) if c.get("channel_id")}
+
+@app.route('/websub', methods=['POST'])
+def websub_notificar():
+    """
+    Notificação push do hub (Atom com os vídeos publicados ou alterados):
+    os canais afetados são consultados imediatamente e o resultado enviado
+    aos clientes sem esperar o próximo ciclo. Em um seguidor, as entradas
+    são encaminhadas ao líder pelo backend de liderança.
+    """
+    if not websub:
+        return '', 404
+    corpo = request.get_data()
+    # Assinatura inválida: o hub espera 2xx mesmo assim, mas a mensagem é ignorada
+    if not websub.validar(corpo, request.headers.get('X-Hub-Signature')):
+        metricas.notificacoes_websub.incrementar(resultado='assinatura_invalida')
+        log_terminal("Notificação WebSub com assinatura inválida ignorada", level='warning', cor='yellow')
+        return '', 202
+    try:
+        entradas = ler_feed(io.BytesIO(corpo))
+    except ET.ParseError as e:
+        metricas.notificacoes_websub.incrementar(resultado='xml_invalido')
+        log_terminal(f"Notificação WebSub com XML inválido: {e}", level='warning', cor='yellow')
+        return '', 400
+    
+    manager = youtube_manager
+    if manager or not entradas:
+        aplicar_notificacao(manager, entradas)
+        return '', 204
+    
+    # Só o líder consulta a API: sem o gerenciador aqui, as entradas vão para
+    # o líder; sem liderança configurada (gerenciador ainda não iniciado) ou
+    # com o backend fora do ar, um 503 faz o hub repetir a entrega
+    if lideranca:
+        try:
+            lideranca.arrendamento.encaminhar("notificacoes", entradas)
+            metricas.notificacoes_websub.incrementar(resultado='encaminhada')
+            return '', 202
+        except Exception as e:
+            log_terminal(f"WebSub: falha ao encaminhar notificação ao líder: {e}", level='error', cor='red')
+    metricas.notificacoes_websub.incrementar(resultado='recusada')
+    return '', 503
+
+def aplicar_notificacao(manager, entradas):
+    """Agenda a consulta imediata dos canais notificados e acorda a thread de atualização"""
+    afetados = manager.notificar_videos(entradas) if manager and entradas else []
+    metricas.notificacoes_websub.incrementar(resultado='aplicada' if afetados else 'ignorada')
+    if afetados:
+        log_terminal(f"WebSub: {', '.join(c.nome for c in afetados)} notificado(s), consultando agora", cor='cyan')
+        despertar.set()
+
 @socketio.on('connect')
-def handle_connect():
-    """Cliente WebSocket conecta"""
+def handle_connect(auth=None):
+    """
+    Cliente WebSocket conecta. A assinatura pode vir já na conexão
+    (auth = {subscription: {channels, groups}}): o cliente recebe só o
+    snapshot filtrado, sem o estado completo antes de assinar.
+    """
     connected_clients.add(request.sid)
     log_terminal(f"Cliente conectado: {request.sid} (Total: {len(connected_clients)})", cor='green')
     
-    # Enviar dados atuais imediatamente
-    if youtube_manager:
-        emit('streams_update', youtube_manager.get_streams_data())
+    assinatura = (auth or {}).get('subscription') if isinstance(auth, dict) else None
+    if isinstance(assinatura, dict) and (assinatura.get('channels') or assinatura.get('groups')):
+        aplicar_assinatura(assinatura)
+        return
+    
+    # Sem assinatura, o cliente recebe todos os canais (sala "todos")
+    join_room(SALA_TODOS)
+    
+    # Enviar estado atual imediatamente
+    sincronizar_com_lider()
+    if estado.versao:
+        emit('streams_snapshot', estado.snapshot())
 
 @socketio.on('disconnect')
 def handle_disconnect():
     """Cliente WebSocket desconecta"""
     connected_clients.discard(request.sid)
+    assinaturas.pop(request.sid, None)
     log_terminal(f"Cliente desconectado: {request.sid} (Total: {len(connected_clients)})", cor='yellow')
 
-def broadcast_update():
-    """Thread que atualiza e envia dados para todos os clientes"""
+@socketio.on('resync')
+def handle_resync(data):
+    """Cliente perdeu patches: envia os patches faltantes ou o snapshot completo"""
+    versao = (data or {}).get('version', -1)
+    sincronizar_com_lider()
+    if request.sid in assinaturas:
+        emit('streams_snapshot', estado.snapshot_filtrado(canais_assinados(assinaturas[request.sid])))
+        return
+    patches = estado.patches_desde(versao) if isinstance(versao, int) else None
+    if patches is None:
+        emit('streams_snapshot', estado.snapshot())
+    else:
+        for patch in patches:
+            emit('streams_patch', patch)
+
+@socketio.on('subscribe')
+def handle_subscribe(data):
+    """
+    Assina canais e/ou grupos do config.yaml: {channels: [...], groups: [...]}.
+    O cliente sai da sala "todos" e passa a receber apenas 'channel_update'
+    dos canais assinados. Lista vazia nos dois campos cancela a assinatura.
+    """
+    aplicar_assinatura(data or {})
+
+def aplicar_assinatura(data):
+    """Troca a assinatura do cliente atual e envia o snapshot correspondente"""
+    canais = [str(c) for c in data.get('channels') or []]
+    grupos = [str(g) for g in data.get('groups') or []]
+    desconhecidos = [g for g in grupos if g not in (config.get("grupos") or {})]
+    if desconhecidos:
+        log_terminal(f"Cliente {request.sid} assinou grupos inexistentes: {', '.join(desconhecidos)}",
+                     level='warning', cor='yellow')
+    
+    anterior = assinaturas.pop(request.sid, None)
+    if anterior:
+        for sala in salas_assinatura(anterior):
+            leave_room(sala)
+    
+    sincronizar_com_lider()
+    if not canais and not grupos:
+        join_room(SALA_TODOS)
+        emit('streams_snapshot', estado.snapshot())
+        return
+    
+    assinatura = {'canais': canais, 'grupos': grupos}
+    assinaturas[request.sid] = assinatura
+    leave_room(SALA_TODOS)
+    for sala in salas_assinatura(assinatura):
+        join_room(sala)
+    emit('streams_snapshot', estado.snapshot_filtrado(canais_assinados(assinatura)))
+
+def salas_assinatura(assinatura):
+    """Salas Socket.IO de uma assinatura: canal:<id> e grupo:<nome>"""
+    return [f"canal:{c}" for c in assinatura['canais']] + [f"grupo:{g}" for g in assinatura['grupos']]
+
+def canais_assinados(assinatura):
+    """Channel IDs de uma assinatura, com os grupos resolvidos pelo config atual"""
+    grupos = config.get("grupos") or {}
+    canais = list(assinatura['canais'])
+    for grupo in assinatura['grupos']:
+        canais.extend(c for c in grupos.get(grupo) or [] if c not in canais)
+    return canais
+
+def salas_do_canal(channel_id):
+    """Salas interessadas em um canal: a do próprio canal e as dos grupos que o contêm"""
+    grupos = config.get("grupos") or {}
+    return [f"canal:{channel_id}"] + [f"grupo:{g}" for g, canais in grupos.items()
+                                      if channel_id in (canais or [])]
+
+def sincronizar_com_lider():
+    """Em instâncias seguidoras, carrega o último estado publicado pelo líder"""
+    if lideranca and not lideranca.e_lider():
+        estado.carregar(lideranca.arrendamento.ler_estado())
+
+def publicar_patch(patch):
+    """Publica o patch para as demais instâncias e envia aos clientes conectados"""
+    if not patch:
+        return
+    snapshot = estado.snapshot(com_versoes=True)
+    try:
+        with perfil_ciclos.fase("salvar"):
+            salvar_snapshot(ARQUIVO_SNAPSHOT, snapshot,
+                            youtube_manager.metadados_canais() if youtube_manager else None)
+    except Exception as e:
+        log_terminal(f"Erro ao gravar snapshot do estado: {e}", level='error', cor='red')
+    if lideranca:
+        lideranca.arrendamento.publicar_estado(snapshot)
+    with perfil_ciclos.fase("emit"):
+        enviar_patch(patch)
+
+def enviar_patch(patch):
+    """Envia o patch aos clientes sem assinatura e um 'channel_update' por canal aos assinantes"""
+    if not connected_clients and not config.get("socketio_message_queue"):
+        return
+    inicio = time.perf_counter()
+    socketio.emit('streams_patch', patch, to=SALA_TODOS, namespace='/')
+    metricas.duracao_emit.observar(time.perf_counter() - inicio, evento='streams_patch')
+    
+    # Clientes com assinatura: um 'channel_update' por canal alterado, só para as salas interessadas
+    if not assinaturas and not config.get("socketio_message_queue"):
+        return
+    inicio = time.perf_counter()
+    alterados = {**patch["added"], **patch["changed"], **{ch: None for ch in patch["removed"]}}
+    for channel_id, stream in alterados.items():
+        socketio.emit('channel_update', {
+            'version': patch["version"],
+            'channel_id': channel_id,
+            'prev': patch["prev"].get(channel_id, 0),
+            'stream': stream,
+        }, to=salas_do_canal(channel_id), namespace='/')
+    metricas.duracao_emit.observar(time.perf_counter() - inicio, evento='channel_update')
+
+def enviar_canal(chave, dados):
+    """Entrega o resultado da seleção de um canal à thread de envio (nunca bloqueia)"""
+    fila_envio.colocar((chave, dados))
+
+def notificar_mudanca(motivo):
+    """Pede à thread de envio que releia o estado completo (ex.: canais adicionados ou removidos)"""
+    fila_envio.colocar(motivo)
+
+def transmitir():
+    """
+    Thread de envio (último estágio do pipeline): retira da fila os
+    resultados (chave, dados) de cada canal, junta os que se acumularam
+    (vale o mais recente de cada canal) e publica um único patch só com
+    esses canais. Um aviso de mudança geral (notificar_mudanca) ou
+    resultados descartados com a fila cheia fazem o envio reler o estado
+    completo do gerenciador.
+    """
+    descartados = fila_envio.descartados
+    while not stop_update.is_set():
+        primeiro = fila_envio.retirar(timeout=1)
+        if primeiro is None:
+            continue
+        itens = [primeiro] + fila_envio.drenar()
+        completo = descartados != fila_envio.descartados or not all(isinstance(i, tuple) for i in itens)
+        descartados = fila_envio.descartados
+        manager = youtube_manager
+        if manager is None:
+            continue
+        try:
+            if completo:
+                patch = estado.atualizar(manager.get_streams_data())
+            else:
+                patch = estado.atualizar_canais(dict(itens))
+            publicar_patch(patch)
+        except Exception as e:
+            log_terminal(f"Erro ao enviar atualização: {e}", level='error', cor='red')
+
+def solicitar_recarga():
+    """Agenda a recarga do config.yaml e acorda a thread de atualização"""
+    recarga_pendente.set()
+    despertar.set()
+
+def aplicar_recarga():
+    """
+    Relê o config.yaml e reconcilia canais e intervalos no gerenciador em
+    execução; canais novos são enviados aos clientes imediatamente.
+    Executado na thread de atualização, entre ciclos.
+    """
+    try:
+        recarregar_config()
+    except Exception as e:
+        log_terminal(f"config.yaml não recarregado (mantida a configuração atual): {e}", level='error', cor='red')
+        return
+    definir_cores(config.get("log_cores", True))
+    perfil_ciclos.configurar(config)
+    if youtube_manager is None:
+        log_terminal("config.yaml recarregado", cor='cyan')
+        return
+    adicionados, removidos = youtube_manager.aplicar_config(config)
+    log_terminal(f"config.yaml recarregado: {len(youtube_manager.canais)} canais "
+                f"(+{len(adicionados)} {adicionados or ''} -{len(removidos)} {removidos or ''})", cor='cyan')
+    notificar_mudanca("recarga")
+
+def observar_config():
+    """Thread que verifica a data de modificação do config.yaml e solicita a recarga"""
+    intervalo = config.get("intervalo_recarga_config", 5)
+    ultimo = mtime_config()
+    while not stop_update.wait(intervalo):
+        atual = mtime_config()
+        if atual is not None and atual != ultimo:
+            ultimo = atual
+            solicitar_recarga()
+
+def manter_websub():
+    """Thread que mantém as assinaturas WebSub iguais aos canais do líder (e as renova)"""
+    intervalo = config.get("websub", {}).get("intervalo_sincronizacao", 60)
+    while True:
+        manager = youtube_manager
+        if manager:
+            try:
+                enviados, cancelados, erros = websub.sincronizar(manager.ids_canais())
+                if enviados or cancelados:
+                    log_terminal(f"WebSub: {len(enviados)} assinatura(s) pedida(s), "
+                                 f"{len(cancelados)} cancelada(s)", cor='cyan')
+                for erro in erros:
+                    log_terminal(f"WebSub: falha ao assinar {erro}", level='warning', cor='yellow')
+            except Exception as e:
+                log_terminal(f"Erro ao sincronizar assinaturas WebSub: {e}", level='error', cor='red')
+        # Até o manager existir (líder eleito), tenta de novo a cada segundo
+        if stop_update.wait(intervalo if manager else 1):
+            return
+
+def iniciar_manager():
+    """Cria o YouTubeWebManager (apenas na instância líder)"""
     global youtube_manager
     
     try:
         youtube_manager = YouTubeWebManager()
+        if estado.versao:
+            # Reinício quente: streams do estado atual + agendamento gravado no snapshot
+            gravado = ler_snapshot(ARQUIVO_SNAPSHOT) or {}
+            restaurados = youtube_manager.restaurar_snapshot(
+                dict(estado.snapshot(), canais=gravado.get("canais", {})))
+            log_terminal(f"{restaurados} canal(is) restaurado(s) do snapshot; "
+                        f"apenas os vencidos serão consultados agora", cor='cyan')
+            # Canais retirados do config.yaml desde a gravação saem do estado
+            # (o envio seguinte só atualiza canal a canal, sem remover nenhum)
+            publicar_patch(estado.atualizar(youtube_manager.get_streams_data()))
+        else:
+            estado.atualizar(youtube_manager.get_streams_data())
+        # Cada canal concluído é enviado assim que sai da seleção
+        youtube_manager.ao_atualizar = enviar_canal
         log_terminal("YouTubeWebManager iniciado com sucesso", cor='green')
+        return True
     except Exception as e:
         log_terminal(f"Erro ao inicializar YouTubeWebManager: {e}", level='error', cor='red')
-        return
+        return False
+
+def parar_manager():
+    """Encerra o YouTubeWebManager (instância deixou de ser líder)"""
+    global youtube_manager
+    
+    if youtube_manager:
+        youtube_manager.encerrar()
+        youtube_manager = None
+
+def broadcast_update():
+    """
+    Thread de polling: executa os ciclos de consulta à API. O envio aos
+    clientes fica com a thread `transmitir`, avisada pela fila de envio.
+    """
+    if lideranca:
+        lideranca.iniciar()
+        log_terminal(f"Instância {lideranca.dono} aguardando liderança", cor='cyan')
     
+    proximo_tique = None  # instante (monotônico) do próximo tique de intervalo_execucao
     while not stop_update.is_set():
         try:
-            # Executar ciclo de monitoramento
-            youtube_manager.run_cycle()
+            if recarga_pendente.is_set():
+                recarga_pendente.clear()
+                aplicar_recarga()
+            
+            # Seguidor: servir o estado publicado pelo líder e aguardar o arrendamento
+            if lideranca and not lideranca.e_lider():
+                if youtube_manager:
+                    log_terminal("Liderança perdida, consultas à API suspensas", level='warning', cor='yellow')
+                    parar_manager()
+                    proximo_tique = None
+                sincronizar_com_lider()
+                despertar.wait(lideranca.arrendamento.duracao / 3)
+                despertar.clear()
+                continue
+            
+            if youtube_manager is None:
+                if lideranca:
+                    sincronizar_com_lider()
+                    log_terminal(f"Instância {lideranca.dono} eleita líder", cor='green')
+                if not iniciar_manager():
+                    return
             
-            # Enviar dados para todos os clientes conectados
-            if connected_clients:
-                streams_data = youtube_manager.get_streams_data()
-                socketio.emit('streams_update', streams_data, namespace='/')
+            # Executar ciclo de monitoramento; cada canal concluído já vai para
+            # a thread de envio durante o ciclo (ao_atualizar)
+            # (o ciclo é medido por fase e perfilado se solicitado em /admin/perfil)
+            inicio = time.monotonic()
+            with perfil_ciclos.ciclo():
+                youtube_manager.run_cycle()
             
-            # Aguardar próximo ciclo
-            time.sleep(youtube_manager.intervalo_execucao)
+            # Aguardar a próxima consulta agendada ou o próximo tique fixo de
+            # intervalo_execucao: os tiques são contados a partir do primeiro
+            # ciclo, sem acumular a duração de cada ciclo na espera
+            agora = time.monotonic()
+            periodo = max(youtube_manager.intervalo_execucao * youtube_manager.fator_quota, 1)
+            if proximo_tique is None:
+                proximo_tique = inicio + periodo
+            if proximo_tique <= agora:
+                # Ciclo mais longo que o período: tiques perdidos não são recuperados
+                proximo_tique += ((agora - proximo_tique) // periodo + 1) * periodo
+            espera = min(youtube_manager.segundos_ate_proximo_ciclo(), proximo_tique - agora)
+            if lideranca:
+                espera = min(espera, lideranca.arrendamento.duracao / 3)
+            despertar.wait(espera)
+            despertar.clear()
             
         except Exception as e:
             log_terminal(f"Erro no broadcast_update: {e}", level='error', cor='red')
-            time.sleep(5)
+            socketio.sleep(5)
+    
+    if lideranca:
+        lideranca.parar()
+
+def receber_encaminhadas():
+    """Thread do líder que aplica as verificações e notificações WebSub encaminhadas pelos seguidores"""
+    intervalo = config.get("websub", {}).get("intervalo_encaminhadas", 2)
+    while not stop_update.wait(intervalo):
+        manager = youtube_manager
+        if manager is None:
+            continue
+        try:
+            verificacoes = lideranca.arrendamento.retirar("verificacoes")
+            entradas = lideranca.arrendamento.retirar("notificacoes")
+        except Exception as e:
+            log_terminal(f"WebSub: erro ao ler mensagens encaminhadas: {e}", level='error', cor='red')
+            continue
+        for v in verificacoes:
+            websub.confirmar(v.get("channel_id"), v.get("modo"), v.get("lease"), v.get("em"))
+        if entradas:
+            aplicar_notificacao(manager, entradas)
 
 def start_update_thread():
-    """Inicia a thread de atualização em background"""
+    """
+    Inicia a thread de atualização em background.
+    Em modo eventlet/gevent, threading já foi substituído por green threads:
+    o polling coopera com os emits em vez de bloqueá-los.
+    """
     global update_thread
     if update_thread is None or not update_thread.is_alive():
         stop_update.clear()
         update_thread = threading.Thread(target=broadcast_update, daemon=True)
         update_thread.start()
-        log_terminal("Thread de atualização iniciada", cor='green')
+        threading.Thread(target=transmitir, daemon=True, name="envio").start()
+        if config.get("intervalo_recarga_config", 5):
+            threading.Thread(target=observar_config, daemon=True, name="observar-config").start()
+        if websub:
+            threading.Thread(target=manter_websub, daemon=True, name="websub").start()
+            if lideranca:
+                threading.Thread(target=receber_encaminhadas, daemon=True,
+                                 name="websub-encaminhadas").start()
+        log_terminal(f"Thread de atualização iniciada (async_mode={ASYNC_MODE})", cor='green')
+
+def run_server(host='0.0.0.0', port=5000):
+    """Executa o servidor no modo assíncrono configurado"""
+    opcoes = {'allow_unsafe_werkzeug': True} if ASYNC_MODE == 'threading' else {}
+    socketio.run(app, host=host, port=port, debug=False, **opcoes)
 
 if __name__ == '__main__':
     start_update_thread()
     
     try:
-        log_terminal("Servidor iniciando em http://0.0.0.0:5000", cor='green')
-        log_terminal("Acesse em: http://localhost:5000 ou http://<SEU_IP>:5000", cor='cyan')
-        socketio.run(app, host='0.0.0.0', port=5000, debug=False, allow_unsafe_werkzeug=True)
+        porta = config.get("porta", 5000)
+        log_terminal(f"Servidor iniciando em http://0.0.0.0:{porta} (async_mode={ASYNC_MODE})", cor='green')
+        log_terminal(f"Acesse em: http://localhost:{porta} ou http://<SEU_IP>:{porta}", cor='cyan')
+        run_server(port=porta)
     except KeyboardInterrupt:
         log_terminal("Servidor encerrado pelo usuário", cor='yellow')
         stop_update.set()
+        despertar.set()
+        if lideranca:
+            lideranca.parar()
+        parar_manager()
@@ -1,25 +1,81 @@
 class StreamGridManager {
     constructor() {
         this.streams = {};
+        this.version = null;
+        this.channelVersions = {};
+        this.subscription = this.readSubscription();
         this.socket = null;
+        this.maxPlayers = this.readMaxPlayers();
+        this.visible = new Set();       // ids dos cartões na área visível
+        this.timeEls = new Map();       // channel_id -> elemento do status (evita querySelector no timer)
+        this.syncPending = false;
+        this.observer = 'IntersectionObserver' in window
+            ? new IntersectionObserver((entries) => this.onVisibilityChange(entries), { rootMargin: '200px' })
+            : null;
         this.initSocket();
         setInterval(() => this.updateTimes(), 1000);
     }
 
+    // Limite de players simultâneos: ?players=N ou max_players do config.yaml
+    readMaxPlayers() {
+        const param = parseInt(new URLSearchParams(window.location.search).get('players'), 10);
+        if (!isNaN(param)) return Math.max(param, 0);
+        const configured = parseInt(document.getElementById('streamsGrid').dataset.maxPlayers, 10);
+        return isNaN(configured) ? 6 : configured;
+    }
+
+    // ?canais=UC1,UC2&grupos=sul → recebe apenas esses canais (salas Socket.IO)
+    readSubscription() {
+        const params = new URLSearchParams(window.location.search);
+        const list = (name) => (params.get(name) || '').split(',').map(s => s.trim()).filter(Boolean);
+        const channels = list('canais');
+        const groups = list('grupos');
+        return (channels.length || groups.length) ? { channels, groups } : null;
+    }
+
     initSocket() {
-        this.socket = io();
-        
+        // A assinatura vai na própria conexão (e em cada reconexão): o servidor
+        // já responde com o snapshot filtrado, sem enviar o estado completo antes
+        this.socket = io({ auth: this.subscription ? { subscription: this.subscription } : {} });
+
         this.socket.on('connect', () => {
             this.setConnectionStatus(true);
             console.log('Socket.IO conectado');
         });
-        
-        this.socket.on('streams_update', (data) => {
-            this.streams = data;
+
+        // Estado completo (conexão inicial ou resync)
+        this.socket.on('streams_snapshot', (data) => {
+            this.version = data.version;
+            this.streams = data.streams;
+            this.channelVersions = data.channel_versions || {};
             this.render();
             this.updateLastUpdate();
         });
-        
+
+        // Apenas os canais que mudaram desde a versão anterior
+        this.socket.on('streams_patch', (patch) => {
+            if (this.version === null || patch.base !== this.version) {
+                if (this.version === null || patch.version > this.version) {
+                    this.socket.emit('resync', { version: this.version });
+                }
+                return;
+            }
+            this.applyPatch(patch);
+            this.updateLastUpdate();
+        });
+
+        // Assinantes: um canal por mensagem; prev é a versão anterior daquele canal
+        this.socket.on('channel_update', (msg) => {
+            const known = this.channelVersions[msg.channel_id] ?? 0;
+            if (msg.version <= known) return;
+            if (this.version === null || msg.prev !== known) {
+                this.socket.emit('resync', { version: this.version });
+                return;
+            }
+            this.applyChannelUpdate(msg);
+            this.updateLastUpdate();
+        });
+
         this.socket.on('disconnect', () => {
             this.setConnectionStatus(false);
             console.log('Socket.IO desconectado');
@@ -29,7 +85,7 @@ class StreamGridManager {
     setConnectionStatus(connected) {
         const dot = document.getElementById('connectionStatus');
         const text = document.getElementById('connectionText');
-        
+
         if (connected) {
             dot.classList.add('connected');
             dot.classList.remove('disconnected');
@@ -43,94 +99,254 @@ class StreamGridManager {
 
     updateLastUpdate() {
         const now = new Date();
-        const time = now.toLocaleTimeString('pt-BR', { 
-            hour: '2-digit', 
+        const time = now.toLocaleTimeString('pt-BR', {
+            hour: '2-digit',
             minute: '2-digit'
         });
         document.getElementById('lastUpdate').textContent = time;
     }
 
+    // Um único timer: só as contagens regressivas visíveis, e só escreve no DOM se o texto mudou
     updateTimes() {
-        Object.values(this.streams).forEach(stream => {
-            const card = document.getElementById(`stream-${stream.channel_id}`);
-            if (!card) return;
-            
-            const statusEl = card.querySelector('.time-value');
-            if (statusEl) {
-                statusEl.textContent = this.formatStreamTime(stream);
-            }
+        const now = new Date();
+        const channelIds = this.observer
+            ? Array.from(this.visible, cardId => cardId.slice('stream-'.length))
+            : Array.from(this.timeEls.keys());
+        channelIds.forEach(channelId => {
+            const stream = this.streams[channelId];
+            const el = this.timeEls.get(channelId);
+            if (!stream || !el || this.getStatus(stream) !== 'scheduled') return;
+
+            const text = this.formatStreamTime(stream, now);
+            if (el.textContent !== text) el.textContent = text;
         });
     }
 
-    formatStreamTime(stream) {
+    formatStreamTime(stream, now = new Date()) {
         if (!stream.selected_stream) return 'Sem streams';
-        
+
         const selected = stream.selected_stream;
-        const now = new Date();
-        
+
         if (selected.actualStartTime) {
             return '🔴 AO VIVO';
         }
-        
+
         if (selected.scheduledStartTime) {
             const scheduled = new Date(selected.scheduledStartTime.replace('Z', '+00:00'));
             const diff = scheduled - now;
-            
+
             if (diff > 0) {
                 const hours = Math.floor(diff / 3600000);
                 const mins = Math.floor((diff % 3600000) / 60000);
                 return `Em ${hours}h ${mins}m`;
             }
         }
-        
+
         return 'Offline';
     }
 
+    getStatus(stream) {
+        const selected = stream.selected_stream;
+        const isLive = selected && selected.actualStartTime;
+        const isScheduled = selected && selected.scheduledStartTime && !selected.actualStartTime;
+        return isLive ? 'live' : (isScheduled ? 'scheduled' : 'offline');
+    }
+
+    applyPatch(patch) {
+        const grid = document.getElementById('streamsGrid');
+
+        patch.removed.forEach(channelId => {
+            delete this.streams[channelId];
+            const card = document.getElementById(`stream-${channelId}`);
+            if (card) this.removeCard(card);
+        });
+
+        Object.entries(patch.added).forEach(([channelId, stream]) => {
+            this.streams[channelId] = stream;
+        });
+        Object.entries(patch.changed).forEach(([channelId, stream]) => {
+            this.streams[channelId] = stream;
+            const card = document.getElementById(`stream-${channelId}`);
+            if (card) this.updateCard(card, stream);
+        });
+
+        this.version = patch.version;
+
+        if (Object.keys(patch.added).length || !grid.querySelector('.stream-card')) {
+            this.render();
+        }
+    }
+
+    applyChannelUpdate(msg) {
+        const channelId = msg.channel_id;
+        const card = document.getElementById(`stream-${channelId}`);
+        const isNew = !(channelId in this.streams);
+
+        if (msg.stream === null) {
+            delete this.streams[channelId];
+            if (card) this.removeCard(card);
+        } else {
+            this.streams[channelId] = msg.stream;
+            if (card) this.updateCard(card, msg.stream);
+        }
+
+        this.channelVersions[channelId] = msg.version;
+        this.version = Math.max(this.version, msg.version);
+
+        if ((isNew && msg.stream !== null) || !Object.keys(this.streams).length) {
+            this.render();
+        }
+    }
+
     render() {
         const grid = document.getElementById('streamsGrid');
-        
+
         if (Object.keys(this.streams).length === 0) {
+            grid.querySelectorAll('.stream-card').forEach(card => this.removeCard(card));
             grid.innerHTML = '<div class="no-streams"><p>Nenhuma stream disponível</p></div>';
             return;
         }
-        
-        grid.innerHTML = Object.entries(this.streams).map(([channelId, stream]) => {
-            const selected = stream.selected_stream;
-            const isLive = selected && selected.actualStartTime;
-            const isScheduled = selected && selected.scheduledStartTime && !selected.actualStartTime;
-            const status = isLive ? 'live' : (isScheduled ? 'scheduled' : 'offline');
-            
-            return `
-                <div class="stream-card ${status}" id="stream-${channelId}">
-                    <div class="video-player">
-                        ${selected ? `
-                            <iframe 
-                                src="https://www.youtube.com/embed/${selected.videoId}?autoplay=1&controls=1&mute=1"
-                                allow="accelerometer; autoplay; clipboard-write; encrypted-media; gyroscope; picture-in-picture"
-                                allowfullscreen>
-                            </iframe>
-                        ` : `
-                            <div class="video-placeholder">
-                                Nenhuma stream disponível
-                            </div>
-                        `}
-                    </div>
-                    <div class="card-info">
-                        <div class="card-title">${selected?.title || stream.nome}</div>
-                        <div class="card-meta">
-                            <span class="channel-name">${stream.nome}</span>
-                            <span class="badge ${status}">
-                                ${status === 'live' ? '🔴 Ao Vivo' : (status === 'scheduled' ? '⏰ Agendada' : '⚫ Offline')}
-                            </span>
-                        </div>
-                        <div class="time-info">
-                            <span class="time-label">Status:</span>
-                            <span class="time-value">${this.formatStreamTime(stream)}</span>
-                        </div>
-                    </div>
+
+        // Reaproveita os cartões existentes para não recarregar os iframes
+        const placeholder = grid.querySelector('.no-streams');
+        if (placeholder) placeholder.remove();
+
+        const existing = new Map(
+            Array.from(grid.querySelectorAll('.stream-card')).map(card => [card.id, card])
+        );
+        existing.forEach((card, id) => {
+            if (!(id.slice('stream-'.length) in this.streams)) this.removeCard(card);
+        });
+
+        // Mover um iframe no DOM o recarrega: só insere cartões fora de posição
+        let prev = null;
+        Object.entries(this.streams).forEach(([channelId, stream]) => {
+            let card = existing.get(`stream-${channelId}`);
+            if (card) {
+                this.updateCard(card, stream);
+            } else {
+                card = this.createCard(channelId, stream);
+            }
+            const expected = prev ? prev.nextElementSibling : grid.firstElementChild;
+            if (card !== expected) grid.insertBefore(card, expected);
+            prev = card;
+        });
+
+        this.schedulePlayerSync();
+    }
+
+    removeCard(card) {
+        if (this.observer) this.observer.unobserve(card);
+        this.visible.delete(card.id);
+        this.timeEls.delete(card.id.slice('stream-'.length));
+        card.remove();
+        this.schedulePlayerSync();
+    }
+
+    onVisibilityChange(entries) {
+        entries.forEach(entry => {
+            if (entry.isIntersecting) this.visible.add(entry.target.id);
+            else this.visible.delete(entry.target.id);
+        });
+        this.updateTimes();
+        this.schedulePlayerSync();
+    }
+
+    // Agrupa as mudanças de um mesmo quadro em uma única passada pelos players
+    schedulePlayerSync() {
+        if (this.syncPending) return;
+        this.syncPending = true;
+        requestAnimationFrame(() => {
+            this.syncPending = false;
+            this.syncPlayers();
+        });
+    }
+
+    /*
+     * Só cartões ao vivo e visíveis recebem iframe, na ordem do grid e até
+     * maxPlayers; os demais mostram a miniatura do vídeo (ou um aviso).
+     */
+    syncPlayers() {
+        let players = 0;
+        document.querySelectorAll('#streamsGrid .stream-card').forEach(card => {
+            const stream = this.streams[card.id.slice('stream-'.length)];
+            if (!stream) return;
+            const visible = !this.observer || this.visible.has(card.id);
+            const wantsPlayer = visible && this.getStatus(stream) === 'live' && players < this.maxPlayers;
+            if (wantsPlayer) players++;
+            this.mountMedia(card, stream, wantsPlayer ? 'player' : 'thumb');
+        });
+    }
+
+    mountMedia(card, stream, mode) {
+        const player = card.querySelector('.video-player');
+        const selected = stream.selected_stream;
+        const videoId = selected ? selected.videoId : '';
+        const key = selected ? `${mode}:${videoId}` : 'empty';
+        if (player.dataset.media === key) return;
+
+        player.dataset.media = key;
+        if (!selected) {
+            player.innerHTML = `
+                <div class="video-placeholder">
+                    Nenhuma stream disponível
                 </div>
             `;
-        }).join('');
+        } else if (mode === 'player') {
+            player.innerHTML = `
+                <iframe
+                    src="https://www.youtube.com/embed/${videoId}?autoplay=1&controls=1&mute=1"
+                    allow="accelerometer; autoplay; clipboard-write; encrypted-media; gyroscope; picture-in-picture"
+                    allowfullscreen>
+                </iframe>
+            `;
+        } else {
+            player.innerHTML = `
+                <img class="video-thumb" src="https://i.ytimg.com/vi/${videoId}/mqdefault.jpg"
+                     alt="" loading="lazy" decoding="async">
+            `;
+        }
+    }
+
+    createCard(channelId, stream) {
+        const card = document.createElement('div');
+        card.id = `stream-${channelId}`;
+        card.innerHTML = `
+            <div class="video-player"></div>
+            <div class="card-info">
+                <div class="card-title"></div>
+                <div class="card-meta">
+                    <span class="channel-name"></span>
+                    <span class="badge"></span>
+                </div>
+                <div class="time-info">
+                    <span class="time-label">Status:</span>
+                    <span class="time-value"></span>
+                </div>
+            </div>
+        `;
+        this.timeEls.set(channelId, card.querySelector('.time-value'));
+        if (this.observer) this.observer.observe(card);
+        this.updateCard(card, stream);
+        return card;
+    }
+
+    updateCard(card, stream) {
+        const selected = stream.selected_stream;
+        const status = this.getStatus(stream);
+
+        card.className = `stream-card ${status}`;
+        card.querySelector('.card-title').textContent = selected?.title || stream.nome;
+        card.querySelector('.channel-name').textContent = stream.nome;
+
+        const badge = card.querySelector('.badge');
+        badge.className = `badge ${status}`;
+        badge.textContent = status === 'live' ? '🔴 Ao Vivo' : (status === 'scheduled' ? '⏰ Agendada' : '⚫ Offline');
+
+        card.querySelector('.time-value').textContent = this.formatStreamTime(stream);
+
+        // Player ou miniatura são decididos em syncPlayers (visibilidade e limite)
+        this.schedulePlayerSync();
     }
 }
 
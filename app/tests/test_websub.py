@@ -0,0 +1,160 @@
+"""
+Assinatura WebSub contra o hub local (benchmarks.hub_falso): pedido de
+assinatura, verificação de intenção, notificação assinada e recusa de
+X-Hub-Signature inválido. O callback é um servidor HTTP mínimo que
+responde como o /websub do server_web.
+"""
+
+import io
+import hmac
+import time
+import hashlib
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+import pytest
+
+from benchmarks.hub_falso import HubFalso, atom_notificacao
+from feed_videos import ler_feed
+from websub import AssinanteWebSub, TOPICO_CANAL
+
+CANAL = "UCteste000000000000000001"
+SEGREDO = "segredo-de-teste"
+
+
+class _Callback(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, status, texto=""):
+        dados = texto.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_GET(self):
+        params = {k: v[0] for k, v in parse_qs(urlsplit(self.path).query).items()}
+        desafio = self.server.assinante.verificar(params, canais=self.server.canais)
+        if desafio is None:
+            return self._responder(404)
+        self._responder(200, desafio)
+
+    def do_POST(self):
+        corpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not self.server.assinante.validar(corpo, self.headers.get("X-Hub-Signature")):
+            self.server.recusadas.append(corpo)
+            return self._responder(202)
+        self.server.recebidas.extend(ler_feed(io.BytesIO(corpo)))
+        self._responder(204)
+
+
+@pytest.fixture
+def hub():
+    with HubFalso(atraso_verificacao=0) as hub:
+        yield hub
+
+
+def iniciar_callback(hub, canais=None, segredo=SEGREDO):
+    """Servidor de callback com seu próprio AssinanteWebSub; retorna o servidor"""
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), _Callback)
+    servidor.daemon_threads = True
+    url = f"http://127.0.0.1:{servidor.server_address[1]}/websub"
+    servidor.assinante = AssinanteWebSub(url, hub=hub.url, segredo=segredo)
+    servidor.canais = canais
+    servidor.recebidas = []
+    servidor.recusadas = []
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def aguardar(condicao, timeout=5):
+    limite = time.time() + timeout
+    while time.time() < limite:
+        if condicao():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def callback(hub):
+    servidor = iniciar_callback(hub)
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+    servidor.assinante.fechar()
+
+
+def test_assinatura_confirmada_pela_verificacao(hub, callback):
+    enviados, cancelados, erros = callback.assinante.sincronizar([CANAL])
+    assert (enviados, cancelados, erros) == ([CANAL], [], [])
+
+    assert aguardar(lambda: hub.verificacoes)
+    assert hub.verificacoes == [("subscribe", CANAL, True)]
+    assert callback.assinante.estatisticas()["ativas"] == 1
+    assert callback.assinante.estatisticas()["pendentes"] == 0
+    # Assinatura confirmada e longe do fim: nada a pedir de novo
+    assert callback.assinante.sincronizar([CANAL]) == ([], [], [])
+
+
+def test_notificacao_assinada_e_entregue(hub, callback):
+    callback.assinante.sincronizar([CANAL])
+    assert aguardar(lambda: hub.assinaturas)
+
+    assert hub.publicar(CANAL, "video123", "Live de teste") == 1
+    assert [e["videoId"] for e in callback.recebidas] == ["video123"]
+    assert callback.recebidas[0]["channelId"] == CANAL
+    assert callback.recusadas == []
+
+
+def test_assinatura_invalida_recusada(hub, callback):
+    corpo = atom_notificacao(CANAL, "forjado", "Live forjada")
+    assinaturas = [
+        None,
+        "sha1=" + hmac.new(b"outro-segredo", corpo, hashlib.sha1).hexdigest(),
+        "md5=" + hashlib.md5(corpo).hexdigest(),
+        "lixo",
+    ]
+    for assinatura in assinaturas:
+        headers = {"Content-Type": "application/atom+xml"}
+        if assinatura:
+            headers["X-Hub-Signature"] = assinatura
+        pedido = urllib.request.Request(callback.assinante.callback, corpo, headers)
+        with urllib.request.urlopen(pedido, timeout=5) as r:
+            assert r.status == 202
+    assert callback.recebidas == []
+    assert len(callback.recusadas) == len(assinaturas)
+
+
+def test_sem_segredo_nada_e_aceito():
+    assinante = AssinanteWebSub("http://127.0.0.1:1/websub", segredo=None)
+    corpo = atom_notificacao(CANAL, "v", "t")
+    assert not assinante.validar(corpo, None)
+    assert not assinante.validar(corpo, "sha1=" + hmac.new(b"", corpo, hashlib.sha1).hexdigest())
+
+
+def test_verificacao_em_outra_instancia_usa_canais_configurados(hub, callback):
+    # Pedido feito por uma instância; o GET do hub chega a outra (seguidor)
+    seguidor = iniciar_callback(hub, canais={CANAL})
+    try:
+        callback.assinante.callback = seguidor.assinante.callback
+        callback.assinante.sincronizar([CANAL])
+        assert aguardar(lambda: hub.verificacoes)
+        assert hub.verificacoes == [("subscribe", CANAL, True)]
+        assert seguidor.assinante.estatisticas()["ativas"] == 1
+
+        # Canal fora do config.yaml: assinatura recusada, cancelamento aceito
+        topico = TOPICO_CANAL.format(channel_id="UCfora")
+        assert seguidor.assinante.verificar(
+            {"hub.mode": "subscribe", "hub.topic": topico, "hub.challenge": "x"}, canais={CANAL}) is None
+        assert seguidor.assinante.verificar(
+            {"hub.mode": "unsubscribe", "hub.topic": topico, "hub.challenge": "x"}, canais={CANAL}) == "x"
+    finally:
+        seguidor.shutdown()
+        seguidor.server_close()
+        seguidor.assinante.fechar()
@@ -47,22 +47,31 @@ def limpar_pesquisa_api(mensagem=None):
         print(mensagem)
 
 
-def precisa_limpar_pesquisa_api():
+def precisa_limpar_pesquisa_api(armazenamento=None):
     """
     Verifica se é necessário limpar a pasta de pesquisas (se não há pesquisa do dia).
+    Com um ArmazenamentoPesquisas, consulta o índice do banco em vez de listar arquivos.
     """
     import glob
     from datetime import datetime, timezone
+    if armazenamento is not None:
+        inicio_dia = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        return not armazenamento.possui_pesquisa_desde(inicio_dia.timestamp())
     hoje_str = datetime.now(timezone.utc).strftime("%d-%m-%Y")
     arquivos_hoje = glob.glob(f"pesquisa_api/*/{hoje_str}_*.json")
     return len(arquivos_hoje) == 0
 
-def manter_apenas_ultimas_pesquisas_pastas(pastas, max_arquivos=5):
+def manter_apenas_ultimas_pesquisas_pastas(pastas, max_arquivos=5, armazenamento=None):
     """
     Para cada pasta em pesquisa_api, mantém apenas os últimos max_arquivos arquivos .json, removendo os mais antigos.
+    Com um ArmazenamentoPesquisas, a poda é feita por um único DELETE indexado no banco.
     """
     import os
     import glob
+    if armazenamento is not None:
+        removidas = armazenamento.podar(max_por_canal=max_arquivos)
+        print(f"[INFO] Removidas {removidas} pesquisa(s) antiga(s) do banco")
+        return
     for pasta in pastas:
         if not os.path.isdir(pasta):
             continue
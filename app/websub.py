@@ -0,0 +1,236 @@
+"""
+websub.py - Assinaturas WebSub (PubSubHubbub) dos feeds dos canais
+O hub do YouTube avisa (POST Atom no callback) quando um canal publica ou
+altera um vídeo, inclusive transmissões agendadas. As assinaturas têm
+prazo (lease) e são renovadas antes de expirar; canais retirados do
+config.yaml têm a assinatura cancelada.
+"""
+
+import hmac
+import time
+import hashlib
+import threading
+from urllib.parse import urlsplit, urlencode, parse_qs
+
+from pool_conexoes import PoolConexoesHTTPS
+
+HUB_PADRAO = "https://pubsubhubbub.appspot.com/subscribe"
+TOPICO_CANAL = "https://www.youtube.com/xml/feeds/videos.xml?channel_id={channel_id}"
+
+
+def channel_do_topico(topico):
+    """Extrai o channel_id da URL do tópico (ou None)"""
+    try:
+        return parse_qs(urlsplit(topico).query).get("channel_id", [None])[0]
+    except Exception:
+        return None
+
+
+class AssinanteWebSub:
+    """
+    Mantém as assinaturas WebSub dos canais.
+
+    - `sincronizar(channel_ids)`: assina canais novos ou com lease perto do
+      fim e cancela os que saíram da lista;
+    - `verificar(params, canais)`: responde à verificação de intenção do hub (GET);
+    - `confirmar(...)`: registra uma verificação aceita por outra instância;
+    - `validar(corpo, assinatura)`: confere o X-Hub-Signature das notificações.
+    """
+
+    def __init__(self, callback, hub=HUB_PADRAO, segredo=None, lease=432000, margem=3600,
+                 reenvio=300, timeout=10):
+        """
+        Args:
+            callback: URL pública de /websub neste servidor
+            hub: URL de assinatura do hub
+            segredo: Segredo HMAC das notificações (sem ele, nenhuma é aceita)
+            lease: Prazo (s) pedido ao hub para cada assinatura
+            margem: Renova a assinatura quando faltar menos que isso (s)
+            reenvio: Espera (s) antes de repetir um pedido não confirmado
+            timeout: Timeout (s) das requisições ao hub
+        """
+        self.callback = callback
+        self.hub = hub
+        self.segredo = segredo
+        self.lease = lease
+        self.margem = margem
+        self.reenvio = reenvio
+
+        url = urlsplit(hub)
+        self._caminho_hub = url.path or "/"
+        self.pool_hub = PoolConexoesHTTPS(url.hostname, max_conexoes=2, timeout=timeout,
+                                          https=url.scheme == "https", port=url.port)
+
+        self._lock = threading.Lock()
+        self._expira_em = {}  # channel_id -> fim do lease confirmado pelo hub
+        self._pedidos = {}    # channel_id -> (modo, instante do pedido) aguardando verificação
+
+    # --- Pedidos ao hub -----------------------------------------------------
+
+    def solicitar(self, channel_id, modo="subscribe"):
+        """
+        Envia um pedido de assinatura (ou cancelamento) ao hub.
+        Retorna o status HTTP; 202/204 indicam pedido aceito, confirmado
+        depois pela verificação em `verificar`.
+        """
+        parametros = {
+            "hub.callback": self.callback,
+            "hub.mode": modo,
+            "hub.topic": TOPICO_CANAL.format(channel_id=channel_id),
+            "hub.verify": "async",
+        }
+        if modo == "subscribe":
+            parametros["hub.lease_seconds"] = str(self.lease)
+            if self.segredo:
+                parametros["hub.secret"] = self.segredo
+        with self._lock:
+            self._pedidos[channel_id] = (modo, time.time())
+        status, _headers, _corpo = self.pool_hub.requisitar(
+            "POST", self._caminho_hub,
+            {"Content-Type": "application/x-www-form-urlencoded"},
+            urlencode(parametros).encode("utf-8"),
+        )
+        return status
+
+    def sincronizar(self, channel_ids, agora=None):
+        """
+        Deixa as assinaturas iguais à lista de canais.
+
+        Returns:
+            Tupla (canais assinados ou renovados, canais cancelados, erros)
+        """
+        agora = time.time() if agora is None else agora
+        desejados = set(channel_ids)
+        with self._lock:
+            assinar = [
+                c for c in desejados
+                if self._expira_em.get(c, 0) - agora < self.margem and not self._aguardando(c, "subscribe", agora)
+            ]
+            cancelar = [
+                c for c in self._expira_em
+                if c not in desejados and not self._aguardando(c, "unsubscribe", agora)
+            ]
+
+        enviados, cancelados, erros = [], [], []
+        for channel_id, modo, lista in ([(c, "subscribe", enviados) for c in assinar]
+                                        + [(c, "unsubscribe", cancelados) for c in cancelar]):
+            try:
+                status = self.solicitar(channel_id, modo)
+            except Exception as e:
+                erros.append(f"{channel_id}: {e}")
+                continue
+            if status in (202, 204):
+                lista.append(channel_id)
+            else:
+                erros.append(f"{channel_id}: HTTP {status}")
+        return enviados, cancelados, erros
+
+    def _aguardando(self, channel_id, modo, agora):
+        """Pedido recente do mesmo modo ainda sem verificação (chamado com o lock)"""
+        pedido = self._pedidos.get(channel_id)
+        return pedido is not None and pedido[0] == modo and agora - pedido[1] < self.reenvio
+
+    # --- Callback -----------------------------------------------------------
+
+    def verificar(self, params, agora=None, canais=None):
+        """
+        Verificação de intenção (GET no callback). Retorna o hub.challenge a
+        ecoar ("" para uma recusa do hub), ou None se o pedido não partiu
+        deste servidor.
+
+        Args:
+            canais: channel_ids configurados. Sem um pedido pendente nesta
+                instância (pedido feito pelo líder, ou antes de um reinício),
+                a verificação é aceita se o modo combina com a configuração:
+                assinatura de canal configurado ou cancelamento de canal fora dela
+        """
+        agora = time.time() if agora is None else agora
+        modo = params.get("hub.mode")
+        channel_id = channel_do_topico(params.get("hub.topic", ""))
+        desafio = params.get("hub.challenge")
+        if not channel_id:
+            return None
+        if modo == "denied":
+            # Hub recusou a assinatura (sem desafio): tenta de novo na próxima sincronização
+            with self._lock:
+                self._expira_em.pop(channel_id, None)
+                self._pedidos.pop(channel_id, None)
+            return ""
+        if desafio is None or modo not in ("subscribe", "unsubscribe"):
+            return None
+        with self._lock:
+            pedido = self._pedidos.get(channel_id)
+        if pedido:
+            if pedido[0] != modo:
+                return None
+        elif canais is None or (channel_id in canais) != (modo == "subscribe"):
+            return None
+        self.confirmar(channel_id, modo, params.get("hub.lease_seconds"), agora)
+        return desafio
+
+    def confirmar(self, channel_id, modo, lease=None, agora=None):
+        """
+        Registra uma verificação aceita (nesta instância ou encaminhada por
+        outra): a assinatura vale por `lease` segundos a partir de `agora`.
+        """
+        agora = time.time() if agora is None else agora
+        try:
+            lease = int(lease if lease is not None else self.lease)
+        except ValueError:
+            lease = self.lease
+        with self._lock:
+            if modo == "subscribe":
+                self._expira_em[channel_id] = agora + lease
+            else:
+                self._expira_em.pop(channel_id, None)
+            self._pedidos.pop(channel_id, None)
+
+    def validar(self, corpo, assinatura):
+        """
+        Confere X-Hub-Signature (sha1=...) da notificação. Sem segredo não há
+        como saber se o POST veio do hub, então nada é aceito.
+        """
+        if not self.segredo or not assinatura or "=" not in assinatura:
+            return False
+        algoritmo, recebido = assinatura.split("=", 1)
+        if algoritmo not in ("sha1", "sha256", "sha384", "sha512"):
+            return False
+        esperado = hmac.new(self.segredo.encode("utf-8"), corpo, getattr(hashlib, algoritmo)).hexdigest()
+        return hmac.compare_digest(esperado, recebido)
+
+    def estatisticas(self, agora=None):
+        """Estado das assinaturas (para /health)"""
+        agora = time.time() if agora is None else agora
+        with self._lock:
+            return {
+                "hub": self.hub,
+                "callback": self.callback,
+                "ativas": sum(1 for fim in self._expira_em.values() if fim > agora),
+                "pendentes": len(self._pedidos),
+                "proxima_expiracao": min(self._expira_em.values(), default=None),
+            }
+
+    def fechar(self):
+        self.pool_hub.fechar()
+
+
+def criar_websub(cfg):
+    """
+    Cria o AssinanteWebSub a partir da seção `websub` do config.yaml.
+    Retorna None se a seção não existir ou não tiver `callback`.
+
+    Raises:
+        ValueError: seção sem `segredo` (qualquer um que conheça o callback
+            poderia agendar consultas à API com notificações forjadas)
+    """
+    if not cfg or not cfg.get("callback"):
+        return None
+    if not cfg.get("segredo"):
+        raise ValueError("websub.segredo é obrigatório para validar as notificações do hub")
+    return AssinanteWebSub(
+        cfg["callback"],
+        hub=cfg.get("hub", HUB_PADRAO),
+        segredo=cfg.get("segredo"),
+        lease=cfg.get("lease", 432000),
+        margem=cfg.get("margem_renovacao", 3600),
+    )
@@ -3,13 +3,24 @@ youtube_web_manager.py - Gerenciador YouTube para versão web (sem OBS)
 Adapta a lógica do YouTubeOBSManager para retornar dados via JSON/WebSocket
 """
 
+import io
 import json
-import http.client as client
-from datetime import datetime as dt, timezone
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from config_loader import config
 from canal_web import CanalWeb
+from armazenamento_pesquisas import ArmazenamentoPesquisas, CAMINHO_PADRAO
 from log_config import log_terminal
-import os
+from pool_conexoes import PoolConexoesHTTPS
+from agendador import AgendadorCanais
+from cache_videos import CacheDetalhesVideos
+from eventos import Evento, filtrar_validos, selecionar
+from feed_videos import ler_feed, CAMINHO_FEED
+from perfilador import perfil_ciclos
+from quota import QuotaExcedida, motivo_erro, MOTIVOS_QUOTA_DIARIA, MOTIVOS_LIMITE_TAXA, MOTIVOS_CHAVE_INVALIDA
+from chaves_api import criar_pool_chaves, ler_chaves
+import metricas
 
 
 class YouTubeWebManager:
@@ -17,19 +28,88 @@ class YouTubeWebManager:
     
     def __init__(self):
         """Inicializa o gerenciador com configurações do config.yaml"""
-        self.youtube_key = config.get("youtube_api_key")
         self.intervalo_execucao = config.get("intervalo_execucao", 120)
         self.intervalo_busca = config.get("intervalo_busca", 180)
         self.intervalo_atualizacao = config.get("intervalo_atualizacao", 300)
+        self.workers_polling = max(1, int(config.get("workers_polling", 8)))
+        self.timeout_canal = config.get("timeout_canal", 30)
+        self.janela_confirmacao = config.get("janela_confirmacao", 0.25)
+        self.intervalo_rapido = config.get("intervalo_rapido", 30)
+        self.intervalo_maximo = config.get("intervalo_maximo", 3600)
+        self.descoberta = config.get("descoberta", "feed")
+        
+        # Histórico de pesquisas (SQLite), com importação única das pastas antigas
+        self.armazenamento = ArmazenamentoPesquisas(
+            config.get("banco_pesquisas", CAMINHO_PADRAO),
+            max_por_canal=config.get("max_pesquisas_por_canal", 5),
+        )
+        importadas = self.armazenamento.importar_pastas("pesquisa_api")
+        if importadas:
+            log_terminal(f"{importadas} pesquisa(s) antiga(s) importada(s) de pesquisa_api/", cor='cyan')
         
         # Criação dos canais
         self.canais = [
-            CanalWeb(c["channel_id"], c["nome"])
+            CanalWeb(c["channel_id"], c["nome"], self.armazenamento, c.get("descoberta", self.descoberta))
             for c in config["canais"]
         ]
         
         self.ultima_atualizacao_status = 0
         
+        # Próxima consulta de cada canal (todos vencem no primeiro ciclo)
+        self.agendador = AgendadorCanais(
+            intervalo_rapido=self.intervalo_rapido,
+            intervalo_base=self.intervalo_atualizacao,
+            intervalo_maximo=self.intervalo_maximo,
+            intervalo_busca=self.intervalo_busca,
+        )
+        for canal in self.canais:
+            self.agendador.agendar(canal, 0)
+        
+        # Pool de workers para consultar os canais em paralelo
+        self.executor = ThreadPoolExecutor(max_workers=self.workers_polling,
+                                           thread_name_prefix="polling")
+        self._lock_canais = threading.Lock()
+        self._em_andamento = set()
+        
+        # Conexões keep-alive reaproveitadas entre requisições à API
+        # (host/porta/https configuráveis para apontar para a API falsa dos benchmarks)
+        self.pool_api = PoolConexoesHTTPS(
+            config.get("youtube_api_host", "www.googleapis.com"),
+            max_conexoes=config.get("max_conexoes_api", self.workers_polling),
+            timeout=10,
+            https=config.get("youtube_api_https", True),
+            port=config.get("youtube_api_porta"),
+        )
+        
+        # Feeds de uploads (descoberta sem quota), em outro host
+        self.pool_feed = PoolConexoesHTTPS(
+            config.get("feed_host", "www.youtube.com"),
+            max_conexoes=config.get("max_conexoes_api", self.workers_polling),
+            timeout=10,
+            https=config.get("feed_https", True),
+            port=config.get("feed_porta"),
+        )
+        
+        # Cache dos detalhes de vídeos (videos.list) com TTL por estado
+        self.cache_videos = CacheDetalhesVideos(
+            max_itens=config.get("cache_videos_max", 5000),
+            ttl_ao_vivo=config.get("ttl_video_ao_vivo", 60),
+            ttl_agendado=config.get("ttl_video_agendado", 15),
+            ttl_agendado_distante=config.get("ttl_video_agendado_distante", 1800),
+        )
+        
+        # Chaves da API, cada uma com o livro-caixa da sua quota diária: a soma
+        # estica intervalos e, com todas as chaves fora do pool, suspende consultas
+        self.chaves_api = criar_pool_chaves(config)
+        self.fator_quota = 1.0
+        self._aviso_bloqueio = 0
+        
+        # Chamado como ao_atualizar(chave, dados) a cada canal atualizado, com
+        # os dados no formato de get_streams_data, para enviar o resultado aos
+        # clientes sem esperar o fim do ciclo; roda com _lock_canais e não
+        # pode bloquear
+        self.ao_atualizar = None
+        
         log_terminal(f"YouTubeWebManager inicializado com {len(self.canais)} canais", cor='green')
     
     def filter_eventos_validos(self, eventos):
@@ -37,75 +117,142 @@ class YouTubeWebManager:
         Filtra eventos que não estão encerrados (actualEndTime vazio) 
         e agendados para hoje ou futuro.
         """
-        agora = dt.now(timezone.utc)
-        eventos_filtrados = []
-        
-        for evento in eventos:
-            if evento.get("actualEndTime"):
-                continue
-            
-            sched = evento.get("scheduledStartTime")
-            if sched:
-                try:
-                    sched_dt = dt.fromisoformat(sched.replace("Z", "+00:00"))
-                    if sched_dt.date() < agora.date():
-                        continue
-                except Exception:
-                    pass
-            
-            eventos_filtrados.append(evento)
-        
-        return eventos_filtrados
+        return filtrar_validos(eventos, time.time())
     
     def buscar_eventos_api(self, canal):
         """
         Busca eventos ao vivo e agendados do canal no YouTube.
         Retorna lista de eventos com detalhes de horário.
-        """
-        if not canal.channel_id:
-            return []
         
+        Com descoberta "feed", os candidatos vêm do feed de uploads (sem
+        quota) somados aos eventos já conhecidos, e só os que videos.list
+        confirma como transmissões são mantidos; se o feed falhar, a
+        pesquisa (search.list) é usada como alternativa. No ciclo, a
+        descoberta e a confirmação são feitas em etapas separadas (ver
+        run_cycle); este método faz as duas para um único canal.
+        """
         eventos = []
         try:
-            # Buscar eventos ao vivo
-            endpoint_live = f"/youtube/v3/search?part=snippet&channelId={canal.channel_id}&key={self.youtube_key}&eventType=live&type=video&maxResults=10"
-            eventos += self._eventos_da_api(endpoint_live)
-            
-            # Buscar eventos agendados
-            endpoint_upcoming = f"/youtube/v3/search?part=snippet&channelId={canal.channel_id}&key={self.youtube_key}&eventType=upcoming&type=video&maxResults=10"
-            eventos += self._eventos_da_api(endpoint_upcoming)
-            
-            # Buscar detalhes dos vídeos para pegar horários
-            video_ids = [ev['videoId'] for ev in eventos]
-            if video_ids:
-                detalhes = self._detalhes_videos(video_ids)
-                for ev in eventos:
-                    det = detalhes.get(ev['videoId'], {})
-                    ev['actualStartTime'] = det.get('actualStartTime')
-                    ev['scheduledStartTime'] = det.get('scheduledStartTime')
-                    ev['actualEndTime'] = det.get('actualEndTime')
-            
-            eventos = self.filter_eventos_validos(eventos)
-            
+            candidatos, do_feed = self._descobrir_eventos(canal)
+            eventos = self.atualizar_status_canais({canal: candidatos}, em_linha=True,
+                                                   canais_feed={canal} if do_feed else ())[canal]
+        except QuotaExcedida:
+            raise
         except Exception as e:
             log_terminal(f"[buscar_eventos_api] Erro para canal {canal.nome}: {e}", 
                         level='error', cor='red')
         
         return eventos
     
+    def _descobrir_eventos(self, canal):
+        """
+        Descobre os eventos candidatos do canal, ainda sem os horários
+        (confirmados depois por videos.list em atualizar_status_canais).
+        
+        Returns:
+            Tupla (candidatos, do_feed): do_feed indica que os candidatos
+            vieram do feed e só as transmissões devem ser mantidas
+        """
+        if not canal.channel_id:
+            return [], False
+        
+        with perfil_ciclos.fase("pesquisa"):
+            do_feed = canal.descoberta == "feed"
+            eventos = self._eventos_do_feed(canal) if do_feed else None
+            if eventos is None:
+                do_feed = False
+                eventos = self._eventos_da_pesquisa(canal)
+        
+        return eventos, do_feed
+    
+    def _eventos_da_pesquisa(self, canal):
+        """Descoberta por search.list (eventType live e upcoming, 100 unidades cada)"""
+        eventos = []
+        
+        # Buscar eventos ao vivo
+        endpoint_live = f"/youtube/v3/search?part=snippet&channelId={canal.channel_id}&eventType=live&type=video&maxResults=10"
+        eventos += self._eventos_da_api(endpoint_live)
+        
+        # Buscar eventos agendados
+        endpoint_upcoming = f"/youtube/v3/search?part=snippet&channelId={canal.channel_id}&eventType=upcoming&type=video&maxResults=10"
+        eventos += self._eventos_da_api(endpoint_upcoming)
+        
+        return eventos
+    
+    def _eventos_do_feed(self, canal):
+        """
+        Descoberta pelo feed de uploads do canal (sem quota).
+        Retorna os candidatos (vídeos do feed + eventos já conhecidos, sem
+        repetição e ainda sem horários) ou None se o feed não pôde ser lido.
+        """
+        caminho = CAMINHO_FEED.format(channel_id=canal.channel_id)
+        inicio = time.perf_counter()
+        status = "erro"
+        try:
+            status, _headers, corpo = self.pool_feed.requisitar("GET", caminho)
+            entradas = ler_feed(io.BytesIO(corpo)) if status == 200 else None
+        except Exception as e:
+            log_terminal(f"[{canal.nome}] Erro ao ler feed de uploads: {e}", level='warning', cor='yellow')
+            entradas = None
+        finally:
+            metricas.duracao_api.observar(time.perf_counter() - inicio, endpoint="feed")
+            metricas.respostas_api.incrementar(endpoint="feed", status=status)
+        
+        if entradas is None:
+            log_terminal(f"[{canal.nome}] Feed indisponível (HTTP {status}), usando search.list", 
+                        level='warning', cor='yellow')
+            return None
+        
+        candidatos = {
+            e["videoId"]: Evento(e["videoId"], e["title"], f"https://www.youtube.com/watch?v={e['videoId']}")
+            for e in entradas
+        }
+        # Eventos já conhecidos continuam candidatos mesmo após saírem do feed
+        for ev in canal.carregar_ultima_pesquisa():
+            candidatos.setdefault(ev.video_id, ev)
+        return list(candidatos.values())
+    
+    def _requisitar_api(self, endpoint, headers=None):
+        """
+        Executa GET na API YouTube usando o pool de conexões, com uma chave
+        escolhida no pool de chaves. Uma chave recusada por quota ou inválida
+        é retirada do pool e a requisição é repetida com a próxima.
+        Retorna (status, dados_json, headers); dados_json é None se status != 200.
+        Levanta QuotaExcedida se nenhuma chave estiver disponível.
+        """
+        nome_endpoint = metricas.endpoint_api(endpoint)
+        while True:
+            chave = self.chaves_api.escolher(nome_endpoint)
+            inicio = time.perf_counter()
+            try:
+                status, headers_resposta, corpo = self.pool_api.requisitar(
+                    "GET", f"{endpoint}&key={chave.valor}", headers)
+            except Exception:
+                self.chaves_api.liberar(chave, nome_endpoint)
+                metricas.registrar_requisicao_api(endpoint, "erro", time.perf_counter() - inicio)
+                raise
+            metricas.registrar_requisicao_api(endpoint, status, time.perf_counter() - inicio)
+            if status in (400, 401, 403, 429):
+                motivo = motivo_erro(corpo)
+                if motivo in MOTIVOS_QUOTA_DIARIA + MOTIVOS_LIMITE_TAXA + MOTIVOS_CHAVE_INVALIDA:
+                    self.chaves_api.ejetar(chave, nome_endpoint, motivo)
+                    continue
+            self.chaves_api.registrar(chave, nome_endpoint)
+            metricas.registrar_quota_api(nome_endpoint)
+            if status != 200:
+                return status, None, headers_resposta
+            return status, json.loads(corpo.decode("utf-8")), headers_resposta
+    
     def _eventos_da_api(self, endpoint):
         """Busca eventos de um endpoint da API YouTube"""
         try:
-            conn = client.HTTPSConnection("www.googleapis.com", timeout=10)
-            conn.request("GET", endpoint)
-            res = conn.getresponse()
+            status, data, _headers = self._requisitar_api(endpoint)
             
-            if res.status != 200:
-                log_terminal(f"[_eventos_da_api] HTTP status: {res.status}", 
+            if status != 200:
+                log_terminal(f"[_eventos_da_api] HTTP status: {status}", 
                             level='warning', cor='yellow')
                 return []
             
-            data = json.loads(res.read().decode("utf-8"))
             items = data.get("items", [])
             eventos = []
             
@@ -116,14 +263,14 @@ class YouTubeWebManager:
                     url = f"https://www.youtube.com/watch?v={video_id}"
                     live_details = item.get("liveStreamingDetails", {})
                     
-                    eventos.append({
-                        "videoId": video_id,
-                        "title": title,
-                        "url": url,
-                        "actualStartTime": live_details.get("actualStartTime"),
-                        "scheduledStartTime": live_details.get("scheduledStartTime"),
-                        "actualEndTime": live_details.get("actualEndTime"),
-                    })
+                    eventos.append(Evento(
+                        video_id,
+                        title,
+                        url,
+                        live_details.get("actualStartTime"),
+                        live_details.get("scheduledStartTime"),
+                        live_details.get("actualEndTime"),
+                    ))
                 except Exception as e:
                     log_terminal(f"[_eventos_da_api] Erro ao processar item: {e}", 
                                 level='warning', cor='yellow')
@@ -131,195 +278,654 @@ class YouTubeWebManager:
             
             return eventos
             
+        except QuotaExcedida:
+            raise
         except Exception as e:
             log_terminal(f"[_eventos_da_api] Erro: {e}", level='error', cor='red')
             return []
     
-    def _detalhes_videos(self, video_ids):
-        """Busca detalhes de vídeos (horários de início/fim)"""
+    def _consultar_detalhes(self, video_ids):
+        """
+        Consulta videos.list para um lote de até 50 vídeos e guarda no cache.
+        Envia If-None-Match com o ETag do mesmo lote; um 304 reaproveita a
+        resposta anterior sem baixar nem interpretar o corpo.
+        """
         detalhes = {}
         try:
-            endpoint = f"/youtube/v3/videos?part=liveStreamingDetails&id={','.join(video_ids)}&key={self.youtube_key}"
-            conn = client.HTTPSConnection("www.googleapis.com", timeout=10)
-            conn.request("GET", endpoint)
-            res = conn.getresponse()
+            endpoint = f"/youtube/v3/videos?part=liveStreamingDetails&id={','.join(video_ids)}"
+            etag = self.cache_videos.etag_lote(video_ids)
+            headers = {"If-None-Match": etag} if etag else None
+            with perfil_ciclos.fase("videos"):
+                status, data, headers_resposta = self._requisitar_api(endpoint, headers)
             
-            if res.status != 200:
-                log_terminal(f"[_detalhes_videos] HTTP status: {res.status}", 
+            if status == 304:
+                detalhes = self.cache_videos.resposta_lote(video_ids)
+            elif status != 200:
+                log_terminal(f"[_consultar_detalhes] HTTP status: {status}", 
                             level='warning', cor='yellow')
                 return detalhes
+            else:
+                for item in data.get("items", []):
+                    vid = item["id"]
+                    live_details = item.get("liveStreamingDetails", {})
+                    detalhes[vid] = live_details
+                self.cache_videos.guardar_lote(video_ids, headers_resposta.get("ETag") or data.get("etag"), detalhes)
             
-            data = json.loads(res.read().decode("utf-8"))
-            for item in data.get("items", []):
-                vid = item["id"]
-                live_details = item.get("liveStreamingDetails", {})
-                detalhes[vid] = live_details
+            self.cache_videos.guardar(detalhes, time.time())
             
+        except QuotaExcedida:
+            raise
         except Exception as e:
-            log_terminal(f"[_detalhes_videos] Erro: {e}", level='error', cor='red')
+            log_terminal(f"[_consultar_detalhes] Erro: {e}", level='error', cor='red')
         
         return detalhes
     
+    def _consultar_lote(self, video_ids, inicios):
+        """
+        _consultar_detalhes executado no pool pelo ciclo, anotando o início
+        em `inicios[tuple(video_ids)]` (o prazo do lote conta a partir daí)
+        """
+        inicios[tuple(video_ids)] = time.time()
+        return self._consultar_detalhes(video_ids)
+    
     def atualizar_status_videos(self, canal):
         """
         Atualiza o status de todos os vídeos monitorados do canal.
         Carrega pesquisa anterior e atualiza horários.
         """
-        eventos = canal.carregar_ultima_pesquisa()
-        video_ids = [ev['videoId'] for ev in eventos if 'videoId' in ev]
+        self.atualizar_status_canais({canal: canal.carregar_ultima_pesquisa()})
+    
+    def atualizar_status_canais(self, eventos_por_canal, prazo=None, canais_feed=(), em_linha=False):
+        """
+        Atualiza o status dos vídeos de vários canais de uma só vez.
+        Os IDs de todos os canais são deduplicados e os que não estão no
+        cache são consultados em lotes globais de até 50 (executados no
+        pool de workers); os detalhes são então devolvidos a cada canal e
+        a pesquisa filtrada é salva.
         
-        if not video_ids:
-            return
+        Args:
+            eventos_por_canal: Dict {canal: eventos carregados da última pesquisa}
+            prazo: Instante (time.time()) limite para aguardar os lotes
+            canais_feed: Canais cujos eventos vieram do feed de uploads; deles
+                só ficam os vídeos com horários (transmissões)
+            em_linha: Consulta os lotes na própria thread, sem o pool (para
+                quem já roda em um worker ou tem poucos lotes)
+        
+        Returns:
+            Dict {canal: eventos filtrados}
+        """
+        detalhes, lotes = self._detalhes_em_cache(eventos_por_canal)
+        if em_linha:
+            for lote in lotes:
+                detalhes.update(self._consultar_detalhes(lote))
+        elif lotes:
+            futuros = [self.executor.submit(perfil_ciclos.envolver(self._consultar_detalhes), lote) for lote in lotes]
+            timeout = None if prazo is None else max(0, prazo - time.time())
+            concluidos, pendentes = wait(futuros, timeout=timeout)
+            for futuro in concluidos:
+                detalhes.update(futuro.result())
+            if pendentes:
+                log_terminal(f"[atualizar_status_canais] {len(pendentes)} lote(s) excederam o prazo", 
+                            level='warning', cor='yellow')
+        
+        return self._aplicar_detalhes(eventos_por_canal, detalhes, canais_feed)
+    
+    def _detalhes_em_cache(self, eventos_por_canal):
+        """
+        Deduplica os IDs de todos os canais e separa os que estão no cache.
         
-        # Dividir em lotes de até 50
-        for i in range(0, len(video_ids), 50):
-            lote = video_ids[i:i+50]
-            detalhes = self._detalhes_videos(lote)
+        Returns:
+            Tupla (detalhes em cache, lotes de até 50 IDs a consultar)
+        """
+        video_ids = list(dict.fromkeys(
+            ev.video_id
+            for eventos in eventos_por_canal.values()
+            for ev in eventos if ev.video_id
+        ))
+        
+        # Vídeos em cache não entram nos lotes; os demais formam lotes cheios
+        detalhes, faltantes = self.cache_videos.obter(video_ids, time.time())
+        return detalhes, [faltantes[i:i+50] for i in range(0, len(faltantes), 50)]
+    
+    def _aplicar_detalhes(self, eventos_por_canal, detalhes, canais_feed=()):
+        """Devolve os detalhes a cada canal, filtra e salva a pesquisa. Retorna {canal: eventos filtrados}"""
+        resultado = {}
+        for canal, eventos in eventos_por_canal.items():
+            if not eventos:
+                resultado[canal] = eventos
+                continue
             
+            # Vídeos que videos.list confirmou sem liveStreamingDetails não são transmissões
+            eventos = [ev for ev in eventos if detalhes.get(ev.video_id) != {}]
             for ev in eventos:
-                if ev['videoId'] in detalhes:
-                    det = detalhes.get(ev['videoId'], {})
-                    ev['actualStartTime'] = det.get('actualStartTime')
-                    ev['scheduledStartTime'] = det.get('scheduledStartTime')
-                    ev['actualEndTime'] = det.get('actualEndTime')
+                if ev.video_id in detalhes:
+                    ev.atualizar(detalhes[ev.video_id])
+            
+            # Do feed, só interessam transmissões (uploads comuns não têm horários)
+            if canal in canais_feed:
+                eventos = [ev for ev in eventos if ev.actual_start or ev.scheduled_start]
+            
+            eventos_filtrados = self.filter_eventos_validos(eventos)
+            canal.salvar_pesquisa(eventos_filtrados)
+            resultado[canal] = eventos_filtrados
         
-        eventos_filtrados = self.filter_eventos_validos(eventos)
-        canal.salvar_pesquisa(eventos_filtrados)
+        return resultado
     
     def selecionar_stream(self, eventos, canal):
         """
         Seleciona a melhor stream para o canal, priorizando:
         1. Lives ao vivo (actualStartTime preenchido)
         2. Agendadas mais próximas
+        
+        Aceita Eventos (ou dicts no formato da API) e retorna o dict
+        da stream escolhida, ou None.
         """
-        agora = dt.now(timezone.utc)
+        with perfil_ciclos.fase("selecao"):
+            eventos = [ev if isinstance(ev, Evento) else Evento.de_dict(ev) for ev in eventos]
+            melhor_evento = selecionar(eventos, time.time())
         
-        # Filtrar eventos válidos
-        eventos_filtrados = []
-        for evento in eventos:
-            if evento.get("actualEndTime"):
-                continue
-            
-            sched = evento.get("scheduledStartTime")
-            if sched:
-                try:
-                    sched_dt = dt.fromisoformat(sched.replace("Z", "+00:00"))
-                    if sched_dt.date() < agora.date():
-                        continue
-                except Exception:
-                    pass
-            
-            eventos_filtrados.append(evento)
+        if melhor_evento:
+            return melhor_evento.para_dict()
         
-        eventos = eventos_filtrados
-        melhor_evento = None
-        menor_delta = None
+        return None
+    
+    def _processar_canal(self, canal, inicios=None):
+        """
+        Executa a descoberta de eventos do canal (executado em um worker do
+        pool). A confirmação por videos.list fica para o ciclo, que junta os
+        candidatos de vários canais nos mesmos lotes de 50.
+        Retorna (candidatos, do_feed), como _descobrir_eventos.
         
-        # 1. Priorizar ao vivo
-        for evento in eventos:
-            is_live = False
-            
-            if evento.get("actualStartTime") and not evento.get("actualEndTime"):
-                is_live = True
-                try:
-                    inicio = dt.fromisoformat(evento["actualStartTime"].replace("Z", "+00:00"))
-                except Exception:
-                    inicio = agora
-            
-            elif evento.get("scheduledStartTime") and not evento.get("actualEndTime"):
-                try:
-                    sched_dt = dt.fromisoformat(evento["scheduledStartTime"].replace("Z", "+00:00"))
-                    if sched_dt <= agora:
-                        is_live = True
-                        inicio = sched_dt
-                except Exception:
-                    pass
-            
-            if is_live:
-                delta = abs((agora - inicio).total_seconds())
-                if menor_delta is None or delta < menor_delta:
-                    melhor_evento = evento
-                    menor_delta = delta
-        
-        # 2. Se não há ao vivo, pegar agendado mais próximo
-        if not melhor_evento:
-            menor_delta = None
-            for evento in eventos:
-                sched = evento.get("scheduledStartTime")
-                if sched:
-                    try:
-                        inicio = dt.fromisoformat(sched.replace("Z", "+00:00"))
-                        if inicio > agora:
-                            delta = (inicio - agora).total_seconds()
-                            if menor_delta is None or delta < menor_delta:
-                                melhor_evento = evento
-                                menor_delta = delta
-                    except Exception:
-                        continue
+        Args:
+            inicios: Dict {canal: instante} onde o início da tarefa é anotado
+                (o prazo do canal conta a partir daí, não da fila do pool)
+        """
+        if inicios is not None:
+            inicios[canal] = time.time()
+        log_terminal(f"[{canal.nome}] Atualizando pesquisa na API...", cor='magenta')
+        inicio = time.perf_counter()
+        descoberta = self._descobrir_eventos(canal)
+        metricas.duracao_consulta_canal.observar(time.perf_counter() - inicio,
+                                                  canal=canal.chave_pesquisa, nome=canal.nome)
+        canal.ultima_pesquisa = time.time()
+        return descoberta
+    
+    def _aplicar_resultado(self, canal, eventos, melhor):
+        """
+        Atualiza a stream selecionada do canal com o resultado do worker
+        e agenda a próxima consulta conforme os eventos conhecidos.
+        """
+        if not canal.ativo:
+            return
         
-        if melhor_evento:
-            return melhor_evento
+        intervalo = self.agendador.reagendar(canal, eventos, time.time(), self.fator_quota)
+        with self._lock_canais:
+            canal.ultima_atualizacao = time.time()
+            if melhor:
+                canal.selected_stream = melhor
+                canal.proxima_stream_url = melhor.get('url')
+            else:
+                canal.selected_stream = None
+                canal.proxima_stream_url = None
+            self._avisar_atualizacao(canal)
         
-        return None
+        if melhor:
+            log_terminal(f"[{canal.nome}] Stream selecionada: {melhor.get('title')} "
+                        f"(próxima consulta em {intervalo:.0f}s)", cor='green')
+        else:
+            log_terminal(f"[{canal.nome}] Nenhuma stream disponível "
+                        f"(próxima consulta em {intervalo:.0f}s)", level='warning', cor='yellow')
+    
+    def _aplicar_status(self, eventos_por_canal, canais_feed=()):
+        """
+        Confirma os eventos de vários canais em lotes globais de videos.list
+        (atualizar_status_canais, na thread atual) e aplica a stream
+        selecionada de cada um.
+        """
+        try:
+            atualizados = self.atualizar_status_canais(eventos_por_canal, canais_feed=canais_feed, em_linha=True)
+        except QuotaExcedida as e:
+            for canal in eventos_por_canal:
+                self._adiar_canal(canal, e)
+            return
+        except Exception as e:
+            log_terminal(f"[run_cycle] Erro ao atualizar status: {e}", level='error', cor='red')
+            return
+        
+        self._aplicar_atualizados(atualizados)
+    
+    def _aplicar_atualizados(self, atualizados):
+        """Seleciona e aplica a stream de cada canal ({canal: eventos filtrados})"""
+        for canal, eventos in atualizados.items():
+            try:
+                self._aplicar_resultado(canal, eventos, self.selecionar_stream(eventos, canal))
+            except Exception as e:
+                self._aplicar_erro(canal, e)
+    
+    def _concluir_status(self, eventos_por_canal, detalhes, lotes):
+        """
+        Aplica o status dos canais que só atualizam status, com os detalhes
+        em cache e os dos lotes já concluídos (lotes fora do prazo ficam de
+        fora e seus vídeos mantêm o status anterior), e libera os canais.
+        
+        Args:
+            lotes: Futuros de _consultar_lote submetidos no ciclo
+        """
+        try:
+            for futuro in lotes:
+                if futuro.done():
+                    detalhes.update(futuro.result())
+            self._aplicar_atualizados(self._aplicar_detalhes(eventos_por_canal, detalhes))
+        except QuotaExcedida as e:
+            for canal in eventos_por_canal:
+                self._adiar_canal(canal, e)
+        except Exception as e:
+            log_terminal(f"[run_cycle] Erro ao atualizar status: {e}", level='error', cor='red')
+        finally:
+            for canal in eventos_por_canal:
+                self._liberar_canal(canal)
+    
+    def _confirmar_descobertas(self, concluidos):
+        """
+        Junta os candidatos das descobertas concluídas no pool e os confirma
+        de uma só vez (na thread atual, sem ocupar o pool), aplicando o
+        resultado de cada canal. Os canais só são liberados para nova
+        consulta depois disso, inclusive os que chegaram fora do prazo.
+        
+        Args:
+            concluidos: Dict {canal: futuro de _processar_canal já concluído}
+        """
+        candidatos = {}
+        canais_feed = set()
+        try:
+            for canal, futuro in concluidos.items():
+                if futuro.cancelled():
+                    continue
+                try:
+                    candidatos[canal], do_feed = futuro.result()
+                except QuotaExcedida as e:
+                    self._adiar_canal(canal, e)
+                    continue
+                except Exception as e:
+                    self._aplicar_erro(canal, e)
+                    continue
+                if do_feed:
+                    canais_feed.add(canal)
+            
+            if candidatos:
+                self._aplicar_status(candidatos, canais_feed)
+        finally:
+            for canal in concluidos:
+                self._liberar_canal(canal)
+    
+    def _candidatos_concluidos(self, futuros):
+        """Quantidade de IDs candidatos nas descobertas já concluídas (com sucesso)"""
+        total = 0
+        for futuro in futuros:
+            if not futuro.cancelled() and futuro.exception() is None:
+                total += len(futuro.result()[0])
+        return total
+    
+    def _avisar_atualizacao(self, canal):
+        """
+        Entrega a stream selecionada do canal ao estágio de envio (ao_atualizar).
+        Chamado com _lock_canais, para que os resultados de um mesmo canal
+        cheguem na ordem em que foram aplicados; canais retirados do
+        config.yaml não são mais enviados.
+        """
+        if self.ao_atualizar and canal.ativo:
+            try:
+                self.ao_atualizar(*self._dados_canal(canal))
+            except Exception as e:
+                log_terminal(f"[ao_atualizar] Erro: {e}", level='error', cor='red')
+    
+    def _adiar_canal(self, canal, erro):
+        """Quota excedida: mantém a stream atual e adia a consulta até a liberação"""
+        if not canal.ativo:
+            return
+        self.agendador.agendar(canal, erro.liberado_em)
+        log_terminal(f"[{canal.nome}] {erro}", level='warning', cor='yellow')
+    
+    def _aplicar_erro(self, canal, erro):
+        """Registra erro do ciclo e limpa a stream selecionada do canal"""
+        log_terminal(f"[{canal.nome}] Erro no ciclo: {erro}", level='error', cor='red')
+        with self._lock_canais:
+            canal.selected_stream = None
+            canal.proxima_stream_url = None
+            self._avisar_atualizacao(canal)
     
     def run_cycle(self):
         """
-        Executa um ciclo completo de monitoramento:
+        Executa um ciclo de monitoramento para os canais cuja consulta venceu:
         - Carrega pesquisas anteriores
-        - Atualiza status se necessário
-        - Seleciona melhor stream para cada canal
-        """
-        import time
+        - Pesquisa na API ou apenas atualiza status
+        - Seleciona melhor stream e agenda a próxima consulta
+        - Entrega a stream de cada canal concluído a `ao_atualizar` (envio incremental)
+        
+        Canais sem pesquisa (ou com `intervalo_atualizacao` vencido desde a
+        última pesquisa) são pesquisados em paralelo (até `workers_polling`
+        por vez); os demais têm o status atualizado em lotes globais de 50
+        vídeos. Os workers só descobrem os candidatos (feed ou search.list):
+        o ciclo junta os candidatos das descobertas que terminam dentro de
+        `janela_confirmacao` segundos e os confirma por videos.list nos
+        mesmos lotes globais. Os lotes de status entram no pool antes das
+        descobertas e são aplicados assim que terminam, enquanto o ciclo
+        segue confirmando descobertas.
+        
+        Cada canal (e cada lote de status) tem o prazo de `timeout_canal`
+        segundos, contado do início da sua tarefa no pool: o ciclo não
+        espera quem estoura o prazo (a stream anterior é mantida); o
+        resultado de uma descoberta atrasada é aplicado quando chegar, e
+        até lá o canal não é reenviado ao pool.
         
+        Com a quota apertada, os intervalos são multiplicados pelo fator do
+        pool de chaves (somando as chaves); com todas as chaves fora do pool,
+        os canais vencidos são adiados até a liberação sem nenhuma requisição.
+        """
+        inicio_ciclo = time.perf_counter()
         agora = time.time()
         
-        for canal in self.canais:
-            try:
-                # Carregar pesquisa anterior
-                eventos = canal.carregar_ultima_pesquisa()
+        bloqueado_ate = self.chaves_api.bloqueado_ate(agora)
+        if bloqueado_ate:
+            for canal in self.agendador.vencidos(agora):
+                if canal.ativo:
+                    self.agendador.agendar(canal, bloqueado_ate)
+            if self._aviso_bloqueio != bloqueado_ate:
+                self._aviso_bloqueio = bloqueado_ate
+                log_terminal(f"[run_cycle] Quota da API bloqueada, consultas suspensas por "
+                            f"{(bloqueado_ate - agora) / 60:.0f} min", level='warning', cor='yellow')
+            return
+        
+        self.fator_quota = self.chaves_api.fator_intervalo(agora)
+        if self.fator_quota > 1:
+            log_terminal(f"[run_cycle] Quota: projeção de {self.chaves_api.projecao(agora):.0f} "
+                        f"unidades, intervalos x{self.fator_quota:.1f}", level='warning', cor='yellow')
+        intervalo_atualizacao = self.intervalo_atualizacao * self.fator_quota
+        
+        # Separar canais que precisam de nova pesquisa dos que só atualizam status
+        canais_pesquisa = []
+        eventos_status = {}
+        with perfil_ciclos.fase("carregar"):
+            for canal in self.agendador.vencidos(agora):
+                # Canal retirado do config.yaml, mas reagendado por uma corrida com
+                # a recarga (ex.: notificação WebSub): sai da fila de vez
+                if not canal.ativo:
+                    continue
                 
-                # Se não há pesquisa ou passou intervalo de atualização, buscar nova
-                if not eventos or (agora - self.ultima_atualizacao_status) >= self.intervalo_atualizacao:
-                    log_terminal(f"[{canal.nome}] Atualizando pesquisa na API...", cor='magenta')
-                    eventos = self.buscar_eventos_api(canal)
-                    if eventos:
-                        canal.salvar_pesquisa(eventos)
-                else:
-                    # Atualizar status dos vídeos existentes
-                    self.atualizar_status_videos(canal)
-                    eventos = canal.carregar_ultima_pesquisa()
+                # Agendamento provisório, substituído quando o resultado for aplicado
+                self.agendador.agendar(canal, agora + self.intervalo_execucao)
                 
-                # Selecionar melhor stream
-                melhor = self.selecionar_stream(eventos, canal)
+                with self._lock_canais:
+                    if canal in self._em_andamento:
+                        log_terminal(f"[{canal.nome}] Consulta anterior ainda em andamento, pulando", 
+                                    level='warning', cor='yellow')
+                        continue
+                    self._em_andamento.add(canal)
                 
-                if melhor:
-                    canal.selected_stream = melhor
-                    canal.proxima_stream_url = melhor.get('url')
-                    log_terminal(f"[{canal.nome}] Stream selecionada: {melhor.get('title')}", cor='green')
+                eventos = canal.carregar_ultima_pesquisa()
+                if not eventos or (agora - canal.ultima_pesquisa) >= intervalo_atualizacao:
+                    canais_pesquisa.append(canal)
                 else:
-                    canal.selected_stream = None
-                    canal.proxima_stream_url = None
-                    log_terminal(f"[{canal.nome}] Nenhuma stream disponível", level='warning', cor='yellow')
-                
-            except Exception as e:
-                log_terminal(f"[{canal.nome}] Erro no ciclo: {e}", level='error', cor='red')
-                canal.selected_stream = None
-                canal.proxima_stream_url = None
+                    eventos_status[canal] = eventos
+        
+        # Status dos canais restantes: os lotes globais entram no pool antes
+        # das descobertas, para não esperarem atrás delas na fila
+        inicios = {}
+        detalhes_status, lotes = self._detalhes_em_cache(eventos_status)
+        tarefas = {}  # futuro -> canal (descoberta) ou tupla de IDs (lote de status)
+        for lote in lotes:
+            tarefas[self.executor.submit(perfil_ciclos.envolver(self._consultar_lote), lote, inicios)] = tuple(lote)
+        lotes_status = set(tarefas)
+        for canal in canais_pesquisa:
+            tarefas[self.executor.submit(perfil_ciclos.envolver(self._processar_canal), canal, inicios)] = canal
+        
+        status_pendente = bool(eventos_status)
+        pendentes = set(tarefas)
+        while True:
+            if status_pendente and not pendentes & lotes_status:
+                status_pendente = False
+                self._concluir_status(eventos_status, detalhes_status, lotes_status)
+            if not pendentes:
+                break
+            
+            # Prazo de cada tarefa: início no pool + timeout_canal
+            # (tarefas ainda na fila do pool não começaram a contar)
+            agora = time.time()
+            prazos = {f: inicios[tarefas[f]] + self.timeout_canal for f in pendentes if tarefas[f] in inicios}
+            for futuro in [f for f, limite in prazos.items() if limite <= agora and not f.done()]:
+                pendentes.discard(futuro)
+                if futuro in lotes_status:
+                    log_terminal(f"[run_cycle] Lote de {len(tarefas[futuro])} vídeo(s) excedeu o prazo de "
+                                f"{self.timeout_canal}s, mantendo o status anterior", level='warning', cor='yellow')
+                    continue
+                canal = tarefas[futuro]
+                log_terminal(f"[{canal.nome}] Prazo de {self.timeout_canal}s excedido, mantendo stream "
+                            f"anterior até o resultado chegar", level='warning', cor='yellow')
+                # Resultado atrasado: confirmado e aplicado pelo worker assim que a consulta terminar
+                futuro.add_done_callback(lambda f, c=canal: self._confirmar_descobertas({c: f}))
+            if not pendentes:
+                continue
+            espera = min((limite - agora for f, limite in prazos.items() if f in pendentes), default=0.5)
+            if len(prazos) < len(pendentes):
+                espera = min(espera, 0.5)  # reavalia quando as tarefas da fila começarem
+            concluidos, pendentes = wait(pendentes, timeout=max(espera, 0.01), return_when=FIRST_COMPLETED)
+            descobertas = concluidos - lotes_status
+            if not descobertas:
+                continue
+            
+            # Junta as descobertas que terminam em seguida para confirmar os
+            # candidatos em lotes cheios de 50 em vez de um lote por canal
+            limite = time.time() + self.janela_confirmacao
+            while pendentes and self._candidatos_concluidos(descobertas) < 50:
+                restante = limite - time.time()
+                if restante <= 0:
+                    break
+                mais, pendentes = wait(pendentes, timeout=restante, return_when=FIRST_COMPLETED)
+                descobertas |= mais - lotes_status
+            self._confirmar_descobertas({tarefas[f]: f for f in descobertas})
+        
+        # Gravar pesquisas alteradas no ciclo em uma única transação
+        try:
+            with perfil_ciclos.fase("salvar"):
+                self.armazenamento.descarregar()
+                self.chaves_api.salvar()
+        except Exception as e:
+            log_terminal(f"[run_cycle] Erro ao gravar pesquisas: {e}", level='error', cor='red')
         
         self.ultima_atualizacao_status = agora
+        metricas.duracao_ciclo.observar(time.perf_counter() - inicio_ciclo)
+    
+    def aplicar_config(self, cfg):
+        """
+        Reconcilia o gerenciador com um config.yaml recarregado, sem reiniciar:
+        - canais novos são criados e agendados para consulta imediata;
+        - canais removidos são retirados do agendamento (consultas em
+          andamento são descartadas ao terminar);
+        - canais mantidos preservam eventos em cache e stream selecionada
+          (apenas o nome é atualizado);
+        - intervalos, prazo, chaves da API e quota passam a valer no próximo ciclo.
+        
+        Returns:
+            Tupla (nomes adicionados, nomes removidos)
+        """
+        self.intervalo_execucao = cfg.get("intervalo_execucao", 120)
+        self.intervalo_busca = cfg.get("intervalo_busca", 180)
+        self.intervalo_atualizacao = cfg.get("intervalo_atualizacao", 300)
+        self.timeout_canal = cfg.get("timeout_canal", 30)
+        self.janela_confirmacao = cfg.get("janela_confirmacao", 0.25)
+        self.intervalo_rapido = cfg.get("intervalo_rapido", 30)
+        self.intervalo_maximo = cfg.get("intervalo_maximo", 3600)
+        self.descoberta = cfg.get("descoberta", "feed")
+        
+        self.agendador.intervalo_rapido = self.intervalo_rapido
+        self.agendador.intervalo_base = self.intervalo_atualizacao
+        self.agendador.intervalo_maximo = max(self.intervalo_maximo, self.intervalo_atualizacao)
+        self.agendador.intervalo_busca = self.intervalo_busca
+        self.chaves_api.configurar(
+            ler_chaves(cfg),
+            estrategia=cfg.get("estrategia_chaves", "menos_usada"),
+            orcamento_diario=cfg.get("quota_diaria", 10000),
+            reserva=cfg.get("quota_reserva", 0.05),
+            fator_maximo=cfg.get("quota_fator_maximo", 20),
+        )
+        
+        with self._lock_canais:
+            atuais = {canal.chave_pesquisa: canal for canal in self.canais}
+        
+        novos_canais = []
+        adicionados = []
+        for c in cfg["canais"]:
+            chave = c.get("channel_id") or c["nome"]
+            canal = atuais.pop(chave, None)
+            if canal is None:
+                canal = CanalWeb(c.get("channel_id"), c["nome"], self.armazenamento,
+                                 c.get("descoberta", self.descoberta))
+                adicionados.append(canal)
+            else:
+                canal.nome = canal.browser_source_name = c["nome"]
+                canal.descoberta = c.get("descoberta", self.descoberta)
+            novos_canais.append(canal)
+        
+        with self._lock_canais:
+            self.canais = novos_canais
+            for canal in atuais.values():
+                canal.ativo = False
+        
+        for canal in atuais.values():
+            self.agendador.remover(canal)
+        for canal in adicionados:
+            self.agendador.agendar(canal, 0)
+        
+        return [c.nome for c in adicionados], [c.nome for c in atuais.values()]
+    
+    def ids_canais(self):
+        """Channel IDs dos canais monitorados (sem os canais especiais sem ID)"""
+        with self._lock_canais:
+            return [canal.channel_id for canal in self.canais if canal.channel_id]
+    
+    def notificar_videos(self, entradas):
+        """
+        Aplica uma notificação push (WebSub) do feed de uploads: os vídeos
+        notificados entram como candidatos do canal, saem do cache de
+        detalhes e o canal é agendado para consulta imediata.
+        
+        Args:
+            entradas: Lista de dicts {videoId, channelId, title} (feed_videos.ler_feed)
+        
+        Returns:
+            Lista dos canais afetados
+        """
+        with self._lock_canais:
+            por_id = {canal.channel_id: canal for canal in self.canais if canal.channel_id}
+        
+        afetados = []
+        for channel_id in dict.fromkeys(e["channelId"] for e in entradas):
+            canal = por_id.get(channel_id)
+            if canal is None or not canal.ativo:
+                continue
+            videos = [e for e in entradas if e["channelId"] == channel_id]
+            self.cache_videos.invalidar([e["videoId"] for e in videos])
+            canal.adicionar_candidatos([
+                Evento(e["videoId"], e["title"], f"https://www.youtube.com/watch?v={e['videoId']}")
+                for e in videos
+            ])
+            self.agendador.agendar(canal, 0)
+            afetados.append(canal)
+        return afetados
+    
+    def metadados_canais(self):
+        """
+        Retorna {chave_do_canal: {ultima_pesquisa, ultima_atualizacao, proxima_consulta}}
+        para o snapshot de reinício.
+        """
+        with self._lock_canais:
+            canais = list(self.canais)
+        return {
+            canal.chave_pesquisa: {
+                "ultima_pesquisa": canal.ultima_pesquisa,
+                "ultima_atualizacao": canal.ultima_atualizacao,
+                "proxima_consulta": self.agendador.instante_de(canal),
+            }
+            for canal in canais
+        }
+    
+    def restaurar_snapshot(self, snapshot):
+        """
+        Restaura streams selecionadas e agendamento gravados antes do reinício.
+        Canais cuja próxima consulta ainda não venceu não são consultados no
+        primeiro ciclo; os demais (ou sem snapshot) continuam agendados para já.
+        
+        Returns:
+            Quantidade de canais restaurados
+        """
+        streams = snapshot.get("streams", {})
+        metadados = snapshot.get("canais", {})
+        restaurados = 0
+        
+        for canal in self.canais:
+            chave = canal.channel_id or canal.nome
+            if chave not in streams:
+                continue
+            meta = metadados.get(canal.chave_pesquisa, {})
+            with self._lock_canais:
+                canal.selected_stream = streams[chave].get("selected_stream")
+                canal.proxima_stream_url = (canal.selected_stream or {}).get("url")
+                canal.ultima_pesquisa = meta.get("ultima_pesquisa") or 0
+                canal.ultima_atualizacao = meta.get("ultima_atualizacao") or 0
+            if meta.get("proxima_consulta"):
+                self.agendador.agendar(canal, meta["proxima_consulta"])
+            restaurados += 1
+        
+        return restaurados
+    
+    def segundos_ate_proximo_ciclo(self):
+        """
+        Retorna quanto tempo aguardar até o próximo ciclo: o instante da
+        próxima consulta agendada, limitado entre 1s e `intervalo_execucao`
+        (esticado pelo fator de quota).
+        """
+        intervalo_execucao = self.intervalo_execucao * self.fator_quota
+        proximo = self.agendador.proximo_instante()
+        if proximo is None:
+            return intervalo_execucao
+        return min(max(proximo - time.time(), 1), intervalo_execucao)
+    
+    def _liberar_canal(self, canal):
+        """Remove o canal do conjunto de consultas em andamento"""
+        with self._lock_canais:
+            self._em_andamento.discard(canal)
+    
+    def encerrar(self):
+        """Encerra o pool de workers sem aguardar consultas pendentes e fecha conexões e banco"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.pool_api.fechar()
+        self.pool_feed.fechar()
+        self.armazenamento.fechar()
     
     def get_streams_data(self):
         """
         Retorna dicionário com dados de todos os canais para enviar ao frontend.
         Formato: {channel_id: {channel_id, nome, selected_stream}}
         """
-        streams_data = {}
-        
-        for canal in self.canais:
-            streams_data[canal.channel_id or canal.nome] = {
-                "channel_id": canal.channel_id or canal.nome,
-                "nome": canal.nome,
-                "selected_stream": canal.selected_stream if hasattr(canal, 'selected_stream') else None,
+        with self._lock_canais:
+            return dict(self._dados_canal(canal) for canal in self.canais)
+    
+    def _dados_canal(self, canal):
+        """Retorna (chave, dados) do canal no formato de get_streams_data (com _lock_canais)"""
+        return canal.channel_id or canal.nome, {
+            "channel_id": canal.channel_id or canal.nome,
+            "nome": canal.nome,
+            "selected_stream": canal.selected_stream if hasattr(canal, 'selected_stream') else None,
+        }
+    
+    def idade_atualizacoes(self):
+        """
+        Retorna {(canal, nome): segundos desde a última atualização bem-sucedida}
+        dos canais já atualizados ao menos uma vez.
+        """
+        agora = time.time()
+        with self._lock_canais:
+            return {
+                (canal.chave_pesquisa, canal.nome): agora - canal.ultima_atualizacao
+                for canal in self.canais if canal.ultima_atualizacao
             }
-        
-        return streams_data